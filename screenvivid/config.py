@@ -1,2 +1,49 @@
 DEFAULT_PIXELS_PER_FRAME = 6
-DEFAULT_FPS = 24
\ No newline at end of file
+DEFAULT_FPS = 24
+
+# Memory budget (MB) for captured frames waiting to be written while recording
+RECORDING_BUFFER_BUDGET_MB = 512
+# What to do when the budget is exhausted: "block", "drop-oldest" or "duplicate-last"
+RECORDING_BUFFER_POLICY = "drop-oldest"
+# Timestamp frames as they are captured (frame map sidecar) instead of pacing them on a fixed clock
+RECORDING_VARIABLE_FRAME_RATE = True
+# Skip encoding captured frames identical to the previous one
+RECORDING_SKIP_UNCHANGED_FRAMES = True
+# Pointer tracking backend: "auto" (XRecord on Linux) or "polling"
+POINTER_TRACKING_BACKEND = "auto"
+# Pointer samples per second when polling
+POINTER_POLL_RATE = 120
+# Record into segments of this many seconds, stitched on stop (0 records a single file)
+RECORDING_SEGMENT_SECONDS = 60
+# Raw pixel format piped to FFmpeg: "yuv420p" converts while capturing, "bgra" leaves it to FFmpeg
+RECORDING_PIXEL_FORMAT = "yuv420p"
+
+# Export render processes (0 uses all cores but one, 1 renders in the export thread)
+EXPORT_WORKERS = 0
+# Frames rendered per task handed to an export worker
+EXPORT_CHUNK_FRAMES = 30
+# Memory budget (MB) for rendered frames waiting to be encoded
+EXPORT_RENDER_BUDGET_MB = 2048
+# Independent chunks encoded concurrently and joined without re-encoding (0 encodes in one FFmpeg process)
+EXPORT_ENCODE_CHUNKS = 0
+# Shortest encoded chunk in seconds, each chunk starts on a keyframe
+EXPORT_MIN_CHUNK_SECONDS = 2
+
+# Memory budget (MB) for decoded frames kept for preview and timeline scrubbing
+PREVIEW_FRAME_CACHE_MB = 512
+# Memory budget (MB) for rendered preview frames, reused while the editing parameters are unchanged
+PREVIEW_RENDER_CACHE_MB = 256
+# Memory budget (MB) for shadow and rounded corner masks, shared by preview and export renders
+RENDER_MASK_CACHE_MB = 128
+# Frames decoded ahead of and behind the playhead in the background
+PREVIEW_READ_AHEAD_FRAMES = 30
+PREVIEW_READ_BEHIND_FRAMES = 30
+# Rendered frames buffered ahead of the playhead during preview playback
+PREVIEW_PREFETCH_FRAMES = 8
+# Preview render resolution: "display" (size of the preview item), "full", "half" or "quarter"
+PREVIEW_QUALITY = "display"
+# Transcode recordings into a short GOP, reduced size proxy used for preview and scrubbing
+PREVIEW_PROXY = True
+# Height of the proxy and frames between its keyframes
+PREVIEW_PROXY_HEIGHT = 720
+PREVIEW_PROXY_GOP = 10
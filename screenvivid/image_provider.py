@@ -1,13 +1,52 @@
+import threading
+
+import cv2
+import numpy as np
 from PySide6.QtQuick import QQuickImageProvider
 from PySide6.QtGui import QImage
 
 class FrameImageProvider(QQuickImageProvider):
-    def __init__(self):
+    """Serves the current video frame to QML from triple-buffered RGB surfaces.
+
+    A rendered frame is converted into a back buffer that becomes the ready
+    one. A request then takes it as the front buffer QML shows. Buffers are
+    never written while they are front or ready, so images handed to QML are
+    not copied and do not change under it.
+    """
+
+    def __init__(self, buffers=3):
         super().__init__(QQuickImageProvider.Image)
-        self.frame = QImage()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # (array, image) pairs, the image wraps the array memory
+        self._buffers = [None] * max(3, buffers)
+        self._front = None
+        self._ready = None
 
     def requestImage(self, id, size, requestedSize):
-        return self.frame
+        with self._lock:
+            if self._ready is not None:
+                self._front, self._ready = self._ready, None
+            if self._front is None:
+                return QImage()
+            return self._buffers[self._front][1]
+
+    def _back_buffer(self, width, height):
+        index = next(i for i in range(len(self._buffers)) if i not in (self._front, self._ready))
+        buffer = self._buffers[index]
+        if buffer is None or buffer[0].shape[:2] != (height, width):
+            array = np.empty((height, width, 3), dtype=np.uint8)
+            image = QImage(array.data, width, height, width * 3, QImage.Format_RGB888)
+            buffer = (array, image)
+            self._buffers[index] = buffer
+        return index, buffer[0]
 
-    def updateFrame(self, frame):
-        self.frame = frame
+    def present(self, frame):
+        """Convert a rendered BGR frame into a back buffer and make it the next frame QML gets."""
+        height, width = frame.shape[:2]
+        with self._write_lock:
+            with self._lock:
+                index, array = self._back_buffer(width, height)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=array)
+            with self._lock:
+                self._ready = index
@@ -1,4 +1,5 @@
 import sys
+import multiprocessing
 from pathlib import Path
 
 from PySide6.QtGui import QGuiApplication, QIcon
@@ -14,6 +15,9 @@ from screenvivid.image_provider import FrameImageProvider
 from screenvivid.models.logger import logger
 
 def main():
+    # Export render workers are spawned processes, frozen builds must not
+    # start the app again in them
+    multiprocessing.freeze_support()
     logger.info("Starting ScreenVivid")
     app = QGuiApplication(sys.argv)
 
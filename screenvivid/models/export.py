@@ -1,17 +1,26 @@
 import os
-import io
-import cv2
 import queue
+import shutil
+import tempfile
 import subprocess
 import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from PIL import Image
-from PySide6.QtCore import Signal, QThread
-from screenvivid.utils.general import get_os_name, get_ffmpeg_path
+from PySide6.QtCore import Qt, Signal, QThread
+from screenvivid import config
+from screenvivid.models.utils.render import (
+    build_render_transforms, init_render_worker, render_frame, render_chunk, encode_chunk
+)
+from screenvivid.models.utils.frame_reader import FrameReader
+from screenvivid.models.utils.segments import write_concat_list, concat_videos
+from screenvivid.utils.general import get_os_name, get_ffmpeg_path, safe_delete
 from screenvivid.utils.logging import logger
 
 class VideoReaderThread(QThread):
     frame_ready = Signal(np.ndarray)
+    failed = Signal(str)
 
     def __init__(self, video_processor, frame_queue, stop_flag, export_params):
         super().__init__()
@@ -22,36 +31,122 @@ class VideoReaderThread(QThread):
 
     def run(self):
         output_size = tuple(self.export_params.get("output_size"))
+        frame_indices = self.export_params["frame_indices"]
 
-        current_frame = self.video_processor.current_frame
-        self.video_processor.video.set(cv2.CAP_PROP_POS_FRAMES, self.video_processor.start_frame)
-        self.video_processor.current_frame = self.video_processor.start_frame
+        # Export renders at full resolution with its own transforms and its
+        # own reader, the preview ones can change or seek while exporting
+        render_config = self.video_processor.get_render_config()
+        reader = None
+        try:
+            compose = build_render_transforms(render_config)
+            reader = FrameReader(
+                render_config["video_path"], render_config["frame_map"],
+                render_config["keyframes"], render_config["frame_times"]
+            )
 
-        total_frames = self.video_processor.end_frame - self.video_processor.start_frame
-        for i in range(total_frames):
-            if self.stop_flag.is_set():
-                break
+            processed_frame = None
+            last_index = None
+            for index in frame_indices:
+                if self.stop_flag.is_set():
+                    break
 
-            ret, frame = self.video_processor.video.read()
-            if ret:
-                # Get processed frame (in RGB format)
-                processed_frame = self.video_processor.process_frame(frame)
-                self.video_processor.current_frame += 1
+                # Variable frame rate recordings can show the same frame several times
+                if index != last_index:
+                    ret, frame = reader.read(index)
+                    if not ret:
+                        raise RuntimeError(f"Failed to read frame {index}")
 
-                # Resize frame if necessary
-                if processed_frame.shape[:2] != output_size:
-                    processed_frame = cv2.resize(processed_frame, output_size)
+                    # Get processed frame in RGB format, resized to the output size
+                    processed_frame = render_frame(compose, frame, index, output_size)
+                    last_index = index
 
                 # Push the processed frame to the queue
                 self.frame_queue.put(processed_frame)
-            else:
-                break
+        except Exception as e:
+            logger.error(f"Export render error: {e}")
+            self.failed.emit(str(e))
+        finally:
+            if reader is not None:
+                reader.release()
+            # Signal that the reading is done
+            self.frame_queue.put(None)
+
+def get_export_workers():
+    workers = config.EXPORT_WORKERS
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) - 1)
+    return workers
+
+class ParallelRenderThread(QThread):
+    """Renders the export frames in a pool of worker processes.
+
+    The frame indices are split into chunks, each worker renders whole chunks
+    with its own video reader and transforms rebuilt from the render config,
+    and the chunks are queued for the writer in order. Chunks are sized so
+    that two per worker fit in the render memory budget.
+    """
+
+    failed = Signal(str)
+
+    def __init__(self, video_processor, frame_queue, stop_flag, export_params, workers):
+        super().__init__()
+        self.video_processor = video_processor
+        self.frame_queue = frame_queue
+        self.stop_flag = stop_flag
+        self.export_params = export_params
+        self.workers = workers
 
-        self.video_processor.video.set(cv2.CAP_PROP_POS_FRAMES, current_frame)
-        self.video_processor.current_frame = current_frame
+    def run(self):
+        output_size = tuple(self.export_params.get("output_size"))
+        frame_indices = self.export_params["frame_indices"]
+        frame_bytes = output_size[0] * output_size[1] * 3
+        max_pending = 2 * self.workers
+        budget_frames = config.EXPORT_RENDER_BUDGET_MB * 1024 * 1024 // (max_pending * frame_bytes)
+        chunk_frames = max(1, min(config.EXPORT_CHUNK_FRAMES, budget_frames))
+        chunks = [frame_indices[i:i + chunk_frames] for i in range(0, len(frame_indices), chunk_frames)]
+
+        render_config = self.video_processor.get_render_config()
+        render_config["output_size"] = output_size
+        logger.info(f"Rendering {len(chunks)} chunks of {chunk_frames} frames in {self.workers} processes")
+
+        pending = deque()
+        next_chunk = 0
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_render_worker,
+                initargs=(render_config,)
+            ) as pool:
+                try:
+                    while not self.stop_flag.is_set() and (pending or next_chunk < len(chunks)):
+                        while len(pending) < max_pending and next_chunk < len(chunks):
+                            pending.append(pool.submit(render_chunk, chunks[next_chunk]))
+                            next_chunk += 1
+
+                        frames = pending.popleft().result()
+                        for frame in frames:
+                            if not self._put(frame):
+                                break
+                finally:
+                    for future in pending:
+                        future.cancel()
+        except Exception as e:
+            logger.error(f"Parallel render error: {e}")
+            self.failed.emit(str(e))
+        finally:
+            # Signal that the reading is done
+            self._put(None)
 
-        # Signal that the reading is done
-        self.frame_queue.put(None)
+    def _put(self, item):
+        # The writer stops reading once the export is cancelled
+        while not self.stop_flag.is_set():
+            try:
+                self.frame_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
 
 # Codec-specific configurations
 codec_params = {
@@ -74,6 +169,30 @@ codec_params = {
     }
 }
 
+def get_color_primaries(icc_profile):
+    """
+    Color primaries tag for the output, from the red primary of the ICC
+    profile of the recording. Defaults to sRGB / BT.709.
+    """
+    if not icc_profile:
+        return "bt709"
+
+    try:
+        from PIL import ImageCms
+        profile = ImageCms.getOpenProfile(icc_profile)
+        red_x = profile.profile.red_colorant[1][0]
+    except Exception as e:
+        logger.warning(f"Failed to read ICC profile {icc_profile}: {e}")
+        return "bt709"
+
+    # Colorants are adapted to D50: sRGB red is at x=0.648, Display P3 at
+    # x=0.682 and BT.2020 at x=0.708
+    if red_x >= 0.695:
+        return "bt2020"
+    if red_x >= 0.665:
+        return "smpte432"
+    return "bt709"
+
 # Platform-specific overrides and additions
 platform_specific = {
     "windows": {
@@ -123,9 +242,64 @@ def get_codec_config(os_name, requested_codec=None):
 
     return config
 
+def get_export_path(export_params):
+    format = export_params.get("format", "mp4")
+    output_file = export_params.get("output_path", "output_video")
+
+    video_dir = "Videos" if get_os_name() != "macos" else "Movies"
+    output_dir = os.path.join(os.path.expanduser("~"), f"{video_dir}/ScreenVivid")
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, f"{output_file}.{format}")
+
+def get_export_command(ffmpeg_path, output_path, fps, output_size, export_params, icc_profile=None):
+    """
+    FFmpeg command encoding raw RGB frames of `output_size` read from stdin.
+    """
+    os_name = get_os_name()
+    width, height = output_size
+    adjusted_width = (width + 1) & ~1
+    adjusted_height = (height + 1) & ~1
+
+    # Get codec configuration from export_params or use default
+    requested_codec = export_params.get("codec")
+    codec_config = get_codec_config(os_name, requested_codec)
+
+    # Allow override of codec parameters from export_params
+    if "codec_params" in export_params:
+        codec_config["params"].update(export_params["codec_params"])
+
+    # Rendered frames are piped as raw RGB, there is nothing to decode
+    base_cmd = [
+        ffmpeg_path,
+        '-f', 'rawvideo',
+        '-pixel_format', 'rgb24',
+        '-video_size', f"{width}x{height}",
+        '-framerate', str(fps),
+        '-i', '-',
+    ]
+
+    # The RGB to YUV conversion uses the BT.709 matrix the output is
+    # tagged with, the primaries come from the recording's ICC profile
+    scale = f'scale={adjusted_width}:{adjusted_height}:' if (width, height) != (adjusted_width, adjusted_height) else 'scale='
+    filter_cmd = ['-vf', f'{scale}out_color_matrix=bt709:out_range=tv']
+    color_cmd = [
+        '-colorspace', 'bt709',
+        '-color_primaries', get_color_primaries(icc_profile),
+        '-color_trc', 'iec61966-2-1',
+        '-color_range', 'tv',
+    ]
+
+    # Build output command from configuration
+    output_cmd = ['-c:v', codec_config["codec"]]
+    for key, value in codec_config["params"].items():
+        output_cmd.extend([f'-{key}', str(value)])
+
+    return base_cmd + filter_cmd + output_cmd + color_cmd + ['-y', output_path]
+
 class FFmpegWriterThread(QThread):
     progress = Signal(float)
     finished = Signal()
+    failed = Signal(str)
 
     def __init__(self, frame_queue, stop_flag, export_params):
         super().__init__()
@@ -133,57 +307,17 @@ class FFmpegWriterThread(QThread):
         self.stop_flag = stop_flag
         self.export_params = export_params
 
-    def _get_ffmpeg_command(self, ffmpeg_path, output_path, fps, output_size, codec_config):
-        os_name = get_os_name()
-        width, height = output_size
-        adjusted_width = (width + 1) & ~1
-        adjusted_height = (height + 1) & ~1
-
-        # Get codec configuration from export_params or use default
-        requested_codec = self.export_params.get("codec")
-        codec_config = get_codec_config(os_name, requested_codec)
-
-        # Allow override of codec parameters from export_params
-        if "codec_params" in self.export_params:
-            codec_config["params"].update(self.export_params["codec_params"])
-
-        # Base command parameters
-        base_cmd = [
-            ffmpeg_path,
-            '-f', 'image2pipe',
-            '-framerate', str(fps),
-            '-s', f"{output_size[0]}x{output_size[1]}",
-            '-vcodec', 'mjpeg',
-            '-i', '-',
-            '-vf', f'scale={adjusted_width}:{adjusted_height}'
-        ]
-
-        # Build output command from configuration
-        output_cmd = ['-c:v', codec_config["codec"]]
-        for key, value in codec_config["params"].items():
-            output_cmd.extend([f'-{key}', str(value)])
-
-        return base_cmd + output_cmd + ['-y', output_path]
-
     def run(self):
-        format = self.export_params.get("format", "mp4")
         fps = self.export_params.get("fps")
         output_size = tuple(self.export_params.get("output_size"))
-        output_file = self.export_params.get("output_path", "output_video")
         icc_profile = self.export_params.get("icc_profile", None)
         total_frames = self.export_params.get("total_frames")
-        codec_config = self.export_params.get("codec_config", {})
-
-        # Determine output path
-        video_dir = "Videos" if get_os_name() != "macos" else "Movies"
-        output_dir = os.path.join(os.path.expanduser("~"), f"{video_dir}/ScreenVivid")
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = os.path.join(output_dir, f"{output_file}.{format}")
+        output_path = get_export_path(self.export_params)
 
         ffmpeg_path = get_ffmpeg_path()
 
         # FFmpeg command setup - changed pixel format to bgr24
-        cmd = self._get_ffmpeg_command(ffmpeg_path, output_path, fps, output_size, codec_config)
+        cmd = get_export_command(ffmpeg_path, output_path, fps, output_size, self.export_params, icc_profile)
         logger.debug(f"FFmpeg export command: {' '.join(cmd)}")
 
         # Start FFmpeg process with larger pipe buffer
@@ -205,12 +339,8 @@ class FFmpegWriterThread(QThread):
                 stderr=subprocess.PIPE,
                 bufsize=10*1024*1024,
             )
-        icc_data = None
+        error = None
         try:
-            if icc_profile:
-                with open(icc_profile, "rb") as f:
-                    icc_data = f.read()
-
             frame_count = 0
             while not self.stop_flag.is_set():
                 try:
@@ -218,30 +348,13 @@ class FFmpegWriterThread(QThread):
                     if frame is None:
                         break
 
-                    # Convert frame to PIL Image
-                    image = Image.fromarray(frame)
-
-                    # Use context manager for proper buffer cleanup
-                    with io.BytesIO() as buffer:
-                        try:
-                            # Save image to buffer
-                            image.save(buffer, format="JPEG", quality=95, icc_profile=icc_data)
-                            image_bytes = buffer.getvalue()
-
-                            # Check if process is still running
-                            if process.poll() is None:
-                                process.stdin.write(image_bytes)
-                                process.stdin.flush()
-                            else:
-                                logger.error("FFmpeg process terminated early.")
-                                break
-
-                        except Exception as e:
-                            logger.error(f"Error processing frame {frame_count}: {e}")
-                            continue
-                        finally:
-                            # Ensure image is closed to free up memory
-                            image.close()
+                    # Check if process is still running
+                    if process.poll() is None:
+                        process.stdin.write(memoryview(np.ascontiguousarray(frame)))
+                    else:
+                        logger.error("FFmpeg process terminated early.")
+                        error = "FFmpeg process terminated early"
+                        break
 
                     frame_count += 1
                     self.progress.emit(frame_count / total_frames * 100)
@@ -251,13 +364,15 @@ class FFmpegWriterThread(QThread):
                     continue
                 except Exception as e:
                     logger.error(f"Error in write loop: {e}")
+                    error = str(e)
                     break
 
         finally:
             # Proper cleanup
             try:
                 if process.poll() is None:
-                    process.communicate(b"q")
+                    # Closing stdin ends the raw stream, anything written would be read as pixels
+                    process.communicate()
                     process.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 process.kill()
@@ -265,11 +380,120 @@ class FFmpegWriterThread(QThread):
             except Exception as e:
                 logger.error(f"Error during cleanup: {e}")
             finally:
+                if error is None and process.returncode != 0 and not self.stop_flag.is_set():
+                    error = f"FFmpeg exited with code {process.returncode}"
+                if error is not None:
+                    # The output is truncated or unreadable
+                    safe_delete(output_path)
+                    self.failed.emit(error)
                 self.finished.emit()
 
+def get_encode_chunks(export_params):
+    """
+    Contiguous runs of the export frames encoded as independent chunks, or a
+    single run when chunked encoding is off or the video is too short.
+    """
+    frame_indices = export_params["frame_indices"]
+    chunks = export_params.get("encode_chunks", config.EXPORT_ENCODE_CHUNKS)
+    min_frames = max(1, int(config.EXPORT_MIN_CHUNK_SECONDS * export_params.get("fps")))
+    chunks = max(1, min(chunks, len(frame_indices) // min_frames))
+    bounds = np.linspace(0, len(frame_indices), chunks + 1).astype(int)
+    return [frame_indices[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+class ChunkedEncodeThread(QThread):
+    """Encodes independent chunks of the export concurrently.
+
+    Every chunk is rendered by its own worker process and piped to its own
+    FFmpeg process, so each part starts on a keyframe. The parts are then
+    joined with the concat demuxer without re-encoding.
+    """
+    progress = Signal(float)
+    failed = Signal(str)
+
+    def __init__(self, video_processor, stop_flag, export_params, chunks):
+        super().__init__()
+        self.video_processor = video_processor
+        self.stop_flag = stop_flag
+        self.export_params = export_params
+        self.chunks = chunks
+
+    def run(self):
+        fps = self.export_params.get("fps")
+        output_size = tuple(self.export_params.get("output_size"))
+        icc_profile = self.export_params.get("icc_profile", None)
+        total_frames = self.export_params.get("total_frames")
+        output_path = get_export_path(self.export_params)
+        ffmpeg_path = get_ffmpeg_path()
+
+        render_config = self.video_processor.get_render_config()
+        render_config["output_size"] = output_size
+
+        # Encoder threads are shared between the chunks, the parts are only
+        # made fast start once joined
+        threads = max(1, (os.cpu_count() or 1) // len(self.chunks))
+        parts_dir = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(output_path))
+        extension = os.path.splitext(output_path)[1]
+        parts = []
+        commands = []
+        for i in range(len(self.chunks)):
+            part = os.path.join(parts_dir, f"part{i:05d}{extension}")
+            cmd = get_export_command(ffmpeg_path, part, fps, output_size, self.export_params, icc_profile)
+            if "-movflags" in cmd:
+                del cmd[cmd.index("-movflags"):cmd.index("-movflags") + 2]
+            cmd[-2:-2] = ['-threads', str(threads)]
+            parts.append(part)
+            commands.append(cmd)
+        logger.info(f"Encoding {len(self.chunks)} chunks concurrently, {threads} encoder threads each")
+
+        context = multiprocessing.get_context("spawn")
+        progress_queue = context.Queue()
+        cancel_event = context.Event()
+        frame_count = 0
+        try:
+            with ProcessPoolExecutor(
+                max_workers=len(self.chunks),
+                mp_context=context,
+                initializer=init_render_worker,
+                initargs=(render_config, progress_queue, cancel_event)
+            ) as pool:
+                futures = [
+                    pool.submit(encode_chunk, chunk, cmd, os.path.splitext(part)[0] + ".log")
+                    for chunk, cmd, part in zip(self.chunks, commands, parts)
+                ]
+                while not all(future.done() for future in futures):
+                    if self.stop_flag.is_set():
+                        cancel_event.set()
+                        break
+                    try:
+                        frame_count += progress_queue.get(timeout=0.2)
+                        self.progress.emit(frame_count / total_frames * 100)
+                    except queue.Empty:
+                        continue
+
+                for future in futures:
+                    future.result()
+
+            if self.stop_flag.is_set():
+                return
+
+            list_path = os.path.join(parts_dir, "parts.ffconcat")
+            write_concat_list(parts, list_path)
+            if not concat_videos(list_path, output_path, ["-movflags", "+faststart"]):
+                raise RuntimeError("Failed to join the encoded chunks")
+            self.progress.emit(100.0)
+        except Exception as e:
+            logger.error(f"Chunked encode error: {e}")
+            # A failed join can leave a truncated output
+            safe_delete(output_path)
+            self.failed.emit(str(e))
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
 class ExportThread(QThread):
     progress = Signal(float)
     finished = Signal()
+    # Emitted instead of finished when the export failed, with the reason
+    failed = Signal(str)
 
     def __init__(self, video_processor, export_params):
         super().__init__()
@@ -278,25 +502,55 @@ class ExportThread(QThread):
         # Increased queue size for better buffering
         self.frame_queue = queue.Queue(maxsize=90)  # Buffer 3 second at 30fps
         self._stop_flag = threading.Event()
-
-        self.export_params["total_frames"] = self.video_processor.end_frame - self.video_processor.start_frame
-
-        self.reader_thread = VideoReaderThread(video_processor, self.frame_queue, self._stop_flag, export_params)
-        self.writer_thread = FFmpegWriterThread(self.frame_queue, self._stop_flag, export_params)
+        self._error = None
+
+        frame_indices = self.video_processor.get_export_frames(self.export_params.get("fps"))
+        self.export_params["frame_indices"] = frame_indices
+        self.export_params["total_frames"] = len(frame_indices)
+
+        chunks = get_encode_chunks(self.export_params)
+        workers = get_export_workers()
+        if len(chunks) > 1:
+            self.reader_thread = None
+            self.writer_thread = ChunkedEncodeThread(video_processor, self._stop_flag, export_params, chunks)
+        elif workers > 1:
+            self.reader_thread = ParallelRenderThread(
+                video_processor, self.frame_queue, self._stop_flag, export_params, workers
+            )
+        else:
+            self.reader_thread = VideoReaderThread(video_processor, self.frame_queue, self._stop_flag, export_params)
+        if self.reader_thread is not None:
+            self.writer_thread = FFmpegWriterThread(self.frame_queue, self._stop_flag, export_params)
 
         self.writer_thread.progress.connect(self.progress.emit)
-        self.writer_thread.finished.connect(self.finished.emit)
+        # Recorded from the worker threads themselves, before run() checks it
+        self.writer_thread.failed.connect(self._on_failed, Qt.DirectConnection)
+        if self.reader_thread is not None:
+            self.reader_thread.failed.connect(self._on_failed, Qt.DirectConnection)
+
+    def _on_failed(self, error):
+        # The first error is the cause, later ones are its consequences
+        if self._error is None:
+            self._error = error
 
     def stop(self):
         self._stop_flag.set()
-        self.reader_thread.quit()
+        if self.reader_thread is not None:
+            self.reader_thread.quit()
         self.writer_thread.quit()
 
     def run(self):
-        self.reader_thread.start()
+        if self.reader_thread is not None:
+            self.reader_thread.start()
         self.writer_thread.start()
 
-        self.reader_thread.wait()
+        if self.reader_thread is not None:
+            self.reader_thread.wait()
         self.writer_thread.wait()
 
-        self.finished.emit()
\ No newline at end of file
+        if self._error is not None:
+            # A failed render still ends the stream, the writer saw a valid but truncated video
+            safe_delete(get_export_path(self.export_params))
+            self.failed.emit(self._error)
+        else:
+            self.finished.emit()
\ No newline at end of file
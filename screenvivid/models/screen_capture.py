@@ -1,6 +1,22 @@
+import cv2
+import numpy as np
+
 from screenvivid.utils.general import get_os_name
 
+def get_frame_size(width, height, pixel_format="bgra"):
+    """
+    Size in bytes of one raw frame in the given pixel format.
+    """
+    if pixel_format == "yuv420p":
+        return width * height * 3 // 2
+    return width * height * 4
+
 class BaseScreenCapture:
+    # Whether the capture can write raw frames into a caller provided buffer
+    supports_buffers = False
+    # Raw pixel formats `capture_into` can produce
+    pixel_formats = ()
+
     def __init__(self, region=None):
         self._region = region
 
@@ -24,6 +40,13 @@ class BaseScreenCapture:
         """
         raise NotImplementedError("Subclasses must implement the 'capture' method.")
 
+    def capture_into(self, buffer, pixel_format="bgra"):
+        """
+        Capture the screen or region directly into a preallocated frame buffer.
+        Only available when `supports_buffers` is True.
+        """
+        raise NotImplementedError("This screen capture does not support frame buffers.")
+
     def cleanup(self):
         """
         Clean up resources. Subclasses can override this method.
@@ -31,6 +54,9 @@ class BaseScreenCapture:
         pass
 
 class MSSScreenCapture(BaseScreenCapture):
+    supports_buffers = True
+    pixel_formats = ("bgra", "yuv420p")
+
     def __init__(self, region=None):
         super().__init__(region)
         import mss
@@ -58,6 +84,36 @@ class MSSScreenCapture(BaseScreenCapture):
 
         return bgra, "bgra"
 
+    def capture_into(self, buffer, pixel_format="bgra"):
+        """
+        Capture the screen or a specified region into `buffer` without going
+        through `screenshot.bgra`, which would allocate a new bytes object.
+        With "yuv420p" the pixels are converted to planar I420, the layout
+        libx264 encodes natively, so FFmpeg has no conversion left to do.
+        The region must then have an even width and height. The buffer must
+        hold exactly one frame of the captured size.
+        :return: Memoryview over the raw pixels inside the buffer.
+        """
+        screenshot = self._sct.grab(self._region)
+        raw = screenshot.raw
+        width, height = screenshot.width, screenshot.height
+        size = get_frame_size(width, height, pixel_format)
+        if size != buffer.size:
+            raise ValueError(
+                f"Captured {width}x{height} {pixel_format} frame needs {size} bytes, "
+                f"the buffer holds {buffer.size}"
+            )
+
+        if pixel_format == "yuv420p":
+            bgra = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+            i420 = np.frombuffer(buffer.data, dtype=np.uint8, count=size).reshape(height * 3 // 2, width)
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2YUV_I420, dst=i420)
+            return buffer.view[:size], "yuv420p"
+
+        buffer.view[:] = raw
+
+        return buffer.view, "bgra"
+
     def cleanup(self):
         """
         Cleanup resources specific to mss.
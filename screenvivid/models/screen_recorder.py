@@ -3,15 +3,24 @@ import io
 import time
 import queue
 import subprocess
+from array import array
 from threading import Thread, Event
 
+import numpy as np
+
 from PIL import Image
-import pyautogui
 from PySide6.QtCore import QObject, Property, Slot, Signal
 
 from screenvivid import config
-from screenvivid.models.utils.cursor import get_cursor_state, CursorLoaderThread
-from screenvivid.models.screen_capture import get_screen_capture_class
+from screenvivid.models.utils.cursor import create_cursor_probe, CursorLoaderThread
+from screenvivid.models.utils.frame_buffer import FramePool, FrameChangeDetector
+from screenvivid.models.utils.events_file import EventsWriter, get_events_path
+from screenvivid.models.utils.mouse_events import MoveTrack, StateTable
+from screenvivid.models.utils.segments import get_segment_args, delete_segments
+from screenvivid.models.utils.pointer import create_pointer_tracker, to_relative, assign_clicks
+from screenvivid.models.utils.matroska import stream_header, frame_header
+from screenvivid.models.utils.timecodes import FrameMapWriter, get_frame_map_path
+from screenvivid.models.screen_capture import get_screen_capture_class, get_frame_size
 from screenvivid.utils.general import (
     generate_video_path, get_os_name, get_ffmpeg_path,
     generate_temp_file, safe_delete
@@ -70,6 +79,70 @@ class ScreenRecorderModel(QObject):
         self._screen_recording_thread.device_pixel_ratio = value
         self.devicePixelRatio.emit()
 
+    @Property(int)
+    def frame_pool_budget(self):
+        return self._screen_recording_thread.frame_pool_budget
+
+    @frame_pool_budget.setter
+    def frame_pool_budget(self, value):
+        self._screen_recording_thread.frame_pool_budget = value
+
+    @Property(str)
+    def frame_pool_policy(self):
+        return self._screen_recording_thread.frame_pool_policy
+
+    @frame_pool_policy.setter
+    def frame_pool_policy(self, value):
+        self._screen_recording_thread.frame_pool_policy = value
+
+    @Property(bool)
+    def variable_frame_rate(self):
+        return self._screen_recording_thread.variable_frame_rate
+
+    @variable_frame_rate.setter
+    def variable_frame_rate(self, value):
+        self._screen_recording_thread.variable_frame_rate = value
+
+    @Property(bool)
+    def skip_unchanged_frames(self):
+        return self._screen_recording_thread.skip_unchanged_frames
+
+    @skip_unchanged_frames.setter
+    def skip_unchanged_frames(self, value):
+        self._screen_recording_thread.skip_unchanged_frames = value
+
+    @Property(int)
+    def segment_duration(self):
+        return self._screen_recording_thread.segment_duration
+
+    @segment_duration.setter
+    def segment_duration(self, value):
+        self._screen_recording_thread.segment_duration = value
+
+    @Property(str)
+    def pixel_format(self):
+        return self._screen_recording_thread.pixel_format
+
+    @pixel_format.setter
+    def pixel_format(self, value):
+        self._screen_recording_thread.pixel_format = value
+
+    @Property(dict)
+    def cpu_times(self):
+        return self._screen_recording_thread.cpu_times
+
+    @Property(int)
+    def unchanged_frames(self):
+        return self._screen_recording_thread.unchanged_frames
+
+    @Property(int)
+    def dropped_frames(self):
+        return self._screen_recording_thread.dropped_frames
+
+    @Property(int)
+    def duplicated_frames(self):
+        return self._screen_recording_thread.duplicated_frames
+
     @Slot()
     def start_recording(self):
         self._screen_recording_thread.set_region(self._region)
@@ -93,7 +166,7 @@ class ScreenRecordingThread:
         self._output_path = output_path
         self._start_delay = start_delay
         self._region = None
-        self._mouse_events = {"move": {}, "click": [], "cursors_map": {}}
+        self._mouse_events = {"move": MoveTrack.empty(), "click": [], "cursors_map": {}}
         self._frame_index = 0
         self._frame_width = None
         self._frame_height = None
@@ -103,11 +176,40 @@ class ScreenRecordingThread:
         self._icc_profile = None
         self._device_pixel_ratio = 1.0
 
-        # Queues for communication between threads
-        self._image_queue = queue.Queue(maxsize=90)  # Buffer 3 seconds for FPS=30
+        # Queues for communication between threads. Captured frames go through
+        # a memory budgeted pool rather than a frame count limited queue
+        self._frame_pool = None
+        self._frame_pool_budget = config.RECORDING_BUFFER_BUDGET_MB
+        self._frame_pool_policy = config.RECORDING_BUFFER_POLICY
         self._frame_index_queue = queue.Queue(maxsize=90)
 
+        # In variable frame rate mode the writer does not pace frames, FFmpeg
+        # stamps each one as it arrives. Frames identical to the previous
+        # capture are not sent at all, the frame map keeps the capture time of
+        # every captured frame index (used by the mouse events) and the video
+        # frame showing it
+        self._variable_frame_rate = config.RECORDING_VARIABLE_FRAME_RATE
+        self._skip_unchanged_frames = config.RECORDING_SKIP_UNCHANGED_FRAMES
+        self._frame_map = FrameMapWriter(get_frame_map_path(self._output_path)) if self._output_path else None
+        self._change_detector = None
+        self._unchanged_frames = 0
+
+        # FFmpeg closes a playable segment every few seconds so a crash only
+        # loses the current one, the editor stitches them once it opened them
+        self._segment_duration = config.RECORDING_SEGMENT_SECONDS
+        self._segmented = False
+
+        # Frames are converted to a layout the encoder takes as is while
+        # capturing, when the capture backend can do it
+        self._pixel_format = config.RECORDING_PIXEL_FORMAT
+        self._capture_pixel_format = "bgra"
+
+        # CPU seconds spent in each stage of the last recording
+        self._cpu_times = {}
+
         self._os_name = get_os_name()
+        # Imported when used, importing pyautogui needs a display
+        import pyautogui
         nonscale_screen_size = pyautogui.size()
         self._screen_size = [
             int(self._device_pixel_ratio * nonscale_screen_size[0]),
@@ -121,14 +223,32 @@ class ScreenRecordingThread:
 
         self._cursor_loader = CursorLoaderThread()
         self._cursor_loader.start()
+        self._cursor_probe = None
         self._prev_cursor_anim_state = {}
 
+        # Pointer moves and clicks are recorded by an input event backend at
+        # their own rate, then resampled at the capture time of every frame
+        self._pointer_tracker = None
+        self._pointer_backend = config.POINTER_TRACKING_BACKEND
+        self._frame_times = array("d")
+        self._frame_indices = array("i")
+        self._cursor_states = array("H")
+        self._anim_steps = array("H")
+        self._state_table = StateTable()
+
+        # Recording metadata and mouse events are streamed to a sidecar file
+        # that the editor opens by path, so they survive a crash
+        self._events = EventsWriter(get_events_path(self._output_path)) if self._output_path else None
+
         # For time tracking
         self._start_time = None
         self._frame_timestamps = queue.Queue(maxsize=90)
 
     @property
     def mouse_events(self):
+        # The editor reads complete recordings from the events file
+        if self._events and self._events.complete:
+            return {"events_path": self._events.path}
         return self._mouse_events
 
     @property
@@ -147,13 +267,126 @@ class ScreenRecordingThread:
     def device_pixel_ratio(self, value):
         self._device_pixel_ratio = value
 
+    @property
+    def frame_pool_budget(self):
+        return self._frame_pool_budget
+
+    @frame_pool_budget.setter
+    def frame_pool_budget(self, value):
+        self._frame_pool_budget = value
+
+    @property
+    def frame_pool_policy(self):
+        return self._frame_pool_policy
+
+    @frame_pool_policy.setter
+    def frame_pool_policy(self, value):
+        self._frame_pool_policy = value
+
+    @property
+    def variable_frame_rate(self):
+        return self._variable_frame_rate
+
+    @variable_frame_rate.setter
+    def variable_frame_rate(self, value):
+        self._variable_frame_rate = value
+
+    @property
+    def skip_unchanged_frames(self):
+        return self._skip_unchanged_frames
+
+    @skip_unchanged_frames.setter
+    def skip_unchanged_frames(self, value):
+        self._skip_unchanged_frames = value
+
+    @property
+    def segment_duration(self):
+        return self._segment_duration
+
+    @segment_duration.setter
+    def segment_duration(self, value):
+        self._segment_duration = value
+
+    @property
+    def pixel_format(self):
+        return self._pixel_format
+
+    @pixel_format.setter
+    def pixel_format(self, value):
+        self._pixel_format = value
+
+    @property
+    def cpu_times(self):
+        return dict(self._cpu_times)
+
+    @property
+    def unchanged_frames(self):
+        return self._unchanged_frames
+
+    @property
+    def dropped_frames(self):
+        return self._frame_pool.dropped_frames if self._frame_pool else 0
+
+    @property
+    def duplicated_frames(self):
+        return self._frame_pool.duplicated_frames if self._frame_pool else 0
+
     def start_recording(self):
         if not self._output_path:
             raise ValueError("Output path is not specified")
 
         self._is_stopped.clear()
+        self._frame_index = 0
+        self._cpu_times = {"capture": 0.0, "compare": 0.0, "mouse": 0.0, "write": 0.0}
+
+        self._mouse_events = {"move": MoveTrack.empty(), "click": [], "cursors_map": {}}
+        self._frame_times = array("d")
+        self._frame_indices = array("i")
+        self._cursor_states = array("H")
+        self._anim_steps = array("H")
+        self._state_table = StateTable()
+        self._prev_cursor_anim_state = {}
+
+        self._pointer_tracker = create_pointer_tracker(self._pointer_backend, config.POINTER_POLL_RATE)
+        self._pointer_tracker.start()
+        # Start from the current position, the pointer may not move at all
+        import pyautogui
+        self._pointer_tracker.log.add_move(time.time(), *pyautogui.position())
+
+        self._events.open({
+            "video": os.path.basename(self._output_path),
+            "region": list(self._region),
+            "device_pixel_ratio": self._device_pixel_ratio,
+            "fps": self._fps,
+            "start_time": time.time(),
+        }, pointer_log=self._pointer_tracker.log)
+
+        # Raw frames are captured straight into preallocated buffers when the
+        # capture backend supports it, the writer recycles them after piping
+        width, height = int(self._region[2]), int(self._region[3])
+        screen_capture = get_screen_capture_class()
+        # yuv420p subsamples pairs of rows and columns, odd sizes are left to
+        # FFmpeg's scale filter
+        is_even = width % 2 == 0 and height % 2 == 0
+        if self._pixel_format in screen_capture.pixel_formats and (is_even or self._pixel_format != "yuv420p"):
+            self._capture_pixel_format = self._pixel_format
+        else:
+            self._capture_pixel_format = "bgra"
+        self._frame_pool = FramePool(
+            budget=self._frame_pool_budget * 1024 * 1024,
+            frame_size=get_frame_size(width, height, self._capture_pixel_format),
+            policy=self._frame_pool_policy,
+            preallocate=screen_capture.supports_buffers
+        )
+        logger.info(
+            f"Frame pool: {self._frame_pool.capacity} buffers, "
+            f"{self._frame_pool_budget} MB, policy {self._frame_pool_policy}"
+        )
 
         # Start FFmpeg process
+        self._segmented = self._segment_duration > 0
+        if self._segmented:
+            delete_segments(self._output_path)
         cmd = self._get_ffmpeg_command()
         logger.info(f"FFmpeg command: {cmd}")
         if self._os_name == "windows":
@@ -164,7 +397,7 @@ class ScreenRecordingThread:
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                bufsize=50*1024*1024,
+                bufsize=0,
                 creationflags=subprocess.CREATE_NO_WINDOW,
                 startupinfo=startupinfo
             )
@@ -174,7 +407,7 @@ class ScreenRecordingThread:
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                bufsize=50*1024*1024,
+                bufsize=0,
             )
 
         # Start all threads
@@ -218,15 +451,50 @@ class ScreenRecordingThread:
         if self._writer_thread:
             self._writer_thread.join()
 
+        if self._pointer_tracker:
+            self._pointer_tracker.stop()
+            self._build_mouse_events()
+            self._pointer_tracker = None
+
+            self._events.flush()
+            self._events.write_track(self._mouse_events["move"])
+            self._events.write_metadata({
+                "icc_profile": self._icc_profile,
+                "frames": len(self._mouse_events["move"]),
+                "complete": True,
+            })
+            self._events.close()
+
         # Close FFmpeg process
         if self._ffmpeg_process and self._ffmpeg_process.poll() is None:
-            self._ffmpeg_process.communicate(b"q")
-            self._ffmpeg_process.wait()
-
+            ffmpeg_cpu_time = self._close_ffmpeg()
+            if ffmpeg_cpu_time is not None:
+                self._cpu_times["ffmpeg"] = ffmpeg_cpu_time
+
+        # Stitching takes longer the longer the recording, the editor opens
+        # the segment list and stitches the segments in the background
+        self._segmented = False
+
+        if self._frame_pool:
+            logger.info(
+                f"Dropped frames: {self._frame_pool.dropped_frames}, "
+                f"duplicated frames: {self._frame_pool.duplicated_frames}, "
+                f"unchanged frames: {self._unchanged_frames}"
+            )
+        if self._cpu_times:
+            logger.info(
+                f"CPU time per stage ({self._capture_pixel_format}): "
+                + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in self._cpu_times.items())
+            )
         logger.info(f"Stopped recording")
 
     def clean(self):
         safe_delete(self._output_path)
+        if self._frame_map:
+            safe_delete(self._frame_map.path)
+        if self._events:
+            safe_delete(self._events.path)
+        delete_segments(self._output_path)
         safe_delete(self._icc_profile)
 
     def _capture_screen(self):
@@ -239,6 +507,9 @@ class ScreenRecordingThread:
         icc_profile_check_tries = 0
         icc_profile_check_max_tries = 3
         screen_capture = get_screen_capture_class()
+        self._unchanged_frames = 0
+        if self._skip_unchanged_frames:
+            self._change_detector = FrameChangeDetector(self._frame_pool)
         try:
             with screen_capture(self._region) as sct:
                 while not self._is_stopped.is_set():
@@ -249,7 +520,26 @@ class ScreenRecordingThread:
                         time.sleep(max(0, next_frame_time - current_time))
                         continue
 
-                    screenshot_bytes, pixel_format = sct.capture()
+                    buffer = self._frame_pool.acquire(timeout=0.5)
+                    if buffer is None:
+                        continue
+
+                    if buffer is FramePool.REPEAT:
+                        # No room left, repeat the last frame to keep the frame clock
+                        frame_time = time.time()
+                        self._frame_pool.put_repeat(frame_time)
+                        self._frame_index_queue.put((self._frame_index, frame_time))
+                        self._frame_index += 1
+                        next_frame_time += target_interval
+                        continue
+
+                    cpu_start = time.thread_time()
+                    if sct.supports_buffers:
+                        screenshot_bytes, pixel_format = sct.capture_into(buffer, self._capture_pixel_format)
+                    else:
+                        screenshot_bytes, pixel_format = sct.capture()
+                    self._cpu_times["capture"] += time.thread_time() - cpu_start
+
                     if (
                         pixel_format in ("jpeg", "png")
                         and not self._icc_profile
@@ -267,8 +557,19 @@ class ScreenRecordingThread:
 
                     # Lưu timestamp của frame
                     frame_time = time.time()
-                    self._image_queue.put((screenshot_bytes, frame_time))
-                    self._frame_index_queue.put(self._frame_index)
+                    cpu_start = time.thread_time()
+                    changed = not self._change_detector or self._change_detector.has_changed(
+                        screenshot_bytes, buffer if sct.supports_buffers else None
+                    )
+                    self._cpu_times["compare"] += time.thread_time() - cpu_start
+                    if not changed:
+                        # Nothing changed on screen, repeat the previous frame
+                        self._frame_pool.release(buffer)
+                        self._frame_pool.put_repeat(frame_time)
+                        self._unchanged_frames += 1
+                    else:
+                        self._frame_pool.put(screenshot_bytes, frame_time, buffer)
+                    self._frame_index_queue.put((self._frame_index, frame_time))
 
                     self._frame_index += 1
                     self._update_fps("capture")
@@ -283,49 +584,94 @@ class ScreenRecordingThread:
         except Exception as e:
             logger.error(f"Screen capture error: {e}")
         finally:
+            if self._change_detector:
+                self._change_detector.reset()
+                self._change_detector = None
             # Signal write thread to stop
-            self._image_queue.put((None, None))
+            self._frame_pool.put_end()
 
     def _write_frames(self):
-        """Thread 3: Write image bytes to FFmpeg stdin with precise timing"""
+        """Thread 3: Write image bytes to FFmpeg stdin with their timestamps.
+
+        Frames are piped in a live Matroska stream, stamped with their capture
+        time in variable frame rate mode and with their place on the fixed
+        clock otherwise. Repeated frames are never piped again: they are
+        recorded in the frame map, or left to FFmpeg to duplicate.
+        """
         logger.info("Started ffmpeg writer")
-        target_interval = 1.0 / self._fps
+        if self._variable_frame_rate:
+            self._frame_map.open()
 
         # Initialize timing variables
         self._start_time = time.time()
         frame_count = 0
-
+        entry_count = 0
+
+        # The last written frame is kept until the next one is written, so it
+        # can end the video when the recording ends on repeats
+        last_bytes = None
+        last_buffer = None
+        last_repeat = None
+        first_frame_time = None
+        last_timestamp = -1
         try:
+            width, height = int(self._region[2]), int(self._region[3])
+            pixel_format = None if self._os_name == "macos" else self._capture_pixel_format
+            self._write_to_ffmpeg(stream_header(width, height, self._fps, pixel_format))
+
             while not self._is_stopped.is_set():
                 try:
                     # Get frame data with timestamp
-                    image_bytes, frame_time = self._image_queue.get(timeout=0.5)
+                    entry = self._frame_pool.get(timeout=0.5)
 
-                    if image_bytes is None:  # Stop signal
+                    if entry is None:  # Stop signal
                         break
 
-                    current_time = time.time()
-
-                    # Calculate ideal time for this frame
-                    ideal_time = self._start_time + (frame_count * target_interval)
+                    if entry.is_repeat and last_bytes is None:
+                        logger.debug("Nothing to repeat before the first frame")
+                        continue
+                    if first_frame_time is None:
+                        first_frame_time = entry.frame_time
+                    entry_index = entry_count
+                    entry_count += 1
+
+                    if entry.is_repeat:
+                        # No need to encode it again, the previous frame just
+                        # stays on screen until the next captured change
+                        if self._variable_frame_rate:
+                            self._frame_map.write(entry.frame_time, frame_count - 1)
+                        else:
+                            last_repeat = entry_index
+                        continue
 
-                    # If we"re running behind, skip the delay
-                    if current_time <= ideal_time:
-                        sleep_time = ideal_time - current_time
-                        if sleep_time > 0:
-                            time.sleep(sleep_time)
+                    if self._variable_frame_rate:
+                        # Capture time in milliseconds, strictly increasing as
+                        # FFmpeg drops frames sharing a timestamp
+                        timestamp = max(round((entry.frame_time - first_frame_time) * 1000), last_timestamp + 1)
+                    else:
+                        timestamp = round(entry_index * 1000 / self._fps)
 
                     # Write frame
                     if self._ffmpeg_process.poll() is None:
-                        self._ffmpeg_process.stdin.write(image_bytes)
-                        self._ffmpeg_process.stdin.flush()
+                        cpu_start = time.thread_time()
+                        self._write_to_ffmpeg(frame_header(timestamp, memoryview(entry.data).nbytes))
+                        self._write_to_ffmpeg(entry.data)
+                        self._cpu_times["write"] += time.thread_time() - cpu_start
+                        if self._variable_frame_rate:
+                            self._frame_map.write(entry.frame_time, frame_count)
                         self._update_fps("writer")
                         frame_count += 1
+                        last_timestamp = timestamp
+                        last_repeat = None
                     else:
                         logger.error("FFmpeg process is not running")
                         break
 
-                    self._image_queue.task_done()
+                    # FFmpeg has consumed the previous frame, recycle its buffer
+                    if last_buffer is not None:
+                        self._frame_pool.release(last_buffer)
+                    last_bytes = entry.data
+                    last_buffer = entry.buffer
 
                 except queue.Empty:
                     continue
@@ -333,51 +679,72 @@ class ScreenRecordingThread:
                     logger.error(f"Frame writing error: {e}")
                     break
 
+            # FFmpeg only duplicates frames up to the next one, the repeats
+            # ending the recording need the last frame written again
+            if last_repeat is not None and self._ffmpeg_process.poll() is None:
+                data = frame_header(round(last_repeat * 1000 / self._fps), memoryview(last_bytes).nbytes)
+                self._write_to_ffmpeg(data)
+                self._write_to_ffmpeg(last_bytes)
+                frame_count += 1
+
+        except Exception as e:
+            logger.error(f"Frame writing error: {e}")
         finally:
+            if self._variable_frame_rate:
+                self._frame_map.close()
             logger.debug(f"FFmpeg writer stopped. Wrote {frame_count} frames")
             actual_duration = time.time() - self._start_time
             actual_fps = frame_count / actual_duration if actual_duration > 0 else 0
             logger.debug(f"Average output FPS: {actual_fps:.2f}")
 
+    def _write_to_ffmpeg(self, data):
+        """Write a whole frame to the unbuffered FFmpeg stdin without copying it"""
+        view = memoryview(data)
+        stdin = self._ffmpeg_process.stdin
+        while view:
+            written = stdin.write(view)
+            view = view[written:]
+
     def _process_mouse_events(self):
-        """Thread 2: Process mouse events using frame_index"""
+        """Thread 2: Track the cursor shape of every captured frame.
+
+        Pointer positions come from the pointer tracker and are resampled when
+        the recording stops.
+        """
         logger.info("Started mouse tracking thread")
+        try:
+            self._cursor_probe = create_cursor_probe()
+        except Exception as e:
+            logger.error(f"Failed to create cursor probe: {e}")
+            self._cursor_probe = None
+
         try:
             last_frame = -1
             while not self._is_stopped.is_set():
                 try:
-                    frame_index = self._frame_index_queue.get(timeout=0.5)
+                    item = self._frame_index_queue.get(timeout=0.5)
 
-                    if frame_index is None:
+                    if item is None:
                         continue
 
+                    frame_index, frame_time = item
                     if frame_index > last_frame:
-                        x, y = pyautogui.position()
-
-                        # Scale by device pixel ratio
-                        x *= self._device_pixel_ratio
-                        y *= self._device_pixel_ratio
-
-                        relative_x = (x - self._region[0]) / self._region[2]
-                        relative_y = (y - self._region[1]) / self._region[3]
-
-                        cursor_state, anim_step = self._get_cursor()
-                        self._mouse_events["move"][frame_index] = (
-                            relative_x,
-                            relative_y,
-                            frame_index,
-                            cursor_state,
-                            anim_step,
-                        )
-
+                        cpu_start = time.thread_time()
+                        cursor_state, anim_step = self._get_cursor(frame_index)
+                        self._frame_times.append(frame_time)
+                        self._frame_indices.append(frame_index)
+                        state = self._state_table.intern(cursor_state)
+                        self._cursor_states.append(state)
+                        self._anim_steps.append(anim_step)
+
+                        self._events.write_states(self._state_table.names)
+                        self._events.add_frame(frame_index, frame_time, state, anim_step)
+                        self._cpu_times["mouse"] += time.thread_time() - cpu_start
                         self._update_fps("mouse")
 
                     last_frame = frame_index
                     self._frame_index_queue.task_done()
 
-                    # Tính toán thời gian sleep
-                    time.sleep(0.001)
-
                 except queue.Empty:
                     continue
                 except Exception as e:
@@ -385,71 +752,132 @@ class ScreenRecordingThread:
                     break
 
         finally:
+            if self._cursor_probe:
+                self._cursor_probe.close()
+                self._cursor_probe = None
             logger.debug("Mouse tracking thread stopped")
 
     def _get_ffmpeg_command(self):
         ffmpeg_path = get_ffmpeg_path()
         width, height = int(self._region[2]), int(self._region[3])
-        adjusted_width = (width + 1) & ~1
-        adjusted_height = (height + 1) & ~1
 
         if self._os_name == "macos":  # macOS
             cmd = [
                 ffmpeg_path,
-                "-f", "image2pipe",
-                "-framerate", str(self._fps),
-                "-vcodec", "mjpeg",  # MJPEG for macOS
+                "-f", "matroska",  # Timestamped MJPEG frames, see _write_frames
                 "-i", "-",
-                "-vf", f"scale={adjusted_width}:{adjusted_height}",
+                *self._get_filter_args(width, height),
                 "-c:v", "h264_videotoolbox",  # Hardware acceleration for macOS
                 "-allow_sw", "1",
                 "-pix_fmt", "yuv420p",
                 "-preset", "fast",
-                "-y",
-                self._output_path
+                *self._get_sync_args(),
+                *self._get_output_args()
             ]
         elif self._os_name == "linux":  # Linux
             cmd = [
                 ffmpeg_path,
-                "-f", "rawvideo",
-                "-framerate", str(self._fps),
-                "-video_size", f"{width}x{height}",  # Explicitly specify video size
-                "-pixel_format", "bgra",  # Use bgra for python-mss
+                "-f", "matroska",  # Timestamped frames, see _write_frames
                 "-i", "-",
-                "-vf", f"scale={adjusted_width}:{adjusted_height}",
+                *self._get_filter_args(width, height),
                 "-c:v", "libx264",
                 "-preset", "ultrafast",
                 "-crf", "23",
-                "-vsync", "1",  # Help maintain sync
-                "-y",  # Overwrite output file if exists
-                self._output_path
+                *self._get_sync_args(),
+                *self._get_output_args()
             ]
         else:  # Windows
             cmd = [
                 ffmpeg_path,
-                "-f", "rawvideo",
-                "-framerate", str(self._fps),
-                "-video_size", f"{width}x{height}",
-                "-pixel_format", "bgra",
+                "-f", "matroska",  # Timestamped frames, see _write_frames
                 "-i", "-",
-                "-vf", f"scale={adjusted_width}:{adjusted_height}",
+                *self._get_filter_args(width, height),
                 "-c:v", "libx264",
                 "-preset", "fast",
                 "-qp", "23",
-                "-vsync", "1",  # Help maintain sync
-                "-y",
-                self._output_path
+                *self._get_sync_args(),
+                *self._get_output_args()
             ]
         return cmd
 
-    def _get_cursor(self):
-        cursor_theme = None
-        if self._os_name in ["linux", "macos"]:
-            cursor_theme = self._cursor_loader.cursor_theme
+    def _get_filter_args(self, width, height):
+        filters = []
+        # H.264 needs even dimensions, the scale filter is a per frame cost
+        # only worth paying when they are not
+        if width % 2 != 0 or height % 2 != 0:
+            # Padding to even sizes stretches by a pixel, pixels stay square
+            filters.append(f"scale={(width + 1) & ~1}:{(height + 1) & ~1},setsar=1")
+        if not self._variable_frame_rate:
+            # Frames missing between two timestamps are repeated ones, the fps
+            # filter duplicates the previous frame in their place
+            filters.append(f"fps={self._fps}")
+        return ["-vf", ",".join(filters)] if filters else []
+
+    def _get_sync_args(self):
+        if self._variable_frame_rate:
+            # Keep the timestamps, in milliseconds rather than input frame
+            # intervals so frames arriving close together aren't dropped
+            return ["-fps_mode", "vfr", "-enc_time_base", "1:1000"]
+        return ["-fps_mode", "cfr"]
+
+    def _close_ffmpeg(self):
+        """
+        Ask FFmpeg to finish and wait for it to exit.
+        :return: CPU seconds FFmpeg used, None where they can't be read.
+        """
+        process = self._ffmpeg_process
+        if not hasattr(os, "wait4"):  # Windows
+            process.communicate(b"q")
+            process.wait()
+            return None
 
-        cursor_state, anim_info = get_cursor_state(cursor_theme)
+        try:
+            process.stdin.write(b"q")
+        except BrokenPipeError:
+            pass
+        process.stdin.close()
+        # FFmpeg writes into a file, read both pipes until it exits so it
+        # never blocks on a full one
+        process.stderr.read()
+        process.stdout.read()
+        # Reap FFmpeg here, unlike getrusage wait4 reports the resources of
+        # this one process
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return usage.ru_utime + usage.ru_stime
+
+    def _get_output_args(self):
+        if self._segmented:
+            return get_segment_args(self._output_path, self._segment_duration)
+        return ["-y", self._output_path]  # Overwrite output file if exists
+
+    def _build_mouse_events(self):
+        """Resample the recorded pointer positions and clicks onto the captured frames"""
+        frame_times = np.frombuffer(self._frame_times, dtype=np.float64)
+        log = self._pointer_tracker.log
+        frame_indices = np.frombuffer(self._frame_indices, dtype=np.int32)
+        xs, ys = to_relative(*log.positions_at(frame_times), self._region, self._device_pixel_ratio)
+        moves = MoveTrack(
+            xs, ys, frame_indices,
+            np.frombuffer(self._cursor_states, dtype=np.uint16),
+            np.frombuffer(self._anim_steps, dtype=np.uint16),
+            self._state_table.names
+        )
+
+        clicks = assign_clicks(log.clicks(), frame_times, frame_indices, self._region, self._device_pixel_ratio)
+
+        self._mouse_events["move"] = moves
+        self._mouse_events["click"] = clicks
+        logger.info(f"Pointer: {len(log)} samples, {len(clicks)} click events for {len(moves)} frames")
+
+    def _get_cursor(self, frame_index):
+        if self._cursor_probe is None:
+            return "arrow", 0
+
+        cursor_state, anim_info = self._cursor_probe.get_cursor_state(self._cursor_loader)
         if self._os_name == "linux" and cursor_state not in self._mouse_events["cursors_map"]:
             self._mouse_events["cursors_map"][cursor_state] = self._cursor_loader.get_cursor(cursor_state)
+            self._events.add_cursor(cursor_state, self._mouse_events["cursors_map"][cursor_state])
 
         # Calculate anim step
         anim_step = 0
@@ -458,7 +886,7 @@ class ScreenRecordingThread:
             if cursor_state not in self._prev_cursor_anim_state:
                 self._prev_cursor_anim_state[cursor_state] = {"frame": -1, "anim_step": 0}
 
-            if self._prev_cursor_anim_state[cursor_state]["frame"] == self._frame_index - 1:
+            if self._prev_cursor_anim_state[cursor_state]["frame"] == frame_index - 1:
                 # The previous frame was the same cursor state
                 prev_anim_step = self._prev_cursor_anim_state[cursor_state]["anim_step"]
                 self._prev_cursor_anim_state[cursor_state]["anim_step"] = (prev_anim_step + 1) % n_steps
@@ -466,7 +894,7 @@ class ScreenRecordingThread:
                 # The previous frame was not the same cursor state. So reset the anim step
                 self._prev_cursor_anim_state[cursor_state]["anim_step"] = 0
 
-            self._prev_cursor_anim_state[cursor_state]["frame"] = self._frame_index
+            self._prev_cursor_anim_state[cursor_state]["frame"] = frame_index
             anim_step = self._prev_cursor_anim_state[cursor_state]["anim_step"]
         return cursor_state, anim_step
 
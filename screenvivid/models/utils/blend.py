@@ -0,0 +1,72 @@
+"""Fixed-point alpha blending kernels shared by the transforms.
+
+Images are uint8 BGR and alphas are uint8 coverages in 0..255 with the same
+number of channels as the image. Products go through OpenCV's saturating
+uint8 arithmetic, which rounds a * b / 255 exactly, so blends stay within one
+level of the float formulas without any float temporaries.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+_local = threading.local()
+
+
+def _scratch(shape):
+    """uint8 scratch buffer of `shape`, reused per thread."""
+    buffers = getattr(_local, "buffers", None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+    buffer = buffers.get(shape)
+    if buffer is None:
+        # Shapes change with the layout, keep the cache small
+        if len(buffers) > 32:
+            buffers.clear()
+        buffer = buffers[shape] = np.empty(shape, dtype=np.uint8)
+    return buffer
+
+
+def _into(result, out):
+    # OpenCV allocates a new array when `dst` cannot be written in place
+    if out is None:
+        return result
+    if result is not out:
+        np.copyto(out, result)
+    return out
+
+
+def to_alpha(alpha, channels=3):
+    """Convert a float alpha in 0..1 to a uint8 coverage with `channels` channels."""
+    alpha = np.rint(np.asarray(alpha, dtype=np.float32) * 255).astype(np.uint8)
+    if alpha.ndim == 3:
+        alpha = alpha[..., 0]
+    return np.repeat(alpha[..., np.newaxis], channels, axis=2)
+
+
+def premultiply(bgra):
+    """Split a BGRA image into premultiplied BGR and its inverse coverage (255 - alpha)."""
+    alpha = np.repeat(bgra[..., 3:4], 3, axis=2)
+    premultiplied = cv2.multiply(np.ascontiguousarray(bgra[..., :3]), alpha, scale=1 / 255)
+    return premultiplied, 255 - alpha
+
+
+def multiply(image, alpha, out=None):
+    """image * alpha / 255."""
+    return _into(cv2.multiply(image, alpha, dst=out, scale=1 / 255), out)
+
+
+def blend(background, foreground, alpha, out=None, inverse_alpha=None):
+    """foreground * alpha + background * (1 - alpha)."""
+    if inverse_alpha is None:
+        inverse_alpha = 255 - alpha
+    weighted = cv2.multiply(foreground, alpha, dst=_scratch(foreground.shape), scale=1 / 255)
+    result = cv2.multiply(background, inverse_alpha, dst=out, scale=1 / 255)
+    return _into(cv2.add(result, weighted, dst=result), out)
+
+
+def blend_premultiplied(background, premultiplied, inverse_alpha, out=None):
+    """premultiplied + background * inverse_alpha / 255, see premultiply."""
+    result = cv2.multiply(background, inverse_alpha, dst=out, scale=1 / 255)
+    return _into(cv2.add(result, premultiplied, dst=result), out)
+
@@ -1,2 +1,2 @@
 from .cursor import CursorLoaderThread
-from .cursor import get_cursor_state
\ No newline at end of file
+from .cursor import get_cursor_state, create_cursor_probe
\ No newline at end of file
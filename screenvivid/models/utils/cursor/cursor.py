@@ -1,9 +1,11 @@
 import platform
 import time
 
+import numpy as np
+
 from PySide6.QtCore import Property, QThread
 
-from .loader import CursorLoader
+from .loader import CursorLoader, build_cursor_index, get_cursor_image_key
 from screenvivid.utils.logging import logger
 
 class CursorLoaderThread(QThread):
@@ -15,6 +17,10 @@ class CursorLoaderThread(QThread):
     def cursor_theme(self):
         return self._cursor_loader.cursor_theme
 
+    @property
+    def cursor_index(self):
+        return self._cursor_loader.cursor_index
+
     def get_cursor(self, state):
         """Return a dictionary of the cursor theme with the cursor state
           (arrow, ibeam, etc) corresponding to the cursor scale.
@@ -64,53 +70,101 @@ def get_cursor_state_windows():
     logger.debug(f"{state} cursor found.")
     return state, anim_info
 
-def get_cursor_state_linux(cursor_theme):
-    from Xlib import display
-    import numpy as np
-    from Xlib.ext import xfixes
-
-    d = display.Display()
-    if not d.has_extension('XFIXES'):
-        logger.error('XFIXES extension not supported.')
-        return
-
-    xfixes_version = d.xfixes_query_version()
-
-    root = d.screen().root
+class CursorProbe:
+    """Looks up the current cursor state, one call per recorded frame."""
 
-    image = d.xfixes_get_cursor_image(root)
-    cursor_image = image.cursor_image
-    width, height = image.width, image.height
+    def get_cursor_state(self, cursor_loader):
+        return get_cursor_state(cursor_loader.cursor_theme)
 
-    cursor_data = np.array(cursor_image, dtype=np.uint32).reshape(height, width)
+    def close(self):
+        pass
 
-    bgra = np.zeros((height, width, 4), dtype=np.uint8)
-    bgra[..., 0] = cursor_data & 0xFF          # Blue
-    bgra[..., 1] = (cursor_data >> 8) & 0xFF   # Green
-    bgra[..., 2] = (cursor_data >> 16) & 0xFF  # Red
-    bgra[..., 3] = (cursor_data >> 24) & 0xFF  # Alpha
+class LinuxCursorProbe(CursorProbe):
+    """Cursor probe keeping a single X connection for the whole recording.
 
-    anim_info = {
-        "is_anim": False,
-        "n_steps": 1,
-    }
-
-    # Match the rgba image with the 24x24 image in the cursor theme
+    XFIXES reports cursor changes with CursorNotify events, so the cursor image
+    is only fetched and identified when it actually changed. Images are matched
+    through the content index built by LinuxCursorLoader.
+    """
     AVAILABLE_ANIM_CURSORS = ["wait", "progress", "watch"]
-    if width in cursor_theme:
-        for cursor_state, cursors  in cursor_theme[width].items():
-            total_cursors = len(cursors)
-            for cursor_info in cursors:
-                if np.array_equal(bgra, cursor_info["image"]):
-                    logger.debug(f"{cursor_state} cursor found.")
-                    if cursor_state in AVAILABLE_ANIM_CURSORS:
-                        logger.debug(f"{cursor_state} cursor is an animation cursor.")
-                        anim_info["is_anim"] = True
-                        anim_info["n_steps"] = total_cursors
-                    return cursor_state, anim_info
 
-    logger.debug(f"No cursor found fallback to arrow.")
-    return "arrow", anim_info
+    def __init__(self):
+        from Xlib import display
+        from Xlib.ext import xfixes
+
+        self._display = display.Display()
+        if not self._display.has_extension('XFIXES'):
+            self._display.close()
+            raise RuntimeError('XFIXES extension not supported.')
+
+        self._display.xfixes_query_version()
+        self._root = self._display.screen().root
+        self._display.xfixes_select_cursor_input(self._root, xfixes.XFixesDisplayCursorNotifyMask)
+        self._display.flush()
+
+        self._cursor_notify = self._display.extension_event.DisplayCursorNotify
+        self._cursor_serial = None
+        self._cursor_state = ("arrow", {"is_anim": False, "n_steps": 1})
+
+    def _cursor_changed(self):
+        changed = self._cursor_serial is None
+        while self._display.pending_events():
+            event = self._display.next_event()
+            if (event.type, getattr(event, "sub_code", None)) == self._cursor_notify:
+                changed = True
+        return changed
+
+    def get_cursor_state(self, cursor_loader):
+        return self.lookup(cursor_loader.cursor_index)
+
+    def lookup(self, cursor_index):
+        """Cursor state of the current cursor image, identified through `cursor_index`."""
+        if not self._cursor_changed():
+            return self._cursor_state
+
+        image = self._display.xfixes_get_cursor_image(self._root)
+        if image.cursor_serial == self._cursor_serial:
+            return self._cursor_state
+
+        # Each ARGB pixel stored little endian is the BGRA layout of the theme images
+        data = np.asarray(image.cursor_image, dtype="<u4").tobytes()
+        key = get_cursor_image_key(image.width, image.height, data)
+
+        anim_info = {
+            "is_anim": False,
+            "n_steps": 1,
+        }
+        if key in cursor_index:
+            cursor_state, n_steps = cursor_index[key]
+            logger.debug(f"{cursor_state} cursor found.")
+            if cursor_state in self.AVAILABLE_ANIM_CURSORS:
+                logger.debug(f"{cursor_state} cursor is an animation cursor.")
+                anim_info["is_anim"] = True
+                anim_info["n_steps"] = n_steps
+        else:
+            logger.debug(f"No cursor found fallback to arrow.")
+            cursor_state = "arrow"
+
+        self._cursor_state = (cursor_state, anim_info)
+        # The theme may still be loading, look the image up again next time
+        self._cursor_serial = image.cursor_serial if cursor_index else None
+        return self._cursor_state
+
+    def close(self):
+        self._display.close()
+
+def create_cursor_probe():
+    if platform.system() == "Linux":
+        return LinuxCursorProbe()
+    return CursorProbe()
+
+def get_cursor_state_linux(cursor_theme):
+    """One off lookup of the cursor state, recordings keep a LinuxCursorProbe instead."""
+    probe = LinuxCursorProbe()
+    try:
+        return probe.lookup(build_cursor_index(cursor_theme))
+    finally:
+        probe.close()
 
 def get_cursor_state_macos(cursor_theme):
     import AppKit
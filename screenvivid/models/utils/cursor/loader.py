@@ -1,5 +1,6 @@
 import os
 import struct
+import hashlib
 import subprocess
 from abc import ABCMeta, abstractmethod
 from typing import Tuple, Any, List
@@ -42,6 +43,13 @@ class CursorLoader:
         else:
             return None
 
+    @property
+    def cursor_index(self):
+        if self.os_name == "linux" and self._loader:
+            return self._loader.cursor_index
+        else:
+            return {}
+
 class MacOSCursorLoader:
     def __init__(self):
         self.cursor_theme = {}
@@ -86,6 +94,7 @@ class MacOSCursorLoader:
 class LinuxCursorLoader:
     def __init__(self):
         self.cursor_theme = {}
+        self.cursor_index = {}
         self.base_size = 32
         self.sizes = [24, 32, 48, 64, 96]
         self.states = [
@@ -183,6 +192,7 @@ class LinuxCursorLoader:
                         "offset": cursor_offset
                     })
 
+        self.cursor_index = build_cursor_index(self.cursor_theme)
         return self.cursor_theme
 
     def get_cursor(self, state):
@@ -198,6 +208,25 @@ class LinuxCursorLoader:
                 cursor_theme[scale_str] = self.cursor_theme.get(size, {}).get(state, [])
         return cursor_theme
 
+def get_cursor_image_key(width, height, data):
+    """Content key of a BGRA cursor image given as raw bytes."""
+    return width, height, hashlib.blake2b(data, digest_size=16).digest()
+
+def build_cursor_index(cursor_theme):
+    """Map the content key of every image in the theme to its cursor state and
+    the number of images (animation steps) of that state.
+    """
+    cursor_index = {}
+    for cursors_by_state in cursor_theme.values():
+        for state, cursors in cursors_by_state.items():
+            for cursor_info in cursors:
+                image = cursor_info["image"]
+                height, width = image.shape[:2]
+                key = get_cursor_image_key(width, height, image.tobytes())
+                # Keep the first state when several states share an image
+                cursor_index.setdefault(key, (state, len(cursors)))
+    return cursor_index
+
 class BaseParser(metaclass=ABCMeta):
     blob: bytes
 
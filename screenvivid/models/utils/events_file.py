@@ -0,0 +1,324 @@
+import os
+import json
+import mmap
+import struct
+from functools import cached_property
+
+import numpy as np
+
+from screenvivid.models.utils.cursor.loader import get_cursor_image_key
+from screenvivid.models.utils.mouse_events import MoveTrack
+from screenvivid.models.utils.pointer import resample_positions, to_relative, assign_clicks
+from screenvivid.utils.logging import logger
+
+# File layout: a header, then chunks of (4 byte tag, u32 payload length,
+# payload padded to 8 bytes). Chunks are appended while recording, so a file
+# cut short by a crash is still readable up to its last complete chunk.
+MAGIC = b"SVEV"
+VERSION = 2
+HEADER = struct.Struct("<4sHH")
+CHUNK_HEADER = struct.Struct("<4sI")
+CURSOR_IMAGE_HEADER = struct.Struct("<16sHHHH")
+
+META = b"META"    # JSON recording metadata, later chunks update earlier ones
+STATE = b"STAT"   # Name of the next cursor state code
+FRAMES = b"FRAM"  # Capture time and cursor of captured frames
+POINTER = b"PTRM" # Raw pointer samples
+CLICKS = b"CLCK"  # Raw clicks
+IMAGE = b"CIMG"   # A BGRA cursor image, stored once per content
+CURSOR = b"CURS"  # JSON cursor state entry referencing images
+TRACK = b"TRAK"   # Cursor track resampled on the captured frames, written on stop
+
+FRAME_DTYPE = np.dtype([("frame", "<i4"), ("time", "<f8"), ("state", "<u2"), ("anim_step", "<u2")])
+POINTER_DTYPE = np.dtype([("time", "<f8"), ("x", "<f8"), ("y", "<f8")])
+CLICK_DTYPE = np.dtype([("time", "<f8"), ("x", "<f8"), ("y", "<f8"), ("button", "u1"), ("pressed", "u1")])
+TRACK_DTYPE = np.dtype([("frame", "<i4"), ("x", "<f8"), ("y", "<f8"), ("state", "<u2"), ("anim_step", "<u2")])
+
+# Version 1 stored positions as float32, which is off by a pixel once scaled
+# to the frame size
+V1_DTYPES = {
+    POINTER: np.dtype([("time", "<f8"), ("x", "<f4"), ("y", "<f4")]),
+    CLICKS: np.dtype([("time", "<f8"), ("x", "<f4"), ("y", "<f4"), ("button", "u1"), ("pressed", "u1")]),
+    TRACK: np.dtype([("frame", "<i4"), ("x", "<f4"), ("y", "<f4"), ("state", "<u2"), ("anim_step", "<u2")]),
+}
+
+
+def get_events_path(video_path):
+    return os.path.splitext(video_path)[0] + ".events"
+
+
+def _padding(length):
+    return -length % 8
+
+
+class EventsWriter:
+    """Streams the recording metadata, cursor events and cursor images next to the video.
+
+    Frame records are buffered and written in chunks, together with the
+    pointer samples recorded since the previous chunk.
+    """
+
+    def __init__(self, path, frames_per_chunk=32):
+        self._path = path
+        self._file = None
+        self._frames = np.zeros(frames_per_chunk, dtype=FRAME_DTYPE)
+        self._frame_count = 0
+        self._states_written = 0
+        self._images_written = set()
+        self._pointer_log = None
+        self._pointer_written = 0
+        self._clicks_written = 0
+        self._complete = False
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def complete(self):
+        """Whether the file was closed after a full recording."""
+        return self._complete
+
+    def open(self, metadata, pointer_log=None):
+        self._file = open(self._path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0))
+        self._frame_count = 0
+        self._states_written = 0
+        self._images_written = set()
+        self._pointer_log = pointer_log
+        self._pointer_written = 0
+        self._clicks_written = 0
+        self._complete = False
+        self.write_metadata(metadata)
+
+    def write_metadata(self, metadata):
+        self._write_chunk(META, json.dumps(metadata).encode("utf-8"))
+
+    def write_states(self, state_names):
+        """Write the cursor state names not written yet, in code order."""
+        for name in state_names[self._states_written:]:
+            self._write_chunk(STATE, name.encode("utf-8"))
+        self._states_written = len(state_names)
+
+    def add_frame(self, frame_index, frame_time, state, anim_step):
+        record = self._frames[self._frame_count]
+        record["frame"] = frame_index
+        record["time"] = frame_time
+        record["state"] = state
+        record["anim_step"] = anim_step
+        self._frame_count += 1
+        if self._frame_count == len(self._frames):
+            self.flush()
+
+    def add_cursor(self, state, cursors):
+        """Write the images of a cursor state, given as {scale: [{"image", "offset"}]}."""
+        entry = {"state": state, "scales": {}}
+        for scale, cursor_infos in (cursors or {}).items():
+            images = []
+            for cursor_info in cursor_infos:
+                image = np.ascontiguousarray(cursor_info["image"], dtype=np.uint8)
+                key = self._write_image(image)
+                images.append([key.hex(), list(cursor_info["offset"])])
+            entry["scales"][scale] = images
+        self._write_chunk(CURSOR, json.dumps(entry).encode("utf-8"))
+
+    def _write_image(self, image):
+        height, width = image.shape[:2]
+        channels = image.shape[2] if image.ndim == 3 else 1
+        data = image.tobytes()
+        key = get_cursor_image_key(width, height, data)[2]
+        if key not in self._images_written:
+            header = CURSOR_IMAGE_HEADER.pack(key, height, width, channels, 0)
+            self._write_chunk(IMAGE, header + data)
+            self._images_written.add(key)
+        return key
+
+    def write_track(self, move_track):
+        track = np.zeros(len(move_track), dtype=TRACK_DTYPE)
+        for name in TRACK_DTYPE.names:
+            track[name] = getattr(move_track, name)
+        self._write_chunk(TRACK, track.tobytes())
+
+    def flush(self):
+        if self._file is None:
+            return
+
+        if self._frame_count:
+            self._write_chunk(FRAMES, self._frames[:self._frame_count].tobytes())
+            self._frame_count = 0
+
+        if self._pointer_log is not None:
+            times, xs, ys = self._pointer_log.move_columns(self._pointer_written)
+            if len(times):
+                samples = np.zeros(len(times), dtype=POINTER_DTYPE)
+                samples["time"], samples["x"], samples["y"] = times, xs, ys
+                self._write_chunk(POINTER, samples.tobytes())
+                self._pointer_written += len(times)
+
+            clicks = self._pointer_log.clicks(self._clicks_written)
+            if clicks:
+                self._write_chunk(CLICKS, np.array(clicks, dtype=CLICK_DTYPE).tobytes())
+                self._clicks_written += len(clicks)
+
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self, complete=True):
+        if self._file is None:
+            return
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._complete = complete
+
+    def _write_chunk(self, tag, payload):
+        if self._file is None:
+            return
+        try:
+            self._file.write(CHUNK_HEADER.pack(tag, len(payload)))
+            self._file.write(payload)
+            self._file.write(bytes(_padding(len(payload))))
+        except OSError as e:
+            logger.error(f"Failed to write recording events {self._path}: {e}")
+            self._file.close()
+            self._file = None
+
+
+class EventsFile:
+    """Read side of the recording events file.
+
+    The file is memory mapped and only its chunk headers are read when it is
+    opened. Cursor tracks and images are decoded the first time they are
+    used, into arrays of their own, so they stay valid once the file is
+    closed. Close it when done, an open mapping keeps the file from being
+    deleted on Windows.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _ = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version > VERSION:
+            raise ValueError(f"Not a recording events file: {path}")
+        self._version = version
+        self._chunks = self._scan()
+
+    @classmethod
+    def open(cls, path):
+        """Return the events file at `path`, or None if it is missing or invalid."""
+        if not path or not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Failed to open recording events {path}: {e}")
+            return None
+
+    @property
+    def path(self):
+        return self._path
+
+    def close(self):
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _scan(self):
+        chunks = {}
+        offset = HEADER.size
+        size = len(self._data)
+        while offset + CHUNK_HEADER.size <= size:
+            tag, length = CHUNK_HEADER.unpack_from(self._data, offset)
+            start = offset + CHUNK_HEADER.size
+            if start + length > size:
+                logger.warning(f"Recording events {self._path} end with a truncated chunk")
+                break
+            chunks.setdefault(tag, []).append((start, length))
+            offset = start + length + _padding(length)
+        return chunks
+
+    def _payloads(self, tag):
+        return [memoryview(self._data)[start:start + length] for start, length in self._chunks.get(tag, [])]
+
+    def _records(self, tag, dtype):
+        if self._version == 1:
+            dtype = V1_DTYPES.get(tag, dtype)
+        arrays = [np.frombuffer(payload, dtype=dtype) for payload in self._payloads(tag)]
+        if not arrays:
+            return np.empty(0, dtype=dtype)
+        if len(arrays) == 1:
+            return arrays[0].copy()
+        return np.concatenate(arrays)
+
+    @cached_property
+    def metadata(self):
+        metadata = {}
+        for payload in self._payloads(META):
+            metadata.update(json.loads(bytes(payload).decode("utf-8")))
+        return metadata
+
+    @property
+    def complete(self):
+        return bool(self.metadata.get("complete", False))
+
+    @cached_property
+    def state_names(self):
+        return [bytes(payload).decode("utf-8") for payload in self._payloads(STATE)]
+
+    @cached_property
+    def frames(self):
+        return self._records(FRAMES, FRAME_DTYPE)
+
+    @cached_property
+    def move_track(self):
+        track = self._records(TRACK, TRACK_DTYPE)
+        if len(track):
+            return MoveTrack(
+                track["x"], track["y"], track["frame"],
+                track["state"], track["anim_step"], self.state_names
+            )
+
+        # Recording did not stop cleanly, resample the raw pointer samples
+        frames = self.frames
+        if not len(frames):
+            return MoveTrack.empty()
+        pointer = self._records(POINTER, POINTER_DTYPE)
+        xs, ys = resample_positions(
+            frames["time"], pointer["time"],
+            pointer["x"].astype(np.float64, copy=False), pointer["y"].astype(np.float64, copy=False)
+        )
+        xs, ys = to_relative(xs, ys, self.metadata["region"], self.metadata.get("device_pixel_ratio", 1.0))
+        return MoveTrack(xs, ys, frames["frame"], frames["state"], frames["anim_step"], self.state_names)
+
+    @cached_property
+    def clicks(self):
+        clicks = self._records(CLICKS, CLICK_DTYPE)
+        frames = self.frames
+        return assign_clicks(
+            clicks.tolist(), frames["time"], frames["frame"],
+            self.metadata["region"], self.metadata.get("device_pixel_ratio", 1.0)
+        )
+
+    @cached_property
+    def cursors_map(self):
+        images = {}
+        for payload in self._payloads(IMAGE):
+            key, height, width, channels, _ = CURSOR_IMAGE_HEADER.unpack_from(payload)
+            data = payload[CURSOR_IMAGE_HEADER.size:]
+            images[key.hex()] = np.frombuffer(data, dtype=np.uint8).reshape(height, width, channels).copy()
+
+        cursors_map = {}
+        for payload in self._payloads(CURSOR):
+            entry = json.loads(bytes(payload).decode("utf-8"))
+            cursors_map[entry["state"]] = {
+                scale: [{"image": images[key], "offset": tuple(offset)} for key, offset in cursor_infos]
+                for scale, cursor_infos in entry["scales"].items()
+            }
+        return cursors_map
@@ -0,0 +1,189 @@
+import queue
+import threading
+from collections import deque
+
+# Policies applied when the pool runs out of room for a new frame
+BLOCK = "block"                    # Wait for the writer to free a buffer
+DROP_OLDEST = "drop-oldest"        # Discard the pixels of the oldest queued frame
+DUPLICATE_LAST = "duplicate-last"  # Repeat the previous frame instead of capturing
+POLICIES = (BLOCK, DROP_OLDEST, DUPLICATE_LAST)
+
+# The writer holds one buffer, the capture fills one, the change detector keeps
+# the previous capture and at least one is queued
+MIN_BUFFERS = 4
+
+
+class FrameBuffer:
+    """A reusable slot holding one frame, preallocated for raw frames."""
+    __slots__ = ("index", "data", "view", "refs")
+
+    def __init__(self, index, size=0):
+        self.index = index
+        self.refs = 0
+        self.data = bytearray(size) if size else None
+        self.view = memoryview(self.data) if size else None
+
+    @property
+    def size(self):
+        return len(self.data) if self.data is not None else 0
+
+
+class FrameEntry:
+    """A queued frame. `data` is None when the previous frame should be repeated."""
+    __slots__ = ("data", "frame_time", "buffer")
+
+    def __init__(self, data, frame_time, buffer=None):
+        self.data = data
+        self.frame_time = frame_time
+        self.buffer = buffer
+
+    @property
+    def is_repeat(self):
+        return self.data is None
+
+
+class FramePool:
+    """Memory budgeted set of frame buffers shared by the capture and writer threads.
+
+    The capture thread acquires a free buffer, fills it and queues it. The writer
+    takes queued frames in order and releases each buffer once FFmpeg has its
+    bytes. When every buffer is in use the pool applies its policy instead of
+    growing, so memory use stays within `budget` bytes. Frames that lose their
+    pixels are queued as repeats so the frame timeline stays aligned.
+    """
+
+    REPEAT = object()
+
+    def __init__(self, budget, frame_size, policy=DROP_OLDEST, preallocate=True):
+        if frame_size <= 0:
+            raise ValueError("Frame size must be positive")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown frame pool policy: {policy}")
+
+        capacity = max(MIN_BUFFERS, int(budget // frame_size))
+        buffer_size = frame_size if preallocate else 0
+
+        self._frame_size = frame_size
+        self._policy = policy
+        self._buffers = [FrameBuffer(i, buffer_size) for i in range(capacity)]
+        self._free = list(range(capacity))
+        self._pending = deque()
+        self._condition = threading.Condition()
+
+        self.dropped_frames = 0
+        self.duplicated_frames = 0
+
+    @property
+    def frame_size(self):
+        return self._frame_size
+
+    @property
+    def capacity(self):
+        return len(self._buffers)
+
+    @property
+    def policy(self):
+        return self._policy
+
+    def acquire(self, timeout=None):
+        """Return a free buffer for the next frame.
+
+        Returns `FramePool.REPEAT` when the pool is full and the policy is to
+        duplicate the last frame, or None if no buffer was freed in time.
+        """
+        with self._condition:
+            if not self._free:
+                if self._policy == DUPLICATE_LAST:
+                    self.duplicated_frames += 1
+                    return self.REPEAT
+                if self._policy == DROP_OLDEST:
+                    buffer = self._drop_oldest()
+                    if buffer is not None:
+                        return buffer
+
+            if not self._condition.wait_for(lambda: self._free, timeout=timeout):
+                return None
+            buffer = self._buffers[self._free.pop()]
+            buffer.refs = 1
+            return buffer
+
+    def _drop_oldest(self):
+        for entry in self._pending:
+            # Buffers still referenced elsewhere can't be reused for capture
+            if entry.buffer is not None and entry.buffer.refs == 1:
+                buffer = entry.buffer
+                entry.data = None
+                entry.buffer = None
+                self.dropped_frames += 1
+                return buffer
+        return None
+
+    def retain(self, buffer):
+        """Keep a buffer from being recycled until it is released once more."""
+        with self._condition:
+            buffer.refs += 1
+
+    def release(self, buffer):
+        with self._condition:
+            buffer.refs -= 1
+            if buffer.refs == 0:
+                self._free.append(buffer.index)
+                self._condition.notify_all()
+
+    def put(self, data, frame_time, buffer=None):
+        with self._condition:
+            self._pending.append(FrameEntry(data, frame_time, buffer))
+            self._condition.notify_all()
+
+    def put_repeat(self, frame_time):
+        self.put(None, frame_time)
+
+    def put_end(self):
+        with self._condition:
+            self._pending.append(None)
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """Return the oldest queued frame, or None once the capture has ended.
+
+        Raises queue.Empty if nothing was queued in time.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._pending, timeout=timeout):
+                raise queue.Empty
+            return self._pending.popleft()
+
+
+class FrameChangeDetector:
+    """Tells whether a captured frame differs from the previous one.
+
+    Raw frames are compared byte for byte against the previous capture, which
+    stays retained in the pool instead of being copied. Comparing two buffers
+    is a plain memcmp and is cheaper than hashing them.
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._previous_data = None
+        self._previous_buffer = None
+
+    def has_changed(self, data, buffer=None):
+        if buffer is not None:
+            if self._previous_buffer is not None and buffer.data == self._previous_buffer.data:
+                return False
+            if self._previous_buffer is not None:
+                self._pool.release(self._previous_buffer)
+            self._pool.retain(buffer)
+            self._previous_buffer = buffer
+            return True
+
+        if self._previous_data is not None and data == self._previous_data:
+            return False
+        self._previous_data = data
+        return True
+
+    def reset(self):
+        if self._previous_buffer is not None:
+            self._pool.release(self._previous_buffer)
+        self._previous_buffer = None
+        self._previous_data = None
@@ -0,0 +1,134 @@
+import threading
+from collections import OrderedDict
+
+from screenvivid.models.utils.frame_reader import FrameReader
+from screenvivid.utils.logging import logger
+
+
+class FrameCache:
+    """Thread safe LRU cache of decoded frames, bounded by their size in bytes."""
+
+    def __init__(self, budget_mb=512):
+        self._budget = int(budget_mb * 1024 * 1024)
+        self._frames = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @property
+    def size(self):
+        return self._size
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __contains__(self, key):
+        return key in self._frames
+
+    def get(self, key):
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+            return frame
+
+    def put(self, key, frame):
+        if frame.nbytes > self._budget:
+            return
+        with self._lock:
+            old = self._frames.pop(key, None)
+            if old is not None:
+                self._size -= old.nbytes
+            self._frames[key] = frame
+            self._size += frame.nbytes
+            while self._size > self._budget:
+                _, evicted = self._frames.popitem(last=False)
+                self._size -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._size = 0
+
+
+class FrameReadAhead:
+    """Decodes the frames around the playhead into a FrameCache on its own thread.
+
+    The thread has its own reader, frames are decoded forward from a little
+    behind the playhead so stepping back is served from the cache too. The
+    window is limited to what the cache can hold.
+    """
+
+    def __init__(self, path, cache, frame_map=None, keyframes=None, frame_times=None, ahead=30, behind=30):
+        self._path = path
+        self._frame_map = frame_map
+        self._keyframes = keyframes
+        self._frame_times = frame_times
+        self._cache = cache
+        self._ahead = ahead
+        self._behind = behind
+        self._playhead = None
+        self._condition = threading.Condition()
+        self._is_stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._is_stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._is_stopped.set()
+        with self._condition:
+            self._condition.notify()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def request(self, index):
+        """Move the playhead to a captured frame index."""
+        with self._condition:
+            if index != self._playhead:
+                self._playhead = index
+                self._condition.notify()
+
+    def _window(self, reader, playhead, frame_bytes):
+        # Half the cache is left to frames shown but no longer around the playhead
+        max_frames = max(1, self._cache.budget // max(frame_bytes, 1) // 2)
+        behind = min(self._behind, max_frames // 3)
+        ahead = min(self._ahead, max_frames - behind)
+        start = reader.video_frame_index(max(playhead - behind, 0))
+        end = reader.video_frame_index(min(playhead + ahead, reader.total_frames - 1))
+        return start, end
+
+    def _run(self):
+        reader = FrameReader(self._path, self._frame_map, self._keyframes, self._frame_times)
+        frame_bytes = reader.frame_width * reader.frame_height * 3
+        try:
+            while not self._is_stopped.is_set():
+                with self._condition:
+                    while self._playhead is None and not self._is_stopped.is_set():
+                        self._condition.wait()
+                    playhead = self._playhead
+                    self._playhead = None
+                if self._is_stopped.is_set():
+                    break
+
+                start, end = self._window(reader, playhead, frame_bytes)
+                for video_frame in range(start, end + 1):
+                    # Start over around a new playhead
+                    if self._is_stopped.is_set() or self._playhead is not None:
+                        break
+                    if (self._path, video_frame) in self._cache:
+                        continue
+                    ret, frame = reader.read_video_frame(video_frame)
+                    if not ret:
+                        break
+                    self._cache.put((self._path, video_frame), frame)
+        except Exception as e:
+            logger.error(f"Frame read ahead error: {e}")
+        finally:
+            reader.release()
@@ -0,0 +1,165 @@
+import cv2
+import numpy as np
+
+from screenvivid.models.utils.segments import count_listed_frames
+
+
+class FrameReader:
+    """Random access reader over the frames of a recording.
+
+    Frame indices are captured frame indices. Recordings that skipped
+    unchanged frames carry a frame map telling which video frame shows each
+    captured frame; without one both are the same. Reading the same video frame
+    again reuses the last decoded frame. With a keyframe index, jumps forward
+    keep decoding from the current position unless a seek, which restarts
+    decoding from the keyframe before the target, decodes fewer frames.
+
+    Recordings with a frame map are variable frame rate, where OpenCV misses
+    when seeking to a frame number by its time at the average frame rate.
+    They are seeked by the presentation time of the keyframe instead and the
+    frame landed on is looked up by its time. Until the frame times are known
+    they are only rewound to the start.
+
+    Segment lists of recordings not stitched yet can not be seeked at all,
+    they are reopened to rewind.
+    """
+
+    def __init__(self, path, frame_map=None, keyframes=None, frame_times=None):
+        self.path = path
+        self.video = cv2.VideoCapture(path)
+        self._frame_map = frame_map
+        self._keyframes = keyframes
+        self._frame_times = frame_times
+        self._position = 0
+        self._last_video_frame = None
+        self._last_frame = None
+
+        self.fps = int(self.video.get(cv2.CAP_PROP_FPS))
+        self.frame_width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.frame_height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.video_frames = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Segment lists do not know their length, their segments do
+        self._is_segment_list = path.endswith(".ffconcat")
+        if self._is_segment_list:
+            self.video_frames = count_listed_frames(path)
+
+        # Frames a seek costs on top of decoding from the keyframe, decoding
+        # this many frames ahead is cheaper than seeking
+        self._max_skip = max(1, self.fps)
+
+    @property
+    def frame_map(self):
+        return self._frame_map
+
+    @property
+    def total_frames(self):
+        if self._frame_map is not None:
+            return len(self._frame_map)
+        return self.video_frames
+
+    def isOpened(self):
+        return self.video.isOpened()
+
+    @property
+    def keyframes(self):
+        return self._keyframes
+
+    @keyframes.setter
+    def keyframes(self, keyframes):
+        self._keyframes = keyframes
+
+    @property
+    def frame_times(self):
+        return self._frame_times
+
+    @frame_times.setter
+    def frame_times(self, frame_times):
+        self._frame_times = frame_times
+
+    def keyframe_before(self, video_frame):
+        """Return the last keyframe at or before a video frame, assuming one if unknown."""
+        if self._keyframes is None or not len(self._keyframes):
+            return video_frame
+        i = np.searchsorted(self._keyframes, video_frame, side="right") - 1
+        return int(self._keyframes[max(i, 0)])
+
+    def _should_seek(self, video_frame):
+        if video_frame < self._position:
+            return True
+        if self._is_segment_list or (self._frame_map is not None and self._frame_times is None):
+            return False
+        return self._position < self.keyframe_before(video_frame) - self._max_skip
+
+    def _seek(self, video_frame):
+        """Seek at or before a video frame and return the index of the next frame grabbed."""
+        if self._is_segment_list:
+            self.video.release()
+            self.video = cv2.VideoCapture(self.path)
+            return 0
+
+        if self._frame_map is None:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, video_frame)
+            return video_frame
+
+        if self._frame_times is not None:
+            keyframe = self.keyframe_before(video_frame)
+            while keyframe > 0:
+                self.video.set(cv2.CAP_PROP_POS_MSEC, self._frame_times[keyframe] * 1000)
+                # Grab a frame to tell where OpenCV stopped by its time
+                if not self.video.grab():
+                    break
+                position = self._frame_at(self.video.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+                if position <= video_frame:
+                    return position + 1
+                keyframe = self.keyframe_before(keyframe - 1)
+
+        self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return 0
+
+    def _frame_at(self, time):
+        """Index of the video frame presented closest to a time in seconds."""
+        i = int(np.searchsorted(self._frame_times, time))
+        if i > 0 and (i == len(self._frame_times) or time - self._frame_times[i - 1] < self._frame_times[i] - time):
+            i -= 1
+        return i
+
+    def video_frame_index(self, index):
+        if self._frame_map is not None:
+            index = min(max(index, 0), len(self._frame_map) - 1)
+            return int(self._frame_map[index])
+        return index
+
+    def read(self, index):
+        """Return (success, frame) for a captured frame index.
+
+        The returned frame is shared with the reader and must not be modified.
+        """
+        return self.read_video_frame(self.video_frame_index(index))
+
+    def read_video_frame(self, video_frame):
+        """Return (success, frame) for a frame index of the video itself."""
+        if video_frame == self._last_video_frame:
+            return True, self._last_frame
+
+        if self._should_seek(video_frame):
+            self._position = self._seek(video_frame)
+
+        # Frames up to the target are only grabbed, a seek by time may have
+        # grabbed the target already
+        while self._position <= video_frame:
+            if not self.video.grab():
+                return False, None
+            self._position += 1
+
+        success, frame = self.video.retrieve()
+        if not success:
+            return False, None
+
+        self._last_video_frame = video_frame
+        self._last_frame = frame
+        return True, frame
+
+    def release(self):
+        self.video.release()
+        self._last_video_frame = None
+        self._last_frame = None
@@ -0,0 +1,141 @@
+import os
+import subprocess
+import threading
+
+import numpy as np
+
+from screenvivid.utils.general import get_ffmpeg_path, get_os_name
+from screenvivid.utils.logging import logger
+
+# Packet flag FFmpeg sets on keyframes
+PACKET_FLAG_KEY = 0x1
+
+
+def get_keyframes_path(video_path):
+    return os.path.splitext(video_path)[0] + ".keyframes"
+
+
+def get_keyframe_index_command(video_path):
+    """FFmpeg command listing the packets of the video stream, nothing is decoded."""
+    return [get_ffmpeg_path(), "-i", video_path, "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"]
+
+
+def parse_keyframe_index(framecrc):
+    """Return the keyframe indices and the presentation time in seconds of
+    every frame in a framecrc listing, both in presentation order.
+    """
+    # Lines are "stream, dts, pts, duration, size, hash[, F=flags]", the
+    # flags are left out for plain keyframes. The header gives the time base
+    # as "#tb 0: num/den"
+    time_base = 1.0
+    pts = []
+    key = []
+    for line in framecrc.splitlines():
+        if line.startswith("#tb 0:"):
+            num, den = line.split(":", 1)[1].strip().split("/")
+            time_base = int(num) / int(den)
+        if not line or line.startswith("#"):
+            continue
+        fields = [field.strip() for field in line.split(",")]
+        flags = PACKET_FLAG_KEY
+        if len(fields) > 6 and fields[6].startswith("F="):
+            flags = int(fields[6][2:], 16)
+        pts.append(int(fields[2]))
+        key.append(bool(flags & PACKET_FLAG_KEY))
+
+    # Packets come in decode order, frames are counted in presentation order
+    pts = np.asarray(pts, dtype=np.int64)
+    key = np.asarray(key, dtype=bool)
+    sorted_pts = np.sort(pts)
+    keyframes = np.unique(np.searchsorted(sorted_pts, pts[key])).astype(np.int32)
+    frame_times = (sorted_pts - sorted_pts[:1]) * time_base
+    return keyframes, frame_times
+
+
+def read_keyframe_index(video_path):
+    """Load the keyframes and frame times stored next to the video, None if missing or outdated."""
+    path = get_keyframes_path(video_path)
+    try:
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(video_path):
+            with np.load(path) as index:
+                keyframes, frame_times = index["keyframes"], index["frame_times"]
+            if len(keyframes):
+                return keyframes, frame_times
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Failed to read keyframe index {path}: {e}")
+    return None
+
+
+def write_keyframe_index(video_path, keyframes, frame_times):
+    path = get_keyframes_path(video_path)
+    try:
+        # Written through a file object, np.savez would add an extension to the path
+        with open(path, "wb") as f:
+            np.savez(f, keyframes=keyframes.astype("<i4"), frame_times=frame_times.astype("<f8"))
+    except OSError as e:
+        logger.warning(f"Failed to write keyframe index {path}: {e}")
+
+
+class KeyframeIndexer:
+    """Builds the keyframe index of a video with FFmpeg on its own thread.
+
+    `on_ready` is called with the video path, the keyframes and the frame
+    times from the indexing thread. With `cache`, the index is read from and
+    stored next to the video; only recordings, which are cleaned up with
+    their sidecars, should use it.
+    """
+
+    def __init__(self, video_path, on_ready, cache=False):
+        self._video_path = video_path
+        self._on_ready = on_ready
+        self._cache = cache
+        self._process = None
+        self._is_stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._is_stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._is_stopped.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _build(self):
+        kwargs = {}
+        if get_os_name() == "windows":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+
+        try:
+            self._process = subprocess.Popen(
+                get_keyframe_index_command(self._video_path),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs
+            )
+            stdout, stderr = self._process.communicate()
+        except OSError as e:
+            logger.warning(f"Failed to index keyframes of {self._video_path}: {e}")
+            return None
+        if self._is_stopped.is_set():
+            return None
+        if self._process.returncode != 0:
+            logger.warning(f"Failed to index keyframes of {self._video_path}: {stderr.decode(errors='ignore')[-500:]}")
+            return None
+        return parse_keyframe_index(stdout.decode(errors="ignore"))
+
+    def _run(self):
+        index = read_keyframe_index(self._video_path) if self._cache else None
+        if index is None:
+            index = self._build()
+            if index is None or not len(index[0]):
+                return
+            if self._cache:
+                write_keyframe_index(self._video_path, *index)
+
+        if not self._is_stopped.is_set():
+            self._on_ready(self._video_path, *index)
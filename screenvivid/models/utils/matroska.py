@@ -0,0 +1,103 @@
+import struct
+
+# Element ids of the few Matroska elements a live stream needs
+EBML = b"\x1a\x45\xdf\xa3"
+SEGMENT = b"\x18\x53\x80\x67"
+INFO = b"\x15\x49\xa9\x66"
+TIMESTAMP_SCALE = b"\x2a\xd7\xb1"
+MUXING_APP = b"\x4d\x80"
+WRITING_APP = b"\x57\x41"
+TRACKS = b"\x16\x54\xae\x6b"
+TRACK_ENTRY = b"\xae"
+TRACK_NUMBER = b"\xd7"
+TRACK_UID = b"\x73\xc5"
+TRACK_TYPE = b"\x83"
+CODEC_ID = b"\x86"
+DEFAULT_DURATION = b"\x23\xe3\x83"
+VIDEO = b"\xe0"
+PIXEL_WIDTH = b"\xb0"
+PIXEL_HEIGHT = b"\xba"
+COLOUR_SPACE = b"\x2e\xb5\x24"
+CLUSTER = b"\x1f\x43\xb6\x75"
+CLUSTER_TIMESTAMP = b"\xe7"
+SIMPLE_BLOCK = b"\xa3"
+
+# Size of an element written before its content is known
+UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+
+# FourCC of raw frames, stored as the track colour space
+RAW_FOURCCS = {
+    "bgra": b"BGRA",
+    "yuv420p": b"I420",
+    "nv12": b"NV12",
+}
+
+# Track 1, timestamp relative to the cluster, keyframe flag
+BLOCK_HEADER = b"\x81" + struct.pack(">h", 0) + b"\x80"
+
+
+def _size(length):
+    for width in range(1, 9):
+        # All ones is reserved for unknown sizes
+        if length < (1 << (7 * width)) - 1:
+            return ((1 << (7 * width)) | length).to_bytes(width, "big")
+    raise ValueError(f"Element too large: {length}")
+
+
+def _element(element_id, payload):
+    return element_id + _size(len(payload)) + payload
+
+
+def _uint(element_id, value):
+    return _element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def stream_header(width, height, fps, pixel_format=None):
+    """Header of a live Matroska stream of one video track.
+
+    Frames are raw frames of `pixel_format`, or JPEG images without one.
+    Timestamps are in milliseconds, a frame lasts one interval of `fps`
+    unless the next one comes earlier.
+    """
+    ebml = _element(EBML, b"".join([
+        _uint(b"\x42\x86", 1),   # EBMLVersion
+        _uint(b"\x42\xf7", 1),   # EBMLReadVersion
+        _uint(b"\x42\xf2", 4),   # EBMLMaxIDLength
+        _uint(b"\x42\xf3", 8),   # EBMLMaxSizeLength
+        _element(b"\x42\x82", b"matroska"),
+        _uint(b"\x42\x87", 4),   # DocTypeVersion
+        _uint(b"\x42\x85", 2),   # DocTypeReadVersion
+    ]))
+    info = _element(INFO, b"".join([
+        _uint(TIMESTAMP_SCALE, 1000000),
+        _element(MUXING_APP, b"ScreenVivid"),
+        _element(WRITING_APP, b"ScreenVivid"),
+    ]))
+
+    video = _uint(PIXEL_WIDTH, width) + _uint(PIXEL_HEIGHT, height)
+    if pixel_format is not None:
+        codec_id = b"V_UNCOMPRESSED"
+        video += _element(COLOUR_SPACE, RAW_FOURCCS[pixel_format])
+    else:
+        codec_id = b"V_MJPEG"
+    track = _element(TRACK_ENTRY, b"".join([
+        _uint(TRACK_NUMBER, 1),
+        _uint(TRACK_UID, 1),
+        _uint(TRACK_TYPE, 1),
+        _element(CODEC_ID, codec_id),
+        _uint(DEFAULT_DURATION, round(1e9 / fps)),
+        _element(VIDEO, video),
+    ]))
+
+    # The segment is streamed, its size is never known
+    return ebml + SEGMENT + UNKNOWN_SIZE + info + _element(TRACKS, track)
+
+
+def frame_header(timestamp, size):
+    """Bytes to write before a frame of `size` bytes shown at `timestamp` milliseconds.
+
+    Every frame is a keyframe in a cluster of its own, so the frame data
+    is written as is after the header.
+    """
+    block = _uint(CLUSTER_TIMESTAMP, timestamp) + SIMPLE_BLOCK + _size(len(BLOCK_HEADER) + size) + BLOCK_HEADER
+    return CLUSTER + _size(len(block) + size) + block
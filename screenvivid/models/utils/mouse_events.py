@@ -0,0 +1,115 @@
+import numpy as np
+
+
+class MoveTrack:
+    """Columnar cursor track of a recording, one row per captured frame.
+
+    Positions are relative to the recorded region. Cursor states are stored as
+    codes into a small table of state names. Rows are sorted by frame and a
+    dense frame index gives O(1) lookups.
+    """
+
+    def __init__(self, x, y, frame, state, anim_step, state_names):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.frame = np.asarray(frame, dtype=np.int32)
+        self.state = np.asarray(state, dtype=np.uint16)
+        self.anim_step = np.asarray(anim_step, dtype=np.uint16)
+        self.state_names = list(state_names)
+
+        # Columns are kept as given (possibly views of a mapped file) when
+        # they are already in frame order
+        if np.any(self.frame[1:] < self.frame[:-1]):
+            order = np.argsort(self.frame, kind="stable")
+            self.x, self.y, self.frame = self.x[order], self.y[order], self.frame[order]
+            self.state, self.anim_step = self.state[order], self.anim_step[order]
+
+        n_frames = int(self.frame[-1]) + 1 if len(self.frame) else 0
+        self._rows = np.full(n_frames, -1, dtype=np.int32)
+        self._rows[self.frame] = np.arange(len(self.frame), dtype=np.int32)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [], [])
+
+    @classmethod
+    def from_dict(cls, moves):
+        """Build a track from the legacy {frame: (x, y, frame, state, anim_step)} mapping."""
+        states = StateTable()
+        rows = [
+            (x, y, frame, states.intern(cursor_state), anim_step)
+            for x, y, frame, cursor_state, anim_step in moves.values()
+        ]
+        if not rows:
+            return cls.empty()
+        x, y, frame, state, anim_step = zip(*rows)
+        return cls(x, y, frame, state, anim_step, states.names)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __contains__(self, frame):
+        return self._row(frame) >= 0
+
+    def __getitem__(self, frame):
+        row = self._row(frame)
+        if row < 0:
+            raise KeyError(frame)
+        return self._tuple(row)
+
+    def get(self, frame, default=None):
+        """Return (x, y, frame, cursor_state, anim_step) for a frame, or `default`."""
+        row = self._row(frame)
+        if row < 0:
+            return default
+        return self._tuple(row)
+
+    def range(self, start_frame, end_frame):
+        """Return the rows between `start_frame` (included) and `end_frame` (excluded) as a track."""
+        lo, hi = np.searchsorted(self.frame, [start_frame, end_frame])
+        return MoveTrack(
+            self.x[lo:hi], self.y[lo:hi], self.frame[lo:hi],
+            self.state[lo:hi], self.anim_step[lo:hi], self.state_names
+        )
+
+    def to_dict(self):
+        return {int(self.frame[row]): self._tuple(row) for row in range(len(self))}
+
+    def _row(self, frame):
+        if frame is None or not 0 <= frame < len(self._rows):
+            return -1
+        return int(self._rows[frame])
+
+    def _tuple(self, row):
+        return (
+            float(self.x[row]),
+            float(self.y[row]),
+            int(self.frame[row]),
+            self.state_names[self.state[row]],
+            int(self.anim_step[row]),
+        )
+
+
+class StateTable:
+    """Interns cursor state names into small integer codes."""
+
+    def __init__(self):
+        self.names = []
+        self._codes = {}
+
+    def intern(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self._codes[name] = code
+            self.names.append(name)
+        return code
+
+
+def as_move_track(move_data):
+    """Return `move_data` as a MoveTrack, converting legacy dicts."""
+    if isinstance(move_data, MoveTrack):
+        return move_data
+    if not move_data:
+        return MoveTrack.empty()
+    return MoveTrack.from_dict(move_data)
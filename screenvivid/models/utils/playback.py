@@ -0,0 +1,103 @@
+import threading
+from collections import deque
+
+from screenvivid.models.utils.frame_reader import FrameReader
+from screenvivid.utils.logging import logger
+
+
+class PlaybackPrefetcher:
+    """Renders the frames ahead of the playhead on its own thread.
+
+    Rendered frames wait in a small ring buffer, tagged with the render
+    parameters they were rendered with. The player takes the latest frame due
+    on its wall clock and the producer skips frames that are already late.
+
+    The producer renders with its own transforms, built by the owner of the
+    video processor together with their parameters key, as transforms keep
+    per call state and are not shared between threads.
+    """
+
+    def __init__(self, video_processor, start_frame, end_frame, compose, params_key, size=8):
+        self._video_processor = video_processor
+        self._compose = compose
+        self._params_key = params_key
+        self._start_frame = start_frame
+        self._end_frame = end_frame
+        self._size = max(1, size)
+        self._buffer = deque()
+        self._target = start_frame
+        self._skipped = 0
+        self._condition = threading.Condition()
+        self._is_stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def params_key(self):
+        """Parameters key of the transforms frames are rendered with."""
+        return self._params_key
+
+    def set_transforms(self, compose, params_key):
+        """Render the next frames with new transforms, after the render parameters changed."""
+        with self._condition:
+            self._compose = compose
+            self._params_key = params_key
+
+    @property
+    def skipped(self):
+        """Rendered frames dropped because they were late or stale."""
+        return self._skipped
+
+    def start(self):
+        self._is_stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._is_stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def take(self, target, params_key):
+        """Return (index, frame) of the latest rendered frame due at `target`, or None."""
+        result = None
+        with self._condition:
+            while self._buffer and self._buffer[0][0] <= target:
+                index, frame, key = self._buffer.popleft()
+                if key != params_key:
+                    self._skipped += 1
+                    continue
+                if result is not None:
+                    self._skipped += 1
+                result = (index, frame)
+            self._target = target
+            self._condition.notify_all()
+        return result
+
+    def _run(self):
+        video = self._video_processor.preview_video
+        reader = FrameReader(video.path, video.frame_map, video.keyframes, video.frame_times)
+        index = self._start_frame
+        try:
+            while not self._is_stopped.is_set() and index < self._end_frame:
+                with self._condition:
+                    while len(self._buffer) >= self._size and not self._is_stopped.is_set():
+                        self._condition.wait()
+                    # Frames behind the playhead would only be dropped
+                    index = max(index, self._target)
+                    compose, params_key = self._compose, self._params_key
+                if self._is_stopped.is_set() or index >= self._end_frame:
+                    break
+
+                ret, frame = self._video_processor.render(index, reader, compose, params_key)
+                if not ret:
+                    break
+                with self._condition:
+                    self._buffer.append((index, frame, params_key))
+                index += 1
+        except Exception as e:
+            logger.error(f"Playback prefetch error: {e}")
+        finally:
+            reader.release()
@@ -0,0 +1,251 @@
+import time
+import threading
+from array import array
+
+import numpy as np
+
+from screenvivid.utils.general import get_os_name
+from screenvivid.utils.logging import logger
+
+# Samples further apart than this are not interpolated, the pointer was resting
+MAX_INTERPOLATION_GAP = 0.1
+
+# X buttons 4 to 7 are scroll wheel steps, not clicks
+CLICK_BUTTONS = {1: "left", 2: "middle", 3: "right"}
+
+
+class PointerLog:
+    """Append-only, array backed log of timestamped pointer moves and clicks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.move_times = array("d")
+        self.move_x = array("d")
+        self.move_y = array("d")
+        self.click_times = array("d")
+        self.click_x = array("d")
+        self.click_y = array("d")
+        self.click_buttons = array("b")
+        self.click_pressed = array("b")
+
+    def add_move(self, t, x, y):
+        with self._lock:
+            self.move_times.append(t)
+            self.move_x.append(x)
+            self.move_y.append(y)
+
+    def add_click(self, t, x, y, button, pressed):
+        with self._lock:
+            self.click_times.append(t)
+            self.click_x.append(x)
+            self.click_y.append(y)
+            self.click_buttons.append(button)
+            self.click_pressed.append(pressed)
+
+    def __len__(self):
+        return len(self.move_times)
+
+    def move_columns(self, start=0):
+        """Return copies of the (times, x, y) columns from sample `start` on."""
+        with self._lock:
+            return (
+                np.frombuffer(self.move_times, dtype=np.float64)[start:].copy(),
+                np.frombuffer(self.move_x, dtype=np.float64)[start:].copy(),
+                np.frombuffer(self.move_y, dtype=np.float64)[start:].copy(),
+            )
+
+    def positions_at(self, times):
+        """Resample the pointer position at the given times. Returns two arrays (x, y)."""
+        return resample_positions(times, *self.move_columns())
+
+    def clicks(self, start=0):
+        """Return the clicks from click `start` on as a list of (time, x, y, button, pressed)."""
+        with self._lock:
+            return list(zip(
+                self.click_times[start:], self.click_x[start:], self.click_y[start:],
+                self.click_buttons[start:], map(bool, self.click_pressed[start:])
+            ))
+
+
+def resample_positions(times, move_times, move_x, move_y):
+    """Resample pointer samples at the given times.
+
+    Positions are interpolated between close samples and held while the
+    pointer rests. Returns two arrays (x, y).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if len(move_times) == 0:
+        return np.zeros_like(times), np.zeros_like(times)
+
+    # Event batches can arrive slightly out of order
+    order = np.argsort(move_times, kind="stable")
+    move_times, move_x, move_y = move_times[order], move_x[order], move_y[order]
+
+    prev = np.clip(np.searchsorted(move_times, times, side="right") - 1, 0, len(move_times) - 1)
+    next = np.minimum(prev + 1, len(move_times) - 1)
+
+    gap = move_times[next] - move_times[prev]
+    weight = np.zeros_like(times)
+    interpolate = (gap > 0) & (gap <= MAX_INTERPOLATION_GAP) & (times > move_times[prev])
+    weight[interpolate] = (times[interpolate] - move_times[prev][interpolate]) / gap[interpolate]
+    weight = np.clip(weight, 0.0, 1.0)
+
+    x = move_x[prev] + (move_x[next] - move_x[prev]) * weight
+    y = move_y[prev] + (move_y[next] - move_y[prev]) * weight
+    return x, y
+
+
+def to_relative(x, y, region, device_pixel_ratio=1.0):
+    """Convert screen positions to positions relative to the recorded region."""
+    x = x * device_pixel_ratio
+    y = y * device_pixel_ratio
+    return (x - region[0]) / region[2], (y - region[1]) / region[3]
+
+
+def assign_clicks(clicks, frame_times, frame_indices, region, device_pixel_ratio=1.0):
+    """Attach each (time, x, y, button, pressed) click to the last frame captured before it.
+
+    Returns a list of (relative x, relative y, frame index, button name, pressed).
+    """
+    if len(frame_times) == 0:
+        return []
+
+    result = []
+    for click_time, x, y, button, pressed in clicks:
+        i = max(0, int(np.searchsorted(frame_times, click_time, side="right")) - 1)
+        relative_x, relative_y = to_relative(x, y, region, device_pixel_ratio)
+        result.append((relative_x, relative_y, int(frame_indices[i]), get_button_name(button), bool(pressed)))
+    return result
+
+
+def get_button_name(button):
+    return CLICK_BUTTONS.get(int(button), "left")
+
+
+class PointerTracker:
+    """Records pointer moves and clicks into a PointerLog on its own thread."""
+
+    def __init__(self):
+        self.log = PointerLog()
+        self._thread = None
+        self._is_stopped = threading.Event()
+
+    def start(self):
+        self.log = PointerLog()
+        self._is_stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._is_stopped.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        raise NotImplementedError("Pointer trackers must implement the '_run' method.")
+
+
+class PollingPointerTracker(PointerTracker):
+    """Polls the pointer position at a fixed rate. Clicks are not available."""
+
+    def __init__(self, rate=120):
+        super().__init__()
+        self._interval = 1.0 / rate
+
+    def _run(self):
+        import pyautogui
+
+        last_position = None
+        next_time = time.time()
+        while not self._is_stopped.is_set():
+            t = time.time()
+            x, y = pyautogui.position()
+            if (x, y) != last_position:
+                self.log.add_move(t, x, y)
+                last_position = (x, y)
+
+            next_time += self._interval
+            time.sleep(max(0, next_time - time.time()))
+
+
+class XRecordPointerTracker(PointerTracker):
+    """Receives every pointer motion and button event through the X RECORD extension."""
+
+    def __init__(self):
+        super().__init__()
+        from Xlib import display
+
+        self._record_display = display.Display()
+        self._control_display = display.Display()
+        if not self._record_display.has_extension("RECORD"):
+            self._record_display.close()
+            self._control_display.close()
+            raise RuntimeError("RECORD extension not supported.")
+        self._context = None
+
+    def start(self):
+        from Xlib import X
+        from Xlib.ext import record
+
+        self._context = self._record_display.record_create_context(
+            0,
+            [record.AllClients],
+            [{
+                "core_requests": (0, 0),
+                "core_replies": (0, 0),
+                "ext_requests": (0, 0, 0, 0),
+                "ext_replies": (0, 0, 0, 0),
+                "delivered_events": (0, 0),
+                "device_events": (X.ButtonPress, X.MotionNotify),
+                "errors": (0, 0),
+                "client_started": False,
+                "client_died": False,
+            }]
+        )
+        super().start()
+
+    def stop(self):
+        if self._context is not None:
+            self._control_display.record_disable_context(self._context)
+            self._control_display.flush()
+        super().stop()
+        if self._context is not None:
+            self._record_display.record_free_context(self._context)
+            self._context = None
+        self._record_display.close()
+        self._control_display.close()
+
+    def _run(self):
+        # Blocks until the context is disabled from the control connection
+        self._record_display.record_enable_context(self._context, self._handle_reply)
+
+    def _handle_reply(self, reply):
+        from Xlib import X
+        from Xlib.ext import record
+        from Xlib.protocol import rq
+
+        if reply.category != record.FromServer or reply.client_swapped:
+            return
+        if not len(reply.data) or reply.data[0] < 2:
+            return
+
+        t = time.time()
+        data = reply.data
+        while len(data):
+            event, data = rq.EventField(None).parse_binary_value(data, self._record_display.display, None, None)
+            if event.type == X.MotionNotify:
+                self.log.add_move(t, event.root_x, event.root_y)
+            elif event.type in (X.ButtonPress, X.ButtonRelease) and event.detail in CLICK_BUTTONS:
+                self.log.add_move(t, event.root_x, event.root_y)
+                self.log.add_click(t, event.root_x, event.root_y, event.detail, event.type == X.ButtonPress)
+
+
+def create_pointer_tracker(backend="auto", poll_rate=120):
+    """Return the best pointer tracker for the platform, falling back to polling."""
+    if backend in ("auto", "xrecord") and get_os_name() == "linux":
+        try:
+            return XRecordPointerTracker()
+        except Exception as e:
+            logger.warning(f"XRecord pointer tracking unavailable, falling back to polling: {e}")
+    return PollingPointerTracker(rate=poll_rate)
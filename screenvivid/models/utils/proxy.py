@@ -0,0 +1,132 @@
+import os
+import subprocess
+import threading
+
+import cv2
+
+from screenvivid.models.utils.keyframes import read_keyframe_index
+from screenvivid.utils.general import get_ffmpeg_path, get_os_name, safe_delete
+from screenvivid.utils.logging import logger
+
+
+def get_proxy_path(video_path):
+    return os.path.splitext(video_path)[0] + ".proxy.mp4"
+
+
+def get_proxy_command(video_path, proxy_path, max_height=720, gop=10):
+    """FFmpeg command transcoding a recording into a short GOP, reduced size editing proxy.
+
+    Every frame is kept with its timestamp, so frame indices of the proxy and
+    the recording match.
+    """
+    return [
+        get_ffmpeg_path(),
+        "-i", video_path,
+        "-map", "0:v:0",
+        "-an",
+        "-vf", f"scale=-2:'min({max_height},ih)'",
+        "-fps_mode", "passthrough",
+        "-c:v", "libx264",
+        "-preset", "ultrafast",
+        "-tune", "fastdecode",
+        "-crf", "23",
+        "-g", str(gop),
+        "-bf", "0",
+        "-pix_fmt", "yuv420p",
+        "-y", proxy_path
+    ]
+
+
+def get_video_frame_count(video_path, frame_map=None):
+    """Number of frames of a video, from its keyframe index or its frame map when it has one.
+
+    OpenCV estimates the frame count of variable frame rate videos from their
+    duration, the count of a video without either comes from its header.
+    """
+    index = read_keyframe_index(video_path)
+    if index is not None:
+        return len(index[1])
+    if frame_map is not None and len(frame_map):
+        return int(frame_map[-1]) + 1
+
+    video = cv2.VideoCapture(video_path)
+    try:
+        return int(video.get(cv2.CAP_PROP_FRAME_COUNT)) if video.isOpened() else 0
+    finally:
+        video.release()
+
+
+def is_valid_proxy(video_path, proxy_path, frame_map=None):
+    """Whether the proxy exists, is newer than the recording and has the same frames.
+
+    `frame_map` is the video frame of each captured frame of the recording.
+    """
+    if not os.path.exists(proxy_path) or os.path.getmtime(proxy_path) < os.path.getmtime(video_path):
+        return False
+
+    proxy_frames = get_video_frame_count(proxy_path)
+    return proxy_frames > 0 and proxy_frames == get_video_frame_count(video_path, frame_map)
+
+
+class ProxyTranscoder:
+    """Transcodes the editing proxy of a recording with FFmpeg on its own thread.
+
+    The proxy is written under a temporary name and renamed once complete,
+    then `on_ready` is called with its path from the transcoding thread.
+    """
+
+    def __init__(self, video_path, on_ready=None, max_height=720, gop=10):
+        self._video_path = video_path
+        self._proxy_path = get_proxy_path(video_path)
+        self._on_ready = on_ready
+        self._max_height = max_height
+        self._gop = gop
+        self._process = None
+        self._is_stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def proxy_path(self):
+        return self._proxy_path
+
+    def start(self):
+        self._is_stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._is_stopped.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        base, extension = os.path.splitext(self._proxy_path)
+        partial_path = f"{base}.partial{extension}"
+        cmd = get_proxy_command(self._video_path, partial_path, self._max_height, self._gop)
+        kwargs = {}
+        if get_os_name() == "windows":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+
+        try:
+            self._process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, **kwargs)
+            _, stderr = self._process.communicate()
+            if self._is_stopped.is_set():
+                return
+            if self._process.returncode != 0:
+                logger.warning(f"Failed to transcode proxy of {self._video_path}: {stderr.decode(errors='ignore')[-500:]}")
+                return
+
+            os.replace(partial_path, self._proxy_path)
+            logger.info(f"Editing proxy ready: {self._proxy_path}")
+        except OSError as e:
+            logger.warning(f"Failed to transcode proxy of {self._video_path}: {e}")
+            return
+        finally:
+            safe_delete(partial_path)
+
+        if self._on_ready is not None:
+            self._on_ready(self._proxy_path)
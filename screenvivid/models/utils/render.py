@@ -0,0 +1,116 @@
+import subprocess
+
+import cv2
+
+from screenvivid.models.utils import transforms
+from screenvivid.models.utils.events_file import EventsFile
+from screenvivid.models.utils.frame_reader import FrameReader
+from screenvivid.utils.general import get_os_name
+
+# State of a render worker process, set up once by init_render_worker
+_reader = None
+_transforms = None
+_output_size = None
+_progress_queue = None
+_cancel_event = None
+
+# Encoded frames are reported to the progress queue in batches
+PROGRESS_INTERVAL = 10
+
+
+def build_render_transforms(render_config):
+    """Build the transforms of a render config, mapping its events file if it has one."""
+    render_config = dict(render_config)
+    events_file = EventsFile.open(render_config.get("events_path"))
+    if events_file is not None:
+        with events_file:
+            render_config["move_data"] = events_file.move_track
+            render_config["cursors_map"] = events_file.cursors_map
+    return transforms.build_transforms(render_config)
+
+
+def init_render_worker(render_config, progress_queue=None, cancel_event=None):
+    """Open the video and rebuild the transforms of a render config in a worker process."""
+    global _reader, _transforms, _output_size, _progress_queue, _cancel_event
+
+    _reader = FrameReader(
+        render_config["video_path"], render_config.get("frame_map"),
+        render_config.get("keyframes"), render_config.get("frame_times")
+    )
+    _transforms = build_render_transforms(render_config)
+    _output_size = tuple(render_config["output_size"])
+    _progress_queue = progress_queue
+    _cancel_event = cancel_event
+
+
+def render_frame(compose, frame, frame_index, output_size):
+    """Render one source frame into an RGB frame of `output_size`.
+
+    The composited frame is only converted here, so the transforms render
+    every frame into the same buffer.
+    """
+    result = compose(input=frame, start_frame=frame_index, reuse_output=True)
+    result = cv2.cvtColor(result, cv2.COLOR_BGR2RGB)
+    if result.shape[1::-1] != output_size:
+        result = cv2.resize(result, output_size)
+    return result
+
+
+def _render_frames(frame_indices):
+    rendered = None
+    last_index = None
+    for index in frame_indices:
+        if index != last_index:
+            ret, frame = _reader.read(int(index))
+            if not ret:
+                raise RuntimeError(f"Failed to read frame {index}")
+            rendered = render_frame(_transforms, frame, int(index), _output_size)
+            last_index = index
+        yield rendered
+
+
+def render_chunk(frame_indices):
+    """Render a run of source frames in the worker process.
+
+    Repeated indices share one rendered frame, which pickling sends back once.
+    """
+    return list(_render_frames(frame_indices))
+
+
+def encode_chunk(frame_indices, cmd, log_path):
+    """Render a run of source frames and encode them with a dedicated FFmpeg process.
+
+    `cmd` reads raw RGB frames from stdin. Progress is reported as frame
+    counts on the worker's progress queue. Returns the number of frames
+    encoded, raises RuntimeError if FFmpeg fails.
+    """
+    kwargs = {}
+    if get_os_name() == "windows":
+        kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+
+    frame_count = 0
+    reported = 0
+    with open(log_path, "wb") as log:
+        process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=log, **kwargs)
+        try:
+            for frame in _render_frames(frame_indices):
+                if _cancel_event is not None and _cancel_event.is_set():
+                    process.kill()
+                    break
+                process.stdin.write(memoryview(frame))
+                frame_count += 1
+                if _progress_queue is not None and frame_count - reported >= PROGRESS_INTERVAL:
+                    _progress_queue.put(frame_count - reported)
+                    reported = frame_count
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            process.communicate()
+
+    if _progress_queue is not None and frame_count > reported:
+        _progress_queue.put(frame_count - reported)
+    if process.returncode != 0 and not (_cancel_event is not None and _cancel_event.is_set()):
+        with open(log_path, "rb") as log:
+            error = log.read()[-1000:].decode(errors="ignore")
+        raise RuntimeError(f"FFmpeg failed to encode chunk: {error}")
+    return frame_count
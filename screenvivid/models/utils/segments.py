@@ -0,0 +1,197 @@
+import os
+import subprocess
+import threading
+
+import cv2
+
+from screenvivid.utils.general import get_ffmpeg_path, get_os_name, safe_delete
+from screenvivid.utils.logging import logger
+
+
+def get_segment_pattern(video_path):
+    base, extension = os.path.splitext(video_path)
+    return f"{base}.part%05d{extension or '.mp4'}"
+
+
+def get_segment_list_path(video_path):
+    return os.path.splitext(video_path)[0] + ".segments.ffconcat"
+
+
+def get_segment_args(video_path, segment_duration):
+    """FFmpeg output arguments writing the recording as fixed duration segments.
+
+    Each segment starts on a forced keyframe and is a complete file once the
+    next one starts. FFmpeg appends finished segments to an ffconcat list.
+    """
+    extension = os.path.splitext(video_path)[1].lstrip(".") or "mp4"
+    return [
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment_duration})",
+        "-f", "segment",
+        "-segment_time", str(segment_duration),
+        "-segment_format", extension,
+        "-reset_timestamps", "1",
+        "-segment_list", get_segment_list_path(video_path),
+        "-segment_list_type", "ffconcat",
+        "-y", get_segment_pattern(video_path),
+    ]
+
+
+def read_segment_list(list_path):
+    """Return the segment paths listed in an ffconcat file."""
+    if not os.path.exists(list_path):
+        return []
+
+    base_dir = os.path.dirname(list_path)
+    segments = []
+    with open(list_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("file "):
+                name = line[len("file "):].strip().strip("'")
+                segments.append(os.path.join(base_dir, name))
+    return segments
+
+
+def count_listed_frames(list_path):
+    """Number of frames of the videos of an ffconcat list, read from their headers."""
+    frames = 0
+    for path in read_segment_list(list_path):
+        video = cv2.VideoCapture(path)
+        frames += max(0, int(video.get(cv2.CAP_PROP_FRAME_COUNT)))
+        video.release()
+    return frames
+
+
+def delete_segments(video_path):
+    list_path = get_segment_list_path(video_path)
+    for segment in read_segment_list(list_path):
+        safe_delete(segment)
+    safe_delete(list_path)
+
+
+def write_concat_list(paths, list_path):
+    """Write an ffconcat list of `paths`, relative to the list when possible."""
+    base_dir = os.path.dirname(list_path)
+    with open(list_path, "w") as f:
+        f.write("ffconcat version 1.0\n")
+        for path in paths:
+            if os.path.dirname(path) == base_dir:
+                path = os.path.basename(path)
+            escaped = path.replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+def get_concat_command(list_path, output_path, extra_args=()):
+    """FFmpeg command joining the videos of an ffconcat list into `output_path` without re-encoding."""
+    return [
+        get_ffmpeg_path(),
+        "-f", "concat",
+        "-safe", "0",
+        "-i", list_path,
+        "-c", "copy",
+        *extra_args,
+        "-y", output_path
+    ]
+
+
+def concat_videos(list_path, output_path, extra_args=()):
+    """Join the videos of an ffconcat list into `output_path` without re-encoding."""
+    cmd = get_concat_command(list_path, output_path, extra_args)
+    kwargs = {}
+    if get_os_name() == "windows":
+        kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+    if result.returncode != 0:
+        logger.error(f"Failed to concatenate videos: {result.stderr.decode(errors='ignore')[-1000:]}")
+        return False
+    return True
+
+
+def has_segments(video_path):
+    return bool(read_segment_list(get_segment_list_path(video_path)))
+
+
+def get_partial_path(video_path):
+    base, extension = os.path.splitext(video_path)
+    return f"{base}.partial{extension or '.mp4'}"
+
+
+def stitch_segments(video_path, keep_segments=False):
+    """Join the recorded segments into `video_path` without re-encoding.
+
+    The video is written under a temporary name and renamed once complete.
+    Segments are removed once stitched unless `keep_segments`. Returns False,
+    keeping the segments, if there was nothing to stitch or FFmpeg failed.
+    """
+    list_path = get_segment_list_path(video_path)
+    if not read_segment_list(list_path):
+        logger.error(f"No recorded segments for {video_path}")
+        return False
+
+    partial_path = get_partial_path(video_path)
+    if not concat_videos(list_path, partial_path):
+        safe_delete(partial_path)
+        return False
+    os.replace(partial_path, video_path)
+
+    if not keep_segments:
+        delete_segments(video_path)
+    return True
+
+
+class SegmentStitcher:
+    """Stitches the segments of a recording with FFmpeg on its own thread.
+
+    The editor reads the segment list meanwhile, so the segments are kept.
+    Once stitched, `on_ready` is called with the video path from the
+    stitching thread.
+    """
+
+    def __init__(self, video_path, on_ready=None):
+        self._video_path = video_path
+        self._on_ready = on_ready
+        self._process = None
+        self._is_stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._is_stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._is_stopped.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        partial_path = get_partial_path(self._video_path)
+        cmd = get_concat_command(get_segment_list_path(self._video_path), partial_path)
+        kwargs = {}
+        if get_os_name() == "windows":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+
+        try:
+            self._process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, **kwargs)
+            _, stderr = self._process.communicate()
+            if self._is_stopped.is_set():
+                return
+            if self._process.returncode != 0:
+                logger.error(f"Failed to stitch segments of {self._video_path}: {stderr.decode(errors='ignore')[-1000:]}")
+                return
+
+            os.replace(partial_path, self._video_path)
+            logger.info(f"Stitched segments into {self._video_path}")
+        except OSError as e:
+            logger.error(f"Failed to stitch segments of {self._video_path}: {e}")
+            return
+        finally:
+            safe_delete(partial_path)
+
+        if self._on_ready is not None:
+            self._on_ready(self._video_path)
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+# One record per captured frame: its capture time and the video frame showing it
+FRAME_MAP_DTYPE = np.dtype([("time", "<f8"), ("frame", "<i4")])
+
+
+def get_frame_map_path(video_path):
+    return os.path.splitext(video_path)[0] + ".framemap"
+
+
+class FrameMapWriter:
+    """Streams which video frame shows each captured frame.
+
+    Unchanged frames are not written to the video, so several captured frames
+    can map to the same video frame.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+        self._record = np.zeros(1, dtype=FRAME_MAP_DTYPE)
+
+    @property
+    def path(self):
+        return self._path
+
+    def open(self):
+        self._file = open(self._path, "wb")
+
+    def write(self, frame_time, video_frame):
+        self._record["time"] = frame_time
+        self._record["frame"] = video_frame
+        self._file.write(self._record.tobytes())
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def load_frame_map(path):
+    """Load the frame map as a structured array, or None if the file is missing or empty."""
+    if not path or not os.path.exists(path):
+        return None
+
+    frame_map = np.fromfile(path, dtype=FRAME_MAP_DTYPE)
+    if len(frame_map) == 0:
+        return None
+    return frame_map
+
+
+def resample_frames(timestamps, start_frame, end_frame, fps):
+    """Map a constant frame rate timeline onto variable frame rate frames.
+
+    Returns the source frame index to show for each output frame between
+    `start_frame` and `end_frame`, picking the latest frame captured at or
+    before each output time.
+    """
+    if end_frame <= start_frame:
+        return np.empty(0, dtype=np.int64)
+
+    timestamps = timestamps[start_frame:end_frame]
+    duration = timestamps[-1] - timestamps[0]
+    n_frames = max(1, int(round(duration * fps)) + 1)
+
+    output_times = timestamps[0] + np.arange(n_frames) / fps
+    indices = np.searchsorted(timestamps, output_times, side="right") - 1
+    return np.clip(indices, 0, len(timestamps) - 1) + start_frame
@@ -2,31 +2,98 @@ import json
 import glob
 import os
 import sys
-from functools import lru_cache
+import threading
+from functools import partial
 from pathlib import Path
 
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFilter
 
+from screenvivid.config import RENDER_MASK_CACHE_MB
+from screenvivid.models.utils import blend
+from screenvivid.models.utils.frame_cache import FrameCache
+from screenvivid.models.utils.mouse_events import as_move_track
 from screenvivid.utils.general import hex_to_rgb, create_gradient_image, get_os_name
 
+# Masks depend only on their parameters, so BorderShadow instances share them
+_mask_cache = FrameCache(RENDER_MASK_CACHE_MB)
+
+def cached_mask(key, build):
+    """Return the mask of `key` from the shared mask cache, building it with `build()` when missing.
+
+    Cached masks are read only, as they are shared between transforms.
+    """
+    mask = _mask_cache.get(key)
+    if mask is None:
+        mask = build()
+        mask.flags.writeable = False
+        _mask_cache.put(key, mask)
+    return mask
+
+def resize_into(image, dst):
+    """Resize `image` to the size of `dst` and write it there, `dst` may be a view of a larger frame."""
+    result = cv2.resize(image, dst.shape[1::-1], dst=dst, interpolation=cv2.INTER_LINEAR)
+    # OpenCV allocates a new array when `dst` cannot be written in place
+    if result is not dst:
+        np.copyto(dst, result)
+    return dst
+
 class BaseTransform:
+    """A step of the render chain, split in two phases.
+
+    `layout` computes the geometry of a configuration from the previous
+    steps' layout (output size, foreground rect, offsets, masks). Compose
+    memoizes it, so it only runs again when a transform is replaced or the
+    input size changes. `__call__` does the per frame pixel work, getting
+    the layout merged into its kwargs.
+    """
     def __init__(self):
         pass
 
+    def layout(self, **layout):
+        return layout
+
     def __call__(self, **kwargs):
-        raise NotImplementedError('Transform __call__ method must be implemented.')
+        return kwargs
 
 class Compose(BaseTransform):
     def __init__(self, transforms):
         super().__init__()
 
         self.transforms = transforms
+        self._layout = None
+        self._layout_lock = threading.Lock()
+
+    def _get_layout(self, transforms, input_size, source_size):
+        with self._layout_lock:
+            cached = self._layout
+            if (
+                cached is not None
+                and cached[0] == (input_size, source_size)
+                and len(cached[1]) == len(transforms)
+                and all(a is b for a, b in zip(cached[1], transforms))
+            ):
+                return cached[2]
+
+            layout = {"input_size": input_size, "source_size": source_size}
+            for t in transforms:
+                layout = t.layout(**layout)
+            # Compared by identity, a replaced transform lays out again
+            self._layout = ((input_size, source_size), transforms, layout)
+            return layout
+
+    def layout(self, input_size, source_size=None):
+        """Geometry of the chain for frames of `input_size`, memoized until a transform is replaced."""
+        return self._get_layout(list(self.transforms.values()), tuple(input_size), source_size)
 
     def __call__(self, **kwargs):
-        input = kwargs
-        for _, t in self.transforms.items():
+        # Transforms can be replaced from another thread while rendering
+        transforms = list(self.transforms.values())
+        source_size = kwargs.get('source_size')
+        layout = self._get_layout(transforms, kwargs['input'].shape[1::-1], source_size and tuple(source_size))
+        input = {**layout, **kwargs}
+        for t in transforms:
             input = t(**input)
         return input
 
@@ -40,11 +107,13 @@ class Compose(BaseTransform):
         return self.transforms.get(key, default)
 
 class AspectRatio(BaseTransform):
-    def __init__(self, aspect_ratio: str, screen_size: tuple):
+    def __init__(self, aspect_ratio: str, screen_size: tuple, scale: float = 1.0):
         super().__init__()
         self.aspect_ratio = aspect_ratio
         self.aspect_ratio_float = 16 /  9
         self.screen_size = screen_size
+        # Render scale of the output, below 1 for reduced resolution previews
+        self.scale = scale
         self.output_resolution_cache = None
 
         self._resolutions = {
@@ -111,19 +180,25 @@ class AspectRatio(BaseTransform):
 
         return output_width, output_height, input_width, input_height, input_width / input_height
 
-    def __call__(self, **kwargs):
-        input = kwargs['input']
-        input_height, input_width = input.shape[:2]
+    def layout(self, **kwargs):
+        # Frames of an editing proxy are laid out as the recording they stand for
+        input_width, input_height = kwargs.get('source_size') or kwargs['input_size']
 
         width, height, input_width, input_height, self.aspect_ratio_float = self.calculate_output_resolution(
             self.aspect_ratio, input_width, input_height)
 
+        scale = self.scale
+        if scale != 1.0:
+            width, height = max(1, round(width * scale)), max(1, round(height * scale))
+            input_width, input_height = max(1, round(input_width * scale)), max(1, round(input_height * scale))
+
         kwargs.update({
             "background_width": width,
             "background_height": height,
             "foreground_width": input_width,
             "foreground_height": input_height,
-            "aspect_ratio_float": self.aspect_ratio_float
+            "aspect_ratio_float": self.aspect_ratio_float,
+            "render_scale": scale
         })
         return kwargs
 
@@ -133,14 +208,15 @@ class Padding(BaseTransform):
 
         self.padding = padding
 
-    def __call__(self, **kwargs):
+    def layout(self, **kwargs):
         foreground_width = kwargs['foreground_width']
         foreground_height = kwargs['foreground_height']
         background_width = kwargs['background_width']
         background_height = kwargs['background_height']
+        scale = kwargs.get('render_scale', 1.0)
 
-        pad_x = int(foreground_width * self.padding * 0.5) if isinstance(self.padding, float) and (0 <= self.padding <= 1.) else self.padding
-        new_width = max(50, foreground_width - 2 * pad_x)
+        pad_x = int(foreground_width * self.padding * 0.5) if isinstance(self.padding, float) and (0 <= self.padding <= 1.) else int(self.padding * scale)
+        new_width = max(int(50 * scale), foreground_width - 2 * pad_x)
         new_height = int(new_width * foreground_height / foreground_width)
 
         x_offset = (background_width - new_width) // 2
@@ -161,22 +237,24 @@ class Inset(BaseTransform):
         self.color = color
         self.inset_frame = None
 
-    def __call__(self, **kwargs):
-        input = kwargs['input']
-        height, width = input.shape[:2]
-
+    def layout(self, **kwargs):
+        width, height = kwargs['input_size']
         if self.inset > 0:
             inset_x = self.inset
             inset_y = int(inset_x * height / width)
-            new_width = width - 2 * inset_x
-            new_height = height - 2 * inset_y
+            kwargs['inset_rect'] = (inset_x, inset_y, width - 2 * inset_x, height - 2 * inset_y)
+        return kwargs
 
-            if self.inset_frame is None:
-                self.inset_frame = np.full_like(input, fill_value=self.color, dtype=np.uint8)
+    def __call__(self, **kwargs):
+        input = kwargs['input']
 
-            resized_frame = cv2.resize(input, (new_width, new_height))
-            self.inset_frame[inset_y:inset_y+new_height, inset_x:inset_x+new_width] = resized_frame
+        if 'inset_rect' in kwargs:
+            inset_x, inset_y, new_width, new_height = kwargs['inset_rect']
 
+            if self.inset_frame is None or self.inset_frame.shape != input.shape:
+                self.inset_frame = np.full_like(input, fill_value=self.color, dtype=np.uint8)
+
+            resize_into(input, self.inset_frame[inset_y:inset_y+new_height, inset_x:inset_x+new_width])
             kwargs['input'] = self.inset_frame
         return kwargs
 
@@ -187,7 +265,7 @@ class Cursor(BaseTransform):
         self.size = size
         self.scale = scale
         self.offsets = offsets
-        self.move_data = move_data
+        self.move_data = as_move_track(move_data)
         self.cursor_states = {
             "windows": [
                 "arrow", "ibeam", "wait", "cross", "uparrow", "sizenwse", "sizenesw",
@@ -208,6 +286,9 @@ class Cursor(BaseTransform):
             ],
         }
         self.available_scales = ["1x", "1.5x", "2x", "3x"]
+        self._resized_cursors = {}
+        self._resize_ratio = None
+        self._premultiplied = {}
         self.os_name = get_os_name()
         self.default_cursor = self._load_default_cursor()
         if self.os_name in "linux":
@@ -268,7 +349,35 @@ class Cursor(BaseTransform):
 
         return default_cursor
 
-    def blend(self, image, x, y, cursor_state, anim_step):
+    def _resize_cursor(self, cursor_image, cursor_offset, ratio):
+        # Cursors are shrunk alike the frame they are drawn on, only the
+        # sizes of the current ratio are kept
+        if ratio != self._resize_ratio:
+            self._resized_cursors.clear()
+            self._resize_ratio = ratio
+        key = id(cursor_image)
+        resized = self._resized_cursors.get(key)
+        if resized is None:
+            height, width = cursor_image.shape[:2]
+            size = max(1, round(width * ratio)), max(1, round(height * ratio))
+            interpolation = cv2.INTER_AREA if ratio < 1.0 else cv2.INTER_LINEAR
+            resized = (
+                cv2.resize(cursor_image, size, interpolation=interpolation),
+                (round(cursor_offset[0] * ratio), round(cursor_offset[1] * ratio)),
+                cursor_image
+            )
+            self._resized_cursors[key] = resized
+        return resized[0], resized[1]
+
+    def _premultiply(self, cursor_image):
+        premultiplied = self._premultiplied.get(id(cursor_image))
+        if premultiplied is None:
+            # The image is kept so its id is not reused
+            premultiplied = blend.premultiply(cursor_image) + (cursor_image,)
+            self._premultiplied[id(cursor_image)] = premultiplied
+        return premultiplied[0], premultiplied[1]
+
+    def blend(self, image, x, y, cursor_state, anim_step, ratio=1.0):
         # Get cursor image and scale string
         scale_str = f"{int(self.scale)}x" if self.scale.is_integer() else f"{self.scale:.1f}x"
 
@@ -293,6 +402,9 @@ class Cursor(BaseTransform):
             cursor_image = cursor_info["image"]
             cursor_offset = cursor_info["offset"]
 
+        if ratio != 1.0:
+            cursor_image, cursor_offset = self._resize_cursor(cursor_image, cursor_offset, ratio)
+
         # Get dimensions
         cursor_height, cursor_width = cursor_image.shape[:2]
         image_height, image_width = image.shape[:2]
@@ -324,37 +436,41 @@ class Cursor(BaseTransform):
         if cursor_crop_x2 <= cursor_crop_x1 or cursor_crop_y2 <= cursor_crop_y1:
             return image
 
-        # Crop cursor image and get alpha channel
-        cursor_region = cursor_image[
-            cursor_crop_y1:cursor_crop_y2,
-            cursor_crop_x1:cursor_crop_x2
-        ]
-
-        # Split into RGB and alpha
-        cursor_rgb = cursor_region[:, :, :3]
-        cursor_alpha = cursor_region[:, :, 3].astype(np.float32) / 255.0
-
-        # Get image region and blend
+        # Blend the premultiplied cursor over the image region in place
+        premultiplied, inverse_alpha = self._premultiply(cursor_image)
+        cursor_crop = (slice(cursor_crop_y1, cursor_crop_y2), slice(cursor_crop_x1, cursor_crop_x2))
         image_region = image[image_y1:image_y2, image_x1:image_x2]
+        blend.blend_premultiplied(
+            image_region, premultiplied[cursor_crop], inverse_alpha[cursor_crop], out=image_region
+        )
 
-        # Expand alpha for broadcasting
-        alpha = cursor_alpha[:, :, np.newaxis]
-
-        # Blend images
-        blended = (cursor_rgb * alpha +
-                image_region * (1 - alpha)).astype(np.uint8)
+        return image
 
-        # Update image with blended result
-        image[image_y1:image_y2, image_x1:image_x2] = blended
+    def layout(self, **kwargs):
+        source_size = kwargs.get("source_size")
+        kwargs["cursor_ratio"] = kwargs["input_size"][0] / source_size[0] if source_size else 1.0
+        return kwargs
 
-        return image
+    def draw(self, foreground, move, input_size, crop, ratio=1.0):
+        """Blend the cursor of a track row over `foreground`, the `crop` of an
+        input frame of `input_size` resized to the foreground size.
+        """
+        x, y, _, cursor_state, anim_step = move
+        ys, xs = crop
+        crop_width, crop_height = xs.stop - xs.start, ys.stop - ys.start
+        x = (x * input_size[0] - xs.start) / crop_width
+        y = (y * input_size[1] - ys.start) / crop_height
+        return self.blend(foreground, x, y, cursor_state, anim_step, ratio * foreground.shape[1] / crop_width)
 
     def __call__(self, **kwargs):
-        if "start_frame" in kwargs and kwargs["start_frame"] in self.move_data:
-            start_frame = kwargs["start_frame"]
-            input = kwargs["input"]
-            x, y, _, cursor_state, anim_step = self.move_data[start_frame]
-            kwargs["input"] = self.blend(input, x, y, cursor_state, anim_step)
+        move = self.move_data.get(kwargs.get("start_frame"))
+        if move is not None:
+            # Drawn once the foreground is resized into the output frame, the
+            # source frame can be shared between reads and is left untouched
+            kwargs["draw_foreground"] = partial(
+                self.draw, move=move, input_size=kwargs["input_size"],
+                crop=kwargs["foreground_crop"], ratio=kwargs.get("cursor_ratio", 1.0)
+            )
 
         return kwargs
 
@@ -364,9 +480,33 @@ class BorderShadow(BaseTransform):
         self.shadow_blur = shadow_blur
         self.shadow_opacity = shadow_opacity
         self.scale_factor = 8  # For anti-aliasing corner
+        self._scaled = None
+        self._plate = None
+        self._corners = None
+
+    def scaled(self, scale):
+        """Return the border and shadow drawn at a render scale, radius and blur scaled alike."""
+        if scale == 1.0:
+            return self
+        if self._scaled is None or self._scaled[0] != scale:
+            border_shadow = BorderShadow(
+                border_radius=round(self.border_radius * scale),
+                shadow_blur=max(1, round(self.shadow_blur * scale)),
+                shadow_opacity=self.shadow_opacity
+            )
+            self._scaled = (scale, border_shadow)
+        return self._scaled[1]
 
-    @lru_cache(maxsize=1)
     def create_rounded_rectangle(self, background_size, foreground_size, x_offset, y_offset):
+        key = (
+            "rounded_rectangle", self.border_radius, self.scale_factor,
+            tuple(background_size), tuple(foreground_size), x_offset, y_offset
+        )
+        return cached_mask(
+            key, lambda: self._draw_rounded_rectangle(background_size, foreground_size, x_offset, y_offset)
+        )
+
+    def _draw_rounded_rectangle(self, background_size, foreground_size, x_offset, y_offset):
         def draw_rounded_corner(radius):
             size = 2 * radius + 10
             scaled_size = int(size * self.scale_factor)
@@ -418,14 +558,22 @@ class BorderShadow(BaseTransform):
 
             rect = rect[y_offset:y_offset+fg_height, x_offset:x_offset+fg_width]
 
-            rect = rect / 255.
+            rect = rect.astype(np.float32) / 255.
         else:
             rect = np.ones((background_size[1], background_size[0]), dtype=np.float32)
 
         return rect
 
-    @lru_cache(maxsize=1)
     def create_shadow(self, background_size, foreground_size, x_offset, y_offset, border=None):
+        key = (
+            "shadow", self.border_radius, self.shadow_blur, self.shadow_opacity,
+            tuple(background_size), tuple(foreground_size), x_offset, y_offset, border
+        )
+        return cached_mask(
+            key, lambda: self._draw_shadow(background_size, foreground_size, x_offset, y_offset, border)
+        )
+
+    def _draw_shadow(self, background_size, foreground_size, x_offset, y_offset, border=None):
         shadow = Image.new('L', background_size, 0)
         shadow_draw = ImageDraw.Draw(shadow)
         shadow_draw.rounded_rectangle([(x_offset, y_offset),
@@ -437,94 +585,93 @@ class BorderShadow(BaseTransform):
             shadow = cv2.copyMakeBorder(shadow, border, border, border, border, cv2.BORDER_CONSTANT, None, 0)
         return shadow
 
-    def render_drop_shadow(self, background, foreground, shadow_alpha, foreground_alpha, offset):
-        bg_height, bg_width = background.shape[:2]
-        x_offset, y_offset = offset
-        fg_size = foreground.shape[1], foreground.shape[0]
+    def static_plate(self, background, x_offset, y_offset, foreground_size):
+        """Return the background with the drop shadow of the foreground applied.
+
+        Nothing of it depends on the video, so it is computed once per layout
+        and frames only draw the foreground over it.
+        """
+        key = (id(background), background.shape, x_offset, y_offset, foreground_size)
+        if self._plate is not None and self._plate[0] == key:
+            return self._plate[1]
 
-        shadow_alpha = np.expand_dims(shadow_alpha, axis=-1)
-        fg_alpha = np.expand_dims(foreground_alpha, axis=-1)
+        background_size = background.shape[1], background.shape[0]
+        fg_width, fg_height = foreground_size
+        shadow_alpha = self.create_shadow(background_size, foreground_size, x_offset, y_offset)
 
+        # The shadow is drawn up to twice its blur around the foreground
         outer_pad = 2 * self.shadow_blur
-        inner_pad = self.border_radius if self.border_radius > 0 else 10
-        corner_pad = outer_pad + inner_pad
         x1, y1 = max(0, x_offset - outer_pad), max(0, y_offset - outer_pad)
-        x2, y2 = min(x_offset + fg_size[0] + outer_pad, bg_width), min(y_offset + fg_size[1] + outer_pad, bg_height)
-
-        # Top-left corner
-        shadow_alpha_roi = shadow_alpha[y1:y1+corner_pad, x1:x1+corner_pad]
-        bg_roi = background[y1:y1+corner_pad, x1:x1+corner_pad]
-        patch = (1 - shadow_alpha_roi) * bg_roi
-        patch_roi = patch[outer_pad:, outer_pad:]
-        alpha_roi = fg_alpha[:inner_pad, :inner_pad]
-        foreground_roi = foreground[:inner_pad, :inner_pad]
-        patch[outer_pad:, outer_pad:] = (1 - alpha_roi) * patch_roi + alpha_roi * foreground_roi
-        background[y1:y1+corner_pad, x1:x1+corner_pad] = patch
-
-        # Bottom left corner
-        shadow_alpha_roi = shadow_alpha[y2-corner_pad:y2, x1:x1+corner_pad]
-        bg_roi = background[y2-corner_pad:y2, x1:x1+corner_pad]
-        patch = (1 - shadow_alpha_roi) * bg_roi
-        patch_roi = patch[:inner_pad, outer_pad:]
-        alpha_roi = fg_alpha[-inner_pad:, :inner_pad]
-        foreground_roi = foreground[-inner_pad:, :inner_pad]
-        patch[:inner_pad, outer_pad:] = (1 - alpha_roi) * patch_roi + alpha_roi * foreground_roi
-        background[y2-corner_pad:y2, x1:x1+corner_pad] = patch
-
-        # Bottom right corner
-        shadow_alpha_roi = shadow_alpha[y2-corner_pad:y2, x2-corner_pad:x2]
-        bg_roi = background[y2-corner_pad:y2, x2-corner_pad:x2]
-        patch = (1 - shadow_alpha_roi) * bg_roi
-        patch_roi = patch[:inner_pad, :inner_pad]
-        alpha_roi = fg_alpha[-inner_pad:, -inner_pad:]
-        foreground_roi = foreground[-inner_pad:, -inner_pad:]
-        patch[:inner_pad, :inner_pad] = (1 - alpha_roi) * patch_roi + alpha_roi * foreground_roi
-        background[y2-corner_pad:y2, x2-corner_pad:x2] = patch
-
-        # Top right corner
-        shadow_alpha_roi = shadow_alpha[y1:y1+corner_pad, x2-corner_pad:x2]
-        bg_roi = background[y1:y1+corner_pad, x2-corner_pad:x2]
-        patch = (1 - shadow_alpha_roi) * bg_roi
-        patch_roi = patch[outer_pad:, :inner_pad]
-        alpha_roi = fg_alpha[:inner_pad, -inner_pad:]
-        foreground_roi = foreground[:inner_pad, -inner_pad:]
-        patch[outer_pad:, :inner_pad] = (1 - alpha_roi) * patch_roi + alpha_roi * foreground_roi
-        background[y1:y1+corner_pad, x2-corner_pad:x2] = patch
-
-        # Left side
-        shadow_alpha_roi = shadow_alpha[y1+corner_pad:y2-corner_pad, x1:x1+outer_pad]
-        bg_roi = background[y1+corner_pad:y2-corner_pad, x1:x1+outer_pad]
-        patch = (1 - shadow_alpha_roi) * bg_roi
-        background[y1+corner_pad:y2-corner_pad, x1:x1+outer_pad] = patch
-
-
-        # Bottom
-        shadow_alpha_roi = shadow_alpha[y2-outer_pad:y2, x1+corner_pad:x2-corner_pad]
-        bg_roi = background[y2-outer_pad:y2, x1+corner_pad:x2-corner_pad]
-        patch = (1 - shadow_alpha_roi) * bg_roi
-        background[y2-outer_pad:y2, x1+corner_pad:x2-corner_pad] = patch
-
-        # Right side
-        shadow_alpha_roi = shadow_alpha[y1+corner_pad:y2-corner_pad, x2-outer_pad:x2]
-        bg_roi = background[y1+corner_pad:y2-corner_pad, x2-outer_pad:x2]
-        patch = (1 - shadow_alpha_roi) * bg_roi
-        background[y1+corner_pad:y2-corner_pad, x2-outer_pad:x2] = patch
-
-        # Top
-        shadow_alpha_roi = shadow_alpha[y1:y1+outer_pad, x1+corner_pad:x2-corner_pad]
-        bg_roi = background[y1:y1+outer_pad, x1+corner_pad:x2-corner_pad]
-        patch = (1 - shadow_alpha_roi) * bg_roi
-        background[y1:y1+outer_pad, x1+corner_pad:x2-corner_pad] = patch
-
-        # Center 1
-        background[y1+corner_pad:y2-corner_pad, x1+outer_pad:x2-outer_pad] = foreground[inner_pad:fg_size[1]-inner_pad, :]
-
-        # Center 2
-        background[y1+outer_pad:y1+corner_pad, x1+corner_pad:x2-corner_pad] = foreground[:inner_pad, inner_pad:fg_size[0]-inner_pad]
-
-        # Center 3
-        background[y2-corner_pad:y2-outer_pad, x1+corner_pad:x2-corner_pad] = foreground[fg_size[1]-inner_pad:, inner_pad:fg_size[0]-inner_pad]
-        return background[outer_pad:-outer_pad, outer_pad:-outer_pad]
+        x2 = min(x_offset + fg_width + outer_pad, background_size[0])
+        y2 = min(y_offset + fg_height + outer_pad, background_size[1])
+
+        plate = background.copy()
+        region = plate[y1:y2, x1:x2]
+        blend.multiply(region, blend.to_alpha(1 - shadow_alpha[y1:y2, x1:x2]), out=region)
+
+        # The background is kept so its id is not reused while the plate is cached
+        self._plate = (key, plate, background)
+        return plate
+
+    def composite(self, background, foreground, x_offset, y_offset, output=None, foreground_size=None,
+                  draw_foreground=None):
+        """Draw the foreground with rounded corners over the static plate of `background`.
+
+        Only the plate around the foreground is copied and only the corners
+        are blended. `output` is reused when it has the size of the background.
+        With `foreground_size`, the foreground is resized straight into its
+        place in the output. `draw_foreground` draws over it before the
+        corners are cut.
+        """
+        if foreground_size is None:
+            foreground_size = foreground.shape[1::-1]
+        fg_width, fg_height = foreground_size
+        plate = self.static_plate(background, x_offset, y_offset, (fg_width, fg_height))
+        if output is None or output.shape != plate.shape:
+            output = np.empty_like(plate)
+
+        x1, y1 = x_offset, y_offset
+        x2, y2 = x1 + fg_width, y1 + fg_height
+        output[:y1] = plate[:y1]
+        output[y2:] = plate[y2:]
+        output[y1:y2, :x1] = plate[y1:y2, :x1]
+        output[y1:y2, x2:] = plate[y1:y2, x2:]
+        resize_into(foreground, output[y1:y2, x1:x2])
+        if draw_foreground is not None:
+            draw_foreground(output[y1:y2, x1:x2])
+
+        # The corners are blended in place, over the foreground already in the output
+        for ys, xs, alpha, inverse_alpha in self._corner_alphas((fg_width, fg_height)):
+            roi = (slice(y1 + ys.start, y1 + ys.stop), slice(x1 + xs.start, x1 + xs.stop))
+            blend.blend(plate[roi], output[roi], alpha, out=output[roi], inverse_alpha=inverse_alpha)
+
+        return output
+
+    def prepare(self, background, x_offset, y_offset, foreground_size):
+        """Compute the static plate and corner masks of a layout ahead of compositing."""
+        self.static_plate(background, x_offset, y_offset, foreground_size)
+        self._corner_alphas(foreground_size)
+
+    def _corner_alphas(self, foreground_size):
+        """Slices and uint8 coverages of the four rounded corners of the foreground."""
+        if self._corners is not None and self._corners[0] == foreground_size:
+            return self._corners[1]
+
+        fg_width, fg_height = foreground_size
+        radius = min(self.border_radius, fg_width // 2, fg_height // 2)
+        corners = []
+        if radius > 0:
+            foreground_alpha = self.create_rounded_rectangle(foreground_size, foreground_size, 0, 0)
+            for ys, xs in (
+                (slice(0, radius), slice(0, radius)),
+                (slice(0, radius), slice(fg_width - radius, fg_width)),
+                (slice(fg_height - radius, fg_height), slice(0, radius)),
+                (slice(fg_height - radius, fg_height), slice(fg_width - radius, fg_width)),
+            ):
+                alpha = blend.to_alpha(foreground_alpha[ys, xs])
+                corners.append((ys, xs, alpha, 255 - alpha))
+        self._corners = (foreground_size, corners)
+        return corners
 
     def apply_border_radius_with_shadow(
         self,
@@ -533,29 +680,12 @@ class BorderShadow(BaseTransform):
         x_offset,
         y_offset,
     ):
-        background_size = background.shape[1], background.shape[0]
-        foreground_size = foreground.shape[1], foreground.shape[0]
-
-        foreground_alpha = self.create_rounded_rectangle(
-            foreground_size,
-            foreground_size,
-            0, 0
-        )
-
-        outer_pad = 2 * self.shadow_blur
-        shadow_alpha = self.create_shadow(background_size, foreground_size, x_offset, y_offset, border=outer_pad)
+        return self.composite(background, foreground, x_offset, y_offset)
 
-        background = cv2.copyMakeBorder(background, outer_pad, outer_pad, outer_pad, outer_pad, cv2.BORDER_CONSTANT, None, 0)
-
-        offset = (x_offset + outer_pad, y_offset + outer_pad)
-        result = self.render_drop_shadow(background, foreground, shadow_alpha, foreground_alpha, offset)
-        result = np.clip(result, 0, 255).astype(np.uint8)
-
-        return result
-
-    def __call__(self, **kwargs):
-        kwargs["border_radius"] = self.border_radius
-        kwargs["border_shadow"] = self
+    def layout(self, **kwargs):
+        border_shadow = self.scaled(kwargs.get("render_scale", 1.0))
+        kwargs["border_radius"] = border_shadow.border_radius
+        kwargs["border_shadow"] = border_shadow
         return kwargs
 
 class Background(BaseTransform):
@@ -572,6 +702,7 @@ class Background(BaseTransform):
         self.background_dir = os.path.join(base_path, "resources/images/wallpapers/hires")
         self.background = background
         self.background_image = None
+        self._output = None
 
     def _crop_and_resize(self, image, target_size):
         width, height = target_size
@@ -591,6 +722,18 @@ class Background(BaseTransform):
         image = image[start_y:start_y+height, start_x:start_x+width]
         return image
 
+    def _crop_to_aspect(self, image_size, target_size):
+        """Slices of the center crop of an image with the aspect ratio of `target_size`, see _crop_and_resize."""
+        width, height = target_size
+        img_width, img_height = image_size
+        if width / img_width > height / img_height:
+            crop_width, crop_height = img_width, min(img_height, round(height * img_width / width))
+        else:
+            crop_width, crop_height = min(img_width, round(width * img_height / height)), img_height
+        start_x = (img_width - crop_width) // 2
+        start_y = (img_height - crop_height) // 2
+        return slice(start_y, start_y + crop_height), slice(start_x, start_x + crop_width)
+
     def _get_background_image(self, background, width, height):
         if background['type'] == 'wallpaper':
             index = background['value']
@@ -608,7 +751,9 @@ class Background(BaseTransform):
             background_image = np.full(shape=(height, width, 3), fill_value=(b, g, r), dtype=np.uint8)
             return background_image  # No need to resize or crop for solid color
         elif background['type'] == 'image':
-            background_path = background['value'].toLocalFile()
+            background_path = background['value']
+            if hasattr(background_path, 'toLocalFile'):
+                background_path = background_path.toLocalFile()
             if not os.path.exists(background_path):
                 raise Exception("Background image file does not exist")
             background_image = cv2.imread(background_path)
@@ -621,39 +766,82 @@ class Background(BaseTransform):
 
         return background_image
 
-    def __call__(self, **kwargs):
-        input = kwargs['input']
+    def layout(self, **kwargs):
         background_width = kwargs['background_width']
         background_height = kwargs['background_height']
-        foreground_width = kwargs['foreground_width']
-        foreground_height = kwargs['foreground_height']
-        x_offset = kwargs.get('x_offset', 0)
-        y_offset = kwargs.get('y_offset', 0)
+        foreground_size = kwargs['foreground_width'], kwargs['foreground_height']
 
         if self.background_image is None or self.background_image.shape[:2] != (background_height, background_width):
             self.background_image = self._get_background_image(self.background, background_width, background_height)
+        kwargs['background_image'] = self.background_image
+        kwargs['foreground_crop'] = self._crop_to_aspect(kwargs['input_size'], foreground_size)
+
+        if 'border_shadow' in kwargs:
+            # Shadow plate and corner masks only depend on the layout
+            kwargs['border_shadow'].prepare(
+                self.background_image, kwargs.get('x_offset', 0), kwargs.get('y_offset', 0), foreground_size
+            )
+        return kwargs
 
-        background_image = self.background_image.copy()
+    def __call__(self, **kwargs):
+        background_image = kwargs['background_image']
+        foreground_width = kwargs['foreground_width']
+        foreground_height = kwargs['foreground_height']
+        x_offset = kwargs.get('x_offset', 0)
+        y_offset = kwargs.get('y_offset', 0)
 
-        foreground = self._crop_and_resize(input.copy(), (foreground_width, foreground_height))
-        # foreground = cv2.cvtColor(foreground, cv2.COLOR_BGR2RGB)
+        # Cropped here and resized straight into the output frame
+        foreground = kwargs['input'][kwargs['foreground_crop']]
 
         x1 = x_offset
         y1 = y_offset
         x2 = x1 + foreground_width
         y2 = y1 + foreground_height
 
+        # Callers that do not keep the rendered frame let it be rendered into the same buffer
+        output = self._output if kwargs.get('reuse_output') else None
+
         if 'border_shadow' in kwargs:
             border_shadow = kwargs['border_shadow']
-
-            output = border_shadow.apply_border_radius_with_shadow(
-                background_image,
-                foreground,
-                x_offset,
-                y_offset,
+            output = border_shadow.composite(
+                background_image, foreground, x_offset, y_offset, output,
+                foreground_size=(foreground_width, foreground_height),
+                draw_foreground=kwargs.get('draw_foreground')
             )
         else:
-            output = background_image
-            output[y1:y2, x1:x2, :] = input
-
-        return output
\ No newline at end of file
+            if output is None or output.shape != background_image.shape:
+                output = background_image.copy()
+            else:
+                np.copyto(output, background_image)
+            resize_into(foreground, output[y1:y2, x1:x2])
+            if 'draw_foreground' in kwargs:
+                kwargs['draw_foreground'](output[y1:y2, x1:x2])
+
+        if kwargs.get('reuse_output'):
+            self._output = output
+        return output
+
+def build_transforms(render_config):
+    """Build the transforms described by a render config.
+
+    See VideoProcessor.get_render_config, the config only holds picklable
+    values so the same pipeline can be rebuilt in another process.
+    """
+    compose = Compose({
+        "aspect_ratio": AspectRatio(
+            render_config["aspect_ratio"], render_config["screen_size"], render_config.get("render_scale", 1.0)
+        ),
+        "cursor": Cursor(
+            move_data=render_config["move_data"],
+            cursors_map=render_config["cursors_map"],
+            offsets=render_config["offsets"],
+            scale=render_config["cursor_scale"]
+        ),
+        "padding": Padding(padding=render_config["padding"]),
+        # "inset": Inset(inset=inset, color=(0, 0, 0)),
+        "border_shadow": BorderShadow(border_radius=render_config["border_radius"]),
+        "background": Background(background=render_config["background"]),
+    })
+    if render_config.get("inset") is not None:
+        compose["inset"] = Inset(inset=render_config["inset"])
+    return compose
@@ -1,13 +1,27 @@
+import math
+import os
 import time
 
 import cv2
 import numpy as np
-import pyautogui
 from PySide6.QtCore import QObject, Property, Slot, Signal, QThread, QTimer
-from PySide6.QtGui import QImage
 
+from screenvivid import config
 from screenvivid.models.utils import transforms
 from screenvivid.models.utils.manager.undo_redo import UndoRedoManager
+from screenvivid.models.utils.events_file import EventsFile, get_events_path
+from screenvivid.models.utils.frame_cache import FrameCache, FrameReadAhead
+from screenvivid.models.utils.frame_reader import FrameReader
+from screenvivid.models.utils.keyframes import KeyframeIndexer, get_keyframes_path
+from screenvivid.models.utils.mouse_events import MoveTrack, as_move_track
+from screenvivid.models.utils.playback import PlaybackPrefetcher
+from screenvivid.models.utils.proxy import ProxyTranscoder, get_proxy_path, is_valid_proxy
+from screenvivid.models.utils.segments import (
+    SegmentStitcher, delete_segments, get_segment_list_path, has_segments, stitch_segments
+)
+from screenvivid.models.utils.timecodes import (
+    load_frame_map, get_frame_map_path, resample_frames
+)
 from screenvivid.models.export import ExportThread
 from screenvivid.utils.logging import logger
 from screenvivid.utils.general import safe_delete
@@ -19,6 +33,7 @@ class VideoControllerModel(QObject):
 
     exportProgress = Signal(float)
     exportFinished = Signal()
+    exportFailed = Signal(str)
     paddingChanged = Signal()
     insetChanged = Signal()
     borderRadiusChanged = Signal()
@@ -32,6 +47,7 @@ class VideoControllerModel(QObject):
     canRedoChanged = Signal(bool)
     outputSizeChanged = Signal()
     fpsChanged = Signal(int)
+    previewQualityChanged = Signal()
 
     def __init__(self, frame_provider):
         super().__init__()
@@ -154,10 +170,31 @@ class VideoControllerModel(QObject):
     def is_playing(self):
         return self.video_processor.is_playing
 
+    @Property(float, notify=playingChanged)
+    def preview_fps(self):
+        return self.video_processor.preview_fps
+
     @Property(list, notify=outputSizeChanged)
     def output_size(self):
         return self.video_processor.output_size
 
+    @Property(str, notify=previewQualityChanged)
+    def preview_quality(self):
+        return self.video_processor.preview_quality
+
+    @preview_quality.setter
+    def preview_quality(self, value):
+        if self.video_processor.preview_quality != value:
+            self.video_processor.preview_quality = value
+            self.previewQualityChanged.emit()
+            self.get_current_frame()
+
+    @Slot(int, int)
+    def set_preview_viewport(self, width, height):
+        """Size of the preview item in device pixels, used by the "display" preview quality."""
+        if self.video_processor.set_preview_viewport(width, height):
+            self.get_current_frame()
+
     @Slot(int)
     def trim_left(self, start_frame):
         def do_trim_left():
@@ -240,6 +277,7 @@ class VideoControllerModel(QObject):
         self.export_thread = ExportThread(self.video_processor, export_params)
         self.export_thread.progress.connect(self.update_export_progress)
         self.export_thread.finished.connect(self.on_export_finished)
+        self.export_thread.failed.connect(self.on_export_failed)
         self.export_thread.start()
 
     @Slot()
@@ -255,28 +293,47 @@ class VideoControllerModel(QObject):
         self.video_processor.clean()
         if self.is_recording_video:
             safe_delete(self.video_path)
+            if self.video_path:
+                delete_segments(self.video_path)
+                safe_delete(get_keyframes_path(self.video_path))
+                proxy_path = get_proxy_path(self.video_path)
+                safe_delete(proxy_path)
+                safe_delete(get_keyframes_path(proxy_path))
 
     def update_export_progress(self, progress):
         self.exportProgress.emit(progress)
 
     def on_export_finished(self):
+        # The thread also reports finishing once its run ends, after a
+        # failure or a cancel that were already reported
+        if not self.is_exporting:
+            return
         self.is_exporting = False
         self.exportFinished.emit()
 
+    def on_export_failed(self, error):
+        self.is_exporting = False
+        self.exportFailed.emit(error)
+
     def on_frame_processed(self, frame):
-        height, width = frame.shape[:2]
-        bytes_per_line = width * 3
-        q_image = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
         self.currentFrameChanged.emit(self.video_processor.current_frame)
-        self.frame_provider.updateFrame(q_image)
+        # The provider converts the frame into a buffer it owns, QML reads that buffer
+        self.frame_provider.present(frame)
         self.frameReady.emit()
 
+# Render scale of the fixed preview qualities, "display" follows the preview item size
+PREVIEW_SCALES = {"full": 1.0, "half": 0.5, "quarter": 0.25, "display": None}
+
 class VideoLoadingError(Exception):
     pass
 
 class VideoProcessor(QObject):
+    # Rendered frames in BGR, converted to RGB by the frame provider
     frameProcessed = Signal(np.ndarray)
     playingChanged = Signal(bool)
+    proxyReady = Signal(str)
+    keyframesReady = Signal(str, object, object)
+    segmentsStitched = Signal(str)
 
     def __init__(self):
         super().__init__()
@@ -289,6 +346,9 @@ class VideoProcessor(QObject):
         self._max_frame = 0
         self.play_timer = QTimer()
         self.play_timer.timeout.connect(self.process_next_frame)
+        self.proxyReady.connect(self._on_proxy_ready)
+        self.keyframesReady.connect(self._on_keyframes_ready)
+        self.segmentsStitched.connect(self._on_segments_stitched)
 
         self._aspect_ratio = "Auto"
         self._padding = 0.1
@@ -298,11 +358,27 @@ class VideoProcessor(QObject):
         self._device_pixel_ratio = 1.0
         self._cursor_scale = 1.0
         self._transforms = None
-        self._mouse_events = []
+        self._mouse_events = MoveTrack.empty()
         self._region = None
         self._x_offset = None
         self._y_offset = None
         self._cursors_map = dict()
+        self._frame_timestamps = None
+        self._events_file = None
+        self._frame_cache = FrameCache(config.PREVIEW_FRAME_CACHE_MB)
+        self._render_cache = FrameCache(config.PREVIEW_RENDER_CACHE_MB)
+        self._read_ahead = None
+        self._preview_video = None
+        self._proxy_transcoder = None
+        self._segment_stitcher = None
+        self._keyframe_indexers = []
+        self._prefetcher = None
+        self._preview_quality = config.PREVIEW_QUALITY
+        self._preview_viewport = None
+        self._play_start_time = 0.0
+        self._play_start_frame = 0
+        self._presented_frames = 0
+        self._preview_fps = 0.0
 
     @property
     def aspect_ratio(self):
@@ -315,6 +391,7 @@ class VideoProcessor(QObject):
             aspect_ratio=value,
             screen_size=self._transforms["aspect_ratio"].screen_size
         )
+        self._update_render_scale()
 
     @property
     def aspect_ratio_float(self):
@@ -381,6 +458,53 @@ class VideoProcessor(QObject):
             scale=value
         )
 
+    @property
+    def preview_quality(self):
+        return self._preview_quality
+
+    @preview_quality.setter
+    def preview_quality(self, value):
+        if value not in PREVIEW_SCALES:
+            logger.warning(f"Unknown preview quality {value}")
+            return
+        self._preview_quality = value
+        self._update_render_scale()
+
+    def set_preview_viewport(self, width, height):
+        """Set the preview item size in device pixels. Returns whether the render scale changed."""
+        self._preview_viewport = (width, height) if width > 0 and height > 0 else None
+        return self._update_render_scale()
+
+    @property
+    def render_scale(self):
+        """Scale of the preview rendering relative to the output size."""
+        scale = PREVIEW_SCALES.get(self._preview_quality)
+        if scale is not None:
+            return scale
+        if self._preview_viewport is None or self._transforms is None:
+            return 1.0
+
+        output_width, output_height = self.output_size
+        viewport_width, viewport_height = self._preview_viewport
+        scale = min(1.0, viewport_width / output_width, viewport_height / output_height)
+        # Rounded up to eighths, so resizing the window reuses cached frames
+        return min(1.0, math.ceil(scale * 8) / 8)
+
+    def _update_render_scale(self):
+        if self._transforms is None:
+            return False
+        aspect_ratio = self._transforms["aspect_ratio"]
+        scale = self.render_scale
+        if aspect_ratio.scale == scale:
+            return False
+        # Replaced rather than changed in place, so the memoized layout is recomputed
+        self._transforms["aspect_ratio"] = transforms.AspectRatio(
+            aspect_ratio=aspect_ratio.aspect_ratio,
+            screen_size=aspect_ratio.screen_size,
+            scale=scale
+        )
+        return True
+
     @property
     def total_frames(self):
         return self._total_frames
@@ -460,37 +584,90 @@ class VideoProcessor(QObject):
     # @Slot(str)
     def load_video(self, path, metadata):
         try:
-            self.video = cv2.VideoCapture(path)
-
-            self.fps = int(self.video.get(cv2.CAP_PROP_FPS))
-            self.frame_width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
-            self.frame_height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            self.total_frames = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
+            # Recordings that skipped unchanged frames map captured frames to video frames
+            frame_map = load_frame_map(get_frame_map_path(path))
+            video_frame_map = frame_map["frame"] if frame_map is not None else None
+            is_recording = bool(metadata and metadata.get("recording"))
+            self._stop_segment_stitcher()
+            self._stop_keyframe_indexers()
+            self._stop_proxy_transcoder()
+            self._preview_video = None
+
+            # Segmented recordings are read from their segment list while the
+            # segments are stitched in the background
+            if not os.path.exists(path) and has_segments(path):
+                self.video = FrameReader(get_segment_list_path(path), video_frame_map)
+                if self.video.isOpened():
+                    self._segment_stitcher = SegmentStitcher(path, self.segmentsStitched.emit)
+                    self._segment_stitcher.start()
+                else:
+                    # FFmpeg only opens lists of plain file names by itself
+                    self.video.release()
+                    stitch_segments(path)
+            if self._segment_stitcher is None:
+                self.video = FrameReader(path, video_frame_map)
+                self._start_indexing(path, is_recording)
+
+            # Decoded frames around the playhead are kept for stepping and scrubbing
+            self._clear_caches()
+            self._start_read_ahead()
+
+            # Recordings keep their mouse events in a sidecar file, older
+            # callers pass them in the metadata
+            mouse_events = metadata.get("mouse_events", {}) if metadata else {}
+            self._close_events_file()
+            self._events_file = EventsFile.open(mouse_events.get("events_path") or get_events_path(path))
+            capture_fps = None
+            if self._events_file is not None:
+                self._mouse_events = self._events_file.move_track
+                self._cursors_map = self._events_file.cursors_map
+                events_metadata = self._events_file.metadata
+                self._region = events_metadata.get("region") or (metadata or {}).get("region", [])
+                capture_fps = events_metadata.get("fps")
+                # Everything needed is decoded, export workers open the file again by its path
+                self._events_file.close()
+            else:
+                self._mouse_events = as_move_track(mouse_events.get("move"))
+                self._cursors_map = mouse_events.get("cursors_map", {})
+                self._region = metadata.get("region", []) if metadata else []
+
+            # Frames of variable frame rate recordings are indexed by capture,
+            # at the capture rate rather than the average rate of the video
+            self.fps = self.video.fps
+            self._frame_timestamps = None
+            if frame_map is not None:
+                self._frame_timestamps = frame_map["time"] - frame_map["time"][0]
+                self.fps = int(capture_fps or self.fps)
+            self.frame_width = self.video.frame_width
+            self.frame_height = self.video.frame_height
+            self.total_frames = self.video.total_frames
             self.video_len = self.total_frames / self.fps if self.fps > 0 else 0
             self.current_frame = 0
             self._start_frames.append(0)
             self._end_frames.append(self.total_frames)
 
-            self._mouse_events = metadata.get("mouse_events", {}).get("move", {}) if metadata else {}
-            self._cursors_map = metadata.get("mouse_events", {}).get("cursors_map", {}) if metadata else {}
-            self._region = metadata.get("region", []) if metadata else []
-
             if self._region:
                 x_offset, y_offset = self._region[:2]
             else:
                 x_offset, y_offset = None, None
             self._x_offset = x_offset
             self._y_offset = y_offset
+            # Imported when used, importing pyautogui needs a display
+            import pyautogui
             screen_width, screen_height = pyautogui.size()
             screen_size = int(screen_width * self._device_pixel_ratio), int(screen_height * self._device_pixel_ratio)
-            self._transforms = transforms.Compose({
-                "aspect_ratio": transforms.AspectRatio(self._aspect_ratio, screen_size),
-                "cursor": transforms.Cursor(move_data=self._mouse_events, cursors_map=self._cursors_map, offsets=(x_offset, y_offset), scale=self._cursor_scale),
-                "padding": transforms.Padding(padding=self.padding),
-                # "inset": transforms.Inset(inset=self.inset, color=(0, 0, 0)),
-                "border_shadow": transforms.BorderShadow(border_radius=self.border_radius),
-                "background": transforms.Background(background=self._background),
+            self._transforms = transforms.build_transforms({
+                "aspect_ratio": self._aspect_ratio,
+                "screen_size": screen_size,
+                "move_data": self._mouse_events,
+                "cursors_map": self._cursors_map,
+                "offsets": (x_offset, y_offset),
+                "cursor_scale": self._cursor_scale,
+                "padding": self.padding,
+                "border_radius": self.border_radius,
+                "background": self._background,
             })
+            self._update_render_scale()
 
             # Get first frame
             self.jump_to_frame(0)
@@ -498,6 +675,183 @@ class VideoProcessor(QObject):
         except VideoLoadingError:
             return False
 
+    @property
+    def preview_video(self):
+        """Reader the preview decodes from, the editing proxy when there is one."""
+        return self._preview_video or self.video
+
+    def _start_indexing(self, path, is_recording):
+        # Keyframes are indexed in the background, only recordings keep
+        # the index in a sidecar, removed with the recording
+        self._start_keyframe_indexer(path, cache=is_recording)
+
+        # Recordings are previewed from a short GOP proxy once it is
+        # transcoded, export keeps reading the recording
+        if config.PREVIEW_PROXY and is_recording:
+            proxy_path = get_proxy_path(path)
+            if is_valid_proxy(path, proxy_path, self.video.frame_map):
+                self._open_proxy(proxy_path)
+            else:
+                self._proxy_transcoder = ProxyTranscoder(
+                    path, self.proxyReady.emit,
+                    max_height=config.PREVIEW_PROXY_HEIGHT,
+                    gop=config.PREVIEW_PROXY_GOP
+                )
+                self._proxy_transcoder.start()
+
+    def _on_segments_stitched(self, path):
+        self._segment_stitcher = None
+        if self.video is None or self.video.path != get_segment_list_path(path):
+            return
+        video = FrameReader(path, self.video.frame_map)
+        if not video.isOpened():
+            logger.warning(f"Failed to open the stitched recording {path}")
+            return
+
+        # Exports may still read the segment list, the segments are removed
+        # with the recording
+        self.video.release()
+        self.video = video
+        self._start_indexing(path, is_recording=True)
+        self._clear_caches()
+        self._start_read_ahead()
+        # The prefetcher decodes with a reader of the video it was started with
+        if self._prefetcher is not None:
+            self.play()
+
+    def _stop_segment_stitcher(self):
+        if self._segment_stitcher is not None:
+            self._segment_stitcher.stop()
+            self._segment_stitcher = None
+
+    def _open_proxy(self, proxy_path):
+        self._preview_video = FrameReader(proxy_path, self.video.frame_map)
+        # Proxies only exist for recordings
+        self._start_keyframe_indexer(proxy_path, cache=True)
+
+    def _on_proxy_ready(self, proxy_path):
+        if self.video is None or not is_valid_proxy(self.video.path, proxy_path, self.video.frame_map):
+            return
+        self._open_proxy(proxy_path)
+        self._clear_caches()
+        self._start_read_ahead()
+        # The prefetcher decodes with a reader of the video it was started with
+        if self._prefetcher is not None:
+            self.play()
+
+    def _start_keyframe_indexer(self, path, cache):
+        indexer = KeyframeIndexer(path, self.keyframesReady.emit, cache=cache)
+        self._keyframe_indexers.append(indexer)
+        indexer.start()
+
+    def _stop_keyframe_indexers(self):
+        for indexer in self._keyframe_indexers:
+            indexer.stop()
+        self._keyframe_indexers = []
+
+    def _on_keyframes_ready(self, path, keyframes, frame_times):
+        for reader in (self.video, self._preview_video):
+            if reader is not None and reader.path == path:
+                reader.keyframes = keyframes
+                reader.frame_times = frame_times
+                # The read-ahead reader is created with the index of the preview video
+                if reader is self.preview_video and self._read_ahead is not None:
+                    self._start_read_ahead()
+
+    def _close_events_file(self):
+        if self._events_file is not None:
+            self._events_file.close()
+
+    def _stop_proxy_transcoder(self):
+        if self._proxy_transcoder is not None:
+            self._proxy_transcoder.stop()
+            self._proxy_transcoder = None
+
+    def read_frame(self, index, reader=None):
+        """Return (success, frame) for a captured frame index, from the frame cache when possible.
+
+        Threads other than the one owning the processor pass their own reader.
+        """
+        reader = reader or self.preview_video
+        video_frame = reader.video_frame_index(index)
+        # Keyed by video too, frames of the recording and of its proxy differ in size
+        key = (reader.path, video_frame)
+        frame = self._frame_cache.get(key)
+        if frame is None:
+            ret, frame = reader.read_video_frame(video_frame)
+            if not ret:
+                return False, None
+            self._frame_cache.put(key, frame)
+
+        if self._read_ahead is not None:
+            self._read_ahead.request(index)
+        return True, frame
+
+    @property
+    def render_params_key(self):
+        """Hash of the parameters of the transforms, identifying rendered frames in the render cache."""
+        return hash((
+            self._aspect_ratio,
+            self._padding,
+            self._inset,
+            self._border_radius,
+            self._background.get("type"),
+            repr(self._background.get("value")),
+            self._cursor_scale,
+            self._transforms["aspect_ratio"].scale,
+        ))
+
+    def render(self, index, reader=None, compose=None, params_key=None):
+        """Return (success, frame) for a captured frame index rendered in BGR.
+
+        Frames already rendered with the same parameters come from the render
+        cache, so undoing a change shows them again without rendering. Threads
+        other than the one owning the processor pass their own reader and
+        transforms, see build_preview_transforms, with their parameters key.
+        """
+        if compose is None:
+            params_key = self.render_params_key
+        key = (index, params_key)
+        rendered = self._render_cache.get(key)
+        if rendered is not None:
+            if self._read_ahead is not None:
+                self._read_ahead.request(index)
+            return True, rendered
+
+        ret, frame = self.read_frame(index, reader)
+        if not ret:
+            return False, None
+        rendered = self.compose_frame(frame, index, compose)
+        # Transforms of the owning thread may have been replaced while rendering
+        if compose is not None or self.render_params_key == params_key:
+            self._render_cache.put(key, rendered)
+        return True, rendered
+
+    @property
+    def preview_fps(self):
+        """Frames per second presented during the last playback."""
+        return self._preview_fps
+
+    def _start_read_ahead(self):
+        self._stop_read_ahead()
+        if self._frame_cache.budget > 0:
+            video = self.preview_video
+            self._read_ahead = FrameReadAhead(
+                video.path, self._frame_cache, video.frame_map, video.keyframes, video.frame_times,
+                ahead=config.PREVIEW_READ_AHEAD_FRAMES,
+                behind=config.PREVIEW_READ_BEHIND_FRAMES
+            )
+            self._read_ahead.start()
+
+    def _stop_read_ahead(self):
+        if self._read_ahead is not None:
+            self._read_ahead.stop()
+            self._read_ahead = None
+
+    def _clear_caches(self):
+        self._frame_cache.clear()
+        self._render_cache.clear()
+
     def get_frame(self):
         try:
             t0 = time.time()
@@ -505,11 +859,10 @@ class VideoProcessor(QObject):
                 self.pause()
                 return
 
-            success, frame = self.video.read()
+            success, processed_frame = self.render(self.start_frame + self.current_frame)
             if not success:
                 return
 
-            processed_frame = self.process_frame(frame)
             self.frameProcessed.emit(processed_frame)
             self.current_frame += 1
             t1 = time.time()
@@ -521,14 +874,40 @@ class VideoProcessor(QObject):
 
     @Slot()
     def play(self):
+        # Frames are rendered ahead on the prefetch thread, the timer presents
+        # the frame due on the wall clock and skips the late ones
+        self._stop_prefetcher()
+        self._prefetcher = PlaybackPrefetcher(
+            self, self.start_frame + self.current_frame, self.end_frame,
+            self.build_preview_transforms(), self.render_params_key, config.PREVIEW_PREFETCH_FRAMES
+        )
+        self._prefetcher.start()
+        self._play_start_time = time.perf_counter()
+        self._play_start_frame = self.current_frame
+        self._presented_frames = 0
+
         self.is_playing = True
-        self.play_timer.start(1000 / self.fps)
-        # self.play_timer.start(1)
+        self.play_timer.start(max(1, int(500 / self.fps)))
 
     @Slot()
     def pause(self):
-        self.is_playing = False
         self.play_timer.stop()
+        self._stop_prefetcher()
+        self.is_playing = False
+
+    def _stop_prefetcher(self):
+        if self._prefetcher is None:
+            return
+
+        elapsed = time.perf_counter() - self._play_start_time
+        if elapsed > 0 and self._presented_frames:
+            self._preview_fps = self._presented_frames / elapsed
+            logger.info(
+                f"Preview played {self._presented_frames} frames at {self._preview_fps:.1f} fps "
+                f"(target {self.fps}), skipped {self._prefetcher.skipped} late frames"
+            )
+        self._prefetcher.stop()
+        self._prefetcher = None
 
     @Slot()
     def toggle_play_pause(self):
@@ -547,19 +926,15 @@ class VideoProcessor(QObject):
         self.pause()
         if self.video.isOpened() and self.current_frame > 0:
             self.current_frame -= 1
-            self.video.set(cv2.CAP_PROP_POS_FRAMES, self.current_frame)
-            ret, frame = self.video.read()
+            ret, processed_frame = self.render(self.start_frame + self.current_frame)
             if ret:
-                processed_frame = self.process_frame(frame)
                 self.frameProcessed.emit(processed_frame)
 
     def jump_to_frame(self, target_frame):
         internal_target_frame = min(self.start_frame + target_frame, self.end_frame)
         if self.video.isOpened() and self.start_frame <= internal_target_frame <= self.end_frame:
-            self.video.set(cv2.CAP_PROP_POS_FRAMES, internal_target_frame)
-            ret, frame = self.video.read()
+            ret, processed_frame = self.render(internal_target_frame)
             if ret:
-                processed_frame = self.process_frame(frame)
                 self.current_frame = target_frame
                 self.frameProcessed.emit(processed_frame)
 
@@ -568,29 +943,113 @@ class VideoProcessor(QObject):
             current_position = self.current_frame
             if current_position >= self.total_frames:
                 current_position -= 1
-                self.video.set(cv2.CAP_PROP_POS_FRAMES, current_position)
 
-            ret, frame = self.video.read()
+            ret, processed_frame = self.render(self.start_frame + current_position)
 
             if ret:
-                processed_frame = self.process_frame(frame)
-
-                self.video.set(cv2.CAP_PROP_POS_FRAMES, current_position)
                 self.frameProcessed.emit(processed_frame)
                 self.current_frame = current_position
 
     def process_next_frame(self):
-        self.get_frame()
+        if self._prefetcher is None:
+            self.get_frame()
+            return
+
+        elapsed = time.perf_counter() - self._play_start_time
+        target = self.start_frame + self._play_start_frame + int(elapsed * self.fps)
+        if target >= self.end_frame - 1:
+            self.pause()
+            return
+
+        params_key = self.render_params_key
+        if params_key != self._prefetcher.params_key:
+            self._prefetcher.set_transforms(self.build_preview_transforms(), params_key)
+        ready = self._prefetcher.take(target, params_key)
+        if ready is None:
+            return
 
-    def process_frame(self, frame):
-        result = self._transforms(input=frame, start_frame=self.start_frame + self.current_frame)
+        index, processed_frame = ready
+        self.current_frame = index - self.start_frame
+        self.frameProcessed.emit(processed_frame)
+        self.current_frame += 1
+        self._presented_frames += 1
+
+    def get_export_frames(self, fps):
+        """Source frame indices to render for an export at `fps`.
+
+        Variable frame rate recordings are resampled by their capture times so
+        the exported video keeps real time, otherwise every frame is used once.
+        """
+        if self._frame_timestamps is not None:
+            return resample_frames(self._frame_timestamps, self.start_frame, self.end_frame, fps)
+        return np.arange(self.start_frame, self.end_frame)
+
+    def get_render_config(self):
+        """Picklable description of the video and transforms, used to render
+        frames in other processes with transforms.build_transforms.
+        """
+        background = dict(self._background)
+        if hasattr(background.get("value"), "toLocalFile"):
+            background["value"] = background["value"].toLocalFile()
+
+        # Workers map the events file themselves rather than receiving a copy
+        events_path = self._events_file.path if self._events_file is not None else None
+        return {
+            "video_path": self.video.path,
+            "frame_map": self.video.frame_map,
+            "keyframes": self.video.keyframes,
+            "frame_times": self.video.frame_times,
+            "aspect_ratio": self._aspect_ratio,
+            "screen_size": self._transforms["aspect_ratio"].screen_size,
+            "events_path": events_path,
+            "move_data": None if events_path else self._mouse_events,
+            "cursors_map": None if events_path else self._cursors_map,
+            "offsets": (self._x_offset, self._y_offset),
+            "cursor_scale": self._cursor_scale,
+            "padding": self._padding,
+            "inset": self._inset if self._transforms.get("inset") else None,
+            "border_radius": self._border_radius,
+            "background": background,
+        }
+
+    def build_preview_transforms(self):
+        """Transforms with the current preview parameters, for rendering on another thread."""
+        render_config = self.get_render_config()
+        render_config.update({
+            "move_data": self._mouse_events,
+            "cursors_map": self._cursors_map,
+            "render_scale": self._transforms["aspect_ratio"].scale,
+        })
+        return transforms.build_transforms(render_config)
+
+    def compose_frame(self, frame, frame_index=None, compose=None):
+        """Run the transforms on a source frame, returning the composited frame in BGR."""
+        if frame_index is None:
+            frame_index = self.start_frame + self.current_frame
+        return (compose or self._transforms)(
+            input=frame,
+            start_frame=frame_index,
+            source_size=(self.frame_width, self.frame_height)
+        )
+
+    def process_frame(self, frame, frame_index=None):
+        result = self.compose_frame(frame, frame_index)
         result = cv2.cvtColor(result, cv2.COLOR_BGR2RGB)
         return result
 
     def clean(self):
+        self.pause()
+        self._stop_segment_stitcher()
+        self._stop_proxy_transcoder()
+        self._stop_keyframe_indexers()
+        self._stop_read_ahead()
+        self._clear_caches()
+        self._close_events_file()
         try:
             if self.video:
                 self.video.release()
+            if self._preview_video:
+                self._preview_video.release()
         except:
             logger.warning(f"Failed to release video capture")
 
@@ -58,6 +58,7 @@ Dialog {
     property string exportCompression: "Studio"
 
     property int estimatedExportTime: -1
+    property string exportError: ""
 
     signal exportProgress(real progress)
     signal exportFinished
@@ -484,13 +485,14 @@ Dialog {
                 spacing: 20
 
                 Text {
-                    text: 'Export Completed Successfully!'
+                    text: exportError ? 'Export Failed' : 'Export Completed Successfully!'
                     color: "white"
                     font.pixelSize: 24
                     Layout.alignment: Qt.AlignHCenter
                 }
                 Text {
                     text: {
+                        if (exportError) return exportError;
                         var basePath = (Qt.platform.os === "osx") ? "~/Movies" : "~/Videos";
                         return `${basePath}/ScreenVivid/${outputPath}.${exportFormat.toLowerCase()}`;
                     }
@@ -531,6 +533,10 @@ Dialog {
                 estimatedTimeText.visible = false
                 successContainer.visible = true
             }
+            function onExportFailed(error) {
+                exportError = error
+                onExportFinished()
+            }
         }
     }
 
@@ -543,6 +549,7 @@ Dialog {
         exportProgressBar.visible = false
         cancelExportButton.visible = false
         exportProgressBar.value = 0
+        exportError = ""
 
         estimatedTimeText.visible = false
         estimatedExportTime = -1
@@ -0,0 +1,84 @@
+"""Benchmark the fixed-point blend kernels against the float path they replace.
+
+Run from the repository root:
+
+    PYTHONPATH=. python scripts/benchmark_blend.py
+"""
+import timeit
+
+import numpy as np
+
+from screenvivid.models.utils.blend import blend, blend_premultiplied, multiply, premultiply, to_alpha
+
+
+def report(name, float_path, fixed_path, reference, number):
+    float_time = min(timeit.repeat(float_path, number=number, repeat=3)) / number * 1e6
+    fixed_time = min(timeit.repeat(fixed_path, number=number, repeat=3)) / number * 1e6
+    float_error = np.abs(float_path().astype(int) - reference).max()
+    fixed_error = np.abs(fixed_path().astype(int) - reference).max()
+    print(
+        f"{name:<22} float {float_time:9.1f} us (max error {float_error})   "
+        f"fixed {fixed_time:9.1f} us (max error {fixed_error})"
+    )
+
+
+def benchmark_cursor(rng):
+    for size in (32, 64, 128):
+        cursor = rng.integers(0, 256, (size, size, 4), dtype=np.uint8)
+        region = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+        premultiplied, inverse_alpha = premultiply(cursor)
+        coverage = cursor[:, :, 3:4] / 255.0
+        exact = np.rint(cursor[:, :, :3] * coverage + region * (1 - coverage)).astype(int)
+
+        def float_cursor():
+            alpha = (cursor[:, :, 3].astype(np.float32) / 255.0)[:, :, np.newaxis]
+            return (cursor[:, :, :3] * alpha + region * (1 - alpha)).astype(np.uint8)
+
+        report(
+            f"cursor {size}x{size}", float_cursor,
+            lambda: blend_premultiplied(region, premultiplied, inverse_alpha), exact, 1000
+        )
+
+
+def benchmark_corners(rng):
+    for radius in (20, 50):
+        mask = rng.integers(0, 256, (radius, radius)) / 255.0
+        plate = rng.integers(0, 256, (radius, radius, 3), dtype=np.uint8)
+        foreground = rng.integers(0, 256, (radius, radius, 3), dtype=np.uint8)
+        alpha = to_alpha(mask)
+        inverse_alpha = 255 - alpha
+        exact = np.rint((1 - mask[:, :, np.newaxis]) * plate + mask[:, :, np.newaxis] * foreground).astype(int)
+
+        def float_corner():
+            a = mask[:, :, np.newaxis]
+            return ((1 - a) * plate + a * foreground).astype(np.uint8)
+
+        report(
+            f"corner radius {radius}", float_corner,
+            lambda: blend(plate, foreground, alpha, inverse_alpha=inverse_alpha), exact, 1000
+        )
+
+
+def benchmark_shadow(rng):
+    for width, height in ((3840, 40), (1920, 1080)):
+        shadow = (rng.integers(0, 256, (height, width)) / 255.0).astype(np.float32)
+        background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        inverse_shadow = to_alpha(1 - shadow)
+        exact = np.rint((1 - shadow[:, :, np.newaxis].astype(np.float64)) * background).astype(int)
+
+        def float_shadow():
+            return ((1 - shadow[:, :, np.newaxis]) * background).astype(np.uint8)
+
+        report(f"shadow {width}x{height}", float_shadow, lambda: multiply(background, inverse_shadow), exact, 20)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print("Max errors are against the exactly rounded result")
+    benchmark_cursor(rng)
+    benchmark_corners(rng)
+    benchmark_shadow(rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from screenvivid.models.utils import blend
+
+
+@pytest.fixture
+def images():
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, (32, 48, 3), dtype=np.uint8)
+    foreground = rng.integers(0, 256, (32, 48, 3), dtype=np.uint8)
+    alpha = rng.integers(0, 256, (32, 48, 3), dtype=np.uint8)
+    return background, foreground, alpha
+
+
+def error(result, expected):
+    return np.abs(result.astype(np.float64) - expected).max()
+
+
+def test_multiply_rounds_exactly(images):
+    _, foreground, alpha = images
+    expected = foreground * (alpha / 255)
+    assert error(blend.multiply(foreground, alpha), expected) <= 0.5
+
+
+def test_blend_within_one_level(images):
+    background, foreground, alpha = images
+    weight = alpha / 255
+    expected = foreground * weight + background * (1 - weight)
+    assert error(blend.blend(background, foreground, alpha), expected) <= 1
+
+
+def test_blend_opaque_and_transparent(images):
+    background, foreground, _ = images
+    opaque = np.full_like(foreground, 255)
+    np.testing.assert_array_equal(blend.blend(background, foreground, opaque), foreground)
+    np.testing.assert_array_equal(blend.blend(background, foreground, 255 - opaque), background)
+
+
+def test_blend_premultiplied_within_one_level(images):
+    background, foreground, alpha = images
+    bgra = np.dstack([foreground, alpha[..., 0]])
+    premultiplied, inverse_alpha = blend.premultiply(bgra)
+    weight = alpha[..., :1] / 255
+    expected = foreground * weight + background * (1 - weight)
+    assert error(blend.blend_premultiplied(background, premultiplied, inverse_alpha), expected) <= 1
+
+
+def test_blend_into_output(images):
+    background, foreground, alpha = images
+    out = np.empty_like(background)
+    result = blend.blend(background, foreground, alpha, out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, blend.blend(background, foreground, alpha))
+
+    # Writing over the background itself
+    expected = out.copy()
+    assert blend.blend(background, foreground, alpha, out=background) is background
+    np.testing.assert_array_equal(background, expected)
+
+
+def test_to_alpha():
+    alpha = blend.to_alpha(np.array([[0.0, 0.5, 1.0]]))
+    assert alpha.shape == (1, 3, 3) and alpha.dtype == np.uint8
+    np.testing.assert_array_equal(alpha[0, :, 0], [0, 128, 255])
+    assert blend.to_alpha(np.ones((2, 2, 1)), channels=1).shape == (2, 2, 1)
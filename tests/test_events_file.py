@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from screenvivid.models.utils.events_file import (
+    CHUNK_HEADER, HEADER, MAGIC, TRACK, V1_DTYPES, EventsFile, EventsWriter, get_events_path
+)
+from screenvivid.models.utils.mouse_events import MoveTrack
+from screenvivid.models.utils.pointer import PointerLog
+
+REGION = [0, 0, 100, 50]
+
+
+def record(path, pointer_log=None, complete=True, frames=3):
+    writer = EventsWriter(path, frames_per_chunk=2)
+    writer.open({"region": REGION, "fps": 30}, pointer_log=pointer_log)
+    writer.write_states(["arrow"])
+    cursor_image = np.arange(2 * 3 * 4, dtype=np.uint8).reshape(2, 3, 4)
+    writer.add_cursor("arrow", {"1": [{"image": cursor_image, "offset": (1, 2)}]})
+    for frame in range(frames):
+        writer.add_frame(frame, 10.0 + frame / 30, 0, 0)
+    if complete:
+        writer.write_track(MoveTrack([0.1, 0.2, 0.3], [0.5, 0.5, 0.5], [0, 1, 2], [0, 0, 0], [0, 0, 0], ["arrow"]))
+        writer.write_metadata({"complete": True})
+    writer.close(complete)
+    return cursor_image
+
+
+def test_events_path():
+    assert get_events_path("/videos/rec.mp4") == "/videos/rec.events"
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "rec.events")
+    cursor_image = record(path)
+
+    with EventsFile.open(path) as events_file:
+        assert events_file.metadata == {"region": REGION, "fps": 30, "complete": True}
+        assert events_file.complete
+        assert events_file.state_names == ["arrow"]
+        np.testing.assert_array_equal(events_file.frames["frame"], [0, 1, 2])
+
+        track = events_file.move_track
+        np.testing.assert_allclose(track.x, [0.1, 0.2, 0.3])
+        assert track[1][3] == "arrow"
+
+        cursor = events_file.cursors_map["arrow"]["1"][0]
+        np.testing.assert_array_equal(cursor["image"], cursor_image)
+        assert cursor["offset"] == (1, 2)
+
+    # Decoded columns are copies that outlive the mapping
+    assert track.x[2] == pytest.approx(0.3)
+
+
+def test_interrupted_recording_resamples_pointer(tmp_path):
+    path = str(tmp_path / "rec.events")
+    pointer_log = PointerLog()
+    for frame in range(3):
+        pointer_log.add_move(10.0 + frame / 30, 10.0 * frame, 25.0)
+    pointer_log.add_click(10.0 + 1.5 / 30, 50.0, 25.0, 1, True)
+    record(path, pointer_log=pointer_log, complete=False)
+
+    events_file = EventsFile.open(path)
+    try:
+        assert not events_file.complete
+        track = events_file.move_track
+        np.testing.assert_allclose(track.x, [0.0, 0.1, 0.2])
+        np.testing.assert_allclose(track.y, [0.5, 0.5, 0.5])
+
+        (click,) = events_file.clicks
+        assert click[:3] == (0.5, 0.5, 1)
+        assert click[4] is True
+    finally:
+        events_file.close()
+
+
+def test_truncated_file_keeps_complete_chunks(tmp_path):
+    path = tmp_path / "rec.events"
+    record(str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+
+    # The last frames are flushed on close, after the track
+    events_file = EventsFile.open(str(path))
+    try:
+        assert events_file.state_names == ["arrow"]
+        np.testing.assert_array_equal(events_file.frames["frame"], [0, 1])
+        assert len(events_file.move_track) == 3
+    finally:
+        events_file.close()
+
+
+def test_positions_keep_double_precision(tmp_path):
+    path = str(tmp_path / "rec.events")
+    x = 0.1234567891234
+    writer = EventsWriter(path)
+    writer.open({"region": REGION})
+    writer.write_track(MoveTrack([x], [1 - x], [0], [0], [0], []))
+    writer.close()
+
+    with EventsFile.open(path) as events_file:
+        assert events_file.move_track.x[0] == x
+        assert events_file.move_track.y[0] == 1 - x
+
+
+def test_version_1_file(tmp_path):
+    path = tmp_path / "rec.events"
+    track = np.zeros(2, dtype=V1_DTYPES[TRACK])
+    track["frame"] = [0, 1]
+    track["x"] = [0.25, 0.75]
+    payload = track.tobytes()
+    path.write_bytes(HEADER.pack(MAGIC, 1, 0) + CHUNK_HEADER.pack(TRACK, len(payload)) + payload)
+
+    with EventsFile.open(str(path)) as events_file:
+        np.testing.assert_array_equal(events_file.move_track.x, [0.25, 0.75])
+
+
+def test_missing_or_invalid_file(tmp_path):
+    path = tmp_path / "rec.events"
+    assert EventsFile.open(str(path)) is None
+
+    path.write_bytes(b"not an events file")
+    assert EventsFile.open(str(path)) is None
@@ -0,0 +1,81 @@
+import numpy as np
+
+from screenvivid import config
+from screenvivid.models.export import (
+    get_codec_config, get_color_primaries, get_encode_chunks, get_export_command, get_export_workers
+)
+from screenvivid.models.utils.render import render_frame
+
+
+def test_export_workers(monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_WORKERS", 3)
+    assert get_export_workers() == 3
+
+    # 0 uses all cores but one
+    monkeypatch.setattr(config, "EXPORT_WORKERS", 0)
+    monkeypatch.setattr("os.cpu_count", lambda: 8)
+    assert get_export_workers() == 7
+    monkeypatch.setattr("os.cpu_count", lambda: 1)
+    assert get_export_workers() == 1
+
+
+def test_render_frame_converts_to_rgb_of_output_size():
+    def compose(input, start_frame, reuse_output):
+        assert reuse_output
+        return input
+
+    frame = np.zeros((4, 6, 3), dtype=np.uint8)
+    frame[..., 0] = 255
+    result = render_frame(compose, frame, 0, (6, 4))
+    assert result.shape == (4, 6, 3)
+    assert (result[..., 2] == 255).all() and (result[..., 0] == 0).all()
+
+    assert render_frame(compose, frame, 0, (12, 8)).shape == (8, 12, 3)
+
+
+def test_export_command_pipes_raw_rgb():
+    cmd = get_export_command("ffmpeg", "/videos/out.mp4", 30, (1280, 720), {})
+    assert cmd[cmd.index("-f") + 1] == "rawvideo"
+    assert cmd[cmd.index("-pixel_format") + 1] == "rgb24"
+    assert cmd[cmd.index("-video_size") + 1] == "1280x720"
+    assert cmd[cmd.index("-framerate") + 1] == "30"
+    assert cmd[cmd.index("-i") + 1] == "-"
+    assert cmd[cmd.index("-vf") + 1] == "scale=out_color_matrix=bt709:out_range=tv"
+    assert cmd[cmd.index("-c:v") + 1] == "libx264"
+    assert cmd[cmd.index("-color_primaries") + 1] == "bt709"
+    assert cmd[-1] == "/videos/out.mp4"
+
+
+def test_export_command_pads_odd_sizes_and_overrides_params():
+    cmd = get_export_command("ffmpeg", "out.mp4", 60, (1279, 719), {"codec_params": {"crf": "28"}})
+    assert cmd[cmd.index("-vf") + 1].startswith("scale=1280:720:")
+    assert cmd[cmd.index("-crf") + 1] == "28"
+
+
+def test_codec_config_falls_back_to_h264():
+    codec_config = get_codec_config("linux", "unknown")
+    assert codec_config["codec"] == "libx264"
+    # The configuration is a copy, overriding it keeps the defaults
+    codec_config["params"]["crf"] = "0"
+    assert get_codec_config("linux")["params"]["crf"] != "0"
+
+
+def test_color_primaries_without_profile():
+    assert get_color_primaries(None) == "bt709"
+    assert get_color_primaries("/missing.icc") == "bt709"
+
+
+def test_encode_chunks(monkeypatch):
+    monkeypatch.setattr(config, "EXPORT_MIN_CHUNK_SECONDS", 2)
+    frame_indices = list(range(300))
+
+    chunks = get_encode_chunks({"frame_indices": frame_indices, "fps": 30, "encode_chunks": 4})
+    assert [len(chunk) for chunk in chunks] == [75, 75, 75, 75]
+    assert sum(chunks, []) == frame_indices
+
+    # Chunks are at least EXPORT_MIN_CHUNK_SECONDS long
+    chunks = get_encode_chunks({"frame_indices": frame_indices, "fps": 30, "encode_chunks": 8})
+    assert len(chunks) == 5
+
+    assert len(get_encode_chunks({"frame_indices": frame_indices[:30], "fps": 30, "encode_chunks": 4})) == 1
+    assert len(get_encode_chunks({"frame_indices": frame_indices, "fps": 30, "encode_chunks": 0})) == 1
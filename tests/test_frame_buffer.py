@@ -0,0 +1,144 @@
+import queue
+
+import pytest
+
+from screenvivid.models.utils.frame_buffer import (
+    BLOCK, DROP_OLDEST, DUPLICATE_LAST, MIN_BUFFERS, FrameChangeDetector, FramePool
+)
+
+
+def fill(pool):
+    """Acquire and queue every buffer of the pool."""
+    buffers = []
+    for i in range(pool.capacity):
+        buffer = pool.acquire(timeout=0)
+        buffer.data[:] = bytes([i]) * len(buffer.data)
+        pool.put(buffer.view, i, buffer)
+        buffers.append(buffer)
+    return buffers
+
+
+def test_capacity_follows_budget():
+    assert FramePool(budget=10 * 100, frame_size=100).capacity == 10
+    assert FramePool(budget=100, frame_size=100).capacity == MIN_BUFFERS
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        FramePool(budget=1000, frame_size=0)
+    with pytest.raises(ValueError):
+        FramePool(budget=1000, frame_size=100, policy="unknown")
+
+
+def test_buffers_are_preallocated_only_when_asked():
+    assert FramePool(budget=400, frame_size=100).acquire().size == 100
+    assert FramePool(budget=400, frame_size=100, preallocate=False).acquire().size == 0
+
+
+def test_released_buffer_is_reused():
+    pool = FramePool(budget=400, frame_size=100, policy=BLOCK)
+    buffer = pool.acquire(timeout=0)
+    assert buffer.refs == 1
+    pool.put(buffer.view, 1.0, buffer)
+
+    entry = pool.get(timeout=0)
+    assert entry.buffer is buffer and entry.frame_time == 1.0
+    pool.release(buffer)
+    assert buffer.refs == 0
+
+    fill(pool)
+    assert pool.acquire(timeout=0) is None
+
+
+def test_retained_buffer_is_freed_on_last_release():
+    pool = FramePool(budget=400, frame_size=100, policy=BLOCK)
+    buffers = fill(pool)
+    pool.retain(buffers[0])
+    pool.release(buffers[0])
+    assert pool.acquire(timeout=0) is None
+
+    pool.release(buffers[0])
+    assert pool.acquire(timeout=0) is buffers[0]
+
+
+def test_block_waits_for_a_free_buffer():
+    pool = FramePool(budget=400, frame_size=100, policy=BLOCK)
+    buffers = fill(pool)
+    assert pool.acquire(timeout=0.01) is None
+    assert pool.dropped_frames == 0
+
+    pool.release(buffers[2])
+    assert pool.acquire(timeout=0.01) is buffers[2]
+
+
+def test_drop_oldest_reuses_the_oldest_queued_frame():
+    pool = FramePool(budget=400, frame_size=100, policy=DROP_OLDEST)
+    buffers = fill(pool)
+
+    assert pool.acquire(timeout=0) is buffers[0]
+    assert pool.dropped_frames == 1
+
+    # The dropped frame stays queued as a repeat so the timeline keeps its length
+    entry = pool.get(timeout=0)
+    assert entry.is_repeat and entry.buffer is None and entry.frame_time == 0
+    assert pool.get(timeout=0).buffer is buffers[1]
+
+
+def test_drop_oldest_skips_retained_buffers():
+    pool = FramePool(budget=400, frame_size=100, policy=DROP_OLDEST)
+    buffers = fill(pool)
+    pool.retain(buffers[0])
+
+    assert pool.acquire(timeout=0) is buffers[1]
+
+
+def test_duplicate_last_repeats_instead_of_capturing():
+    pool = FramePool(budget=400, frame_size=100, policy=DUPLICATE_LAST)
+    fill(pool)
+
+    assert pool.acquire(timeout=0) is FramePool.REPEAT
+    assert pool.duplicated_frames == 1
+    assert pool.dropped_frames == 0
+
+
+def test_get_in_order_until_the_end():
+    pool = FramePool(budget=400, frame_size=100)
+    with pytest.raises(queue.Empty):
+        pool.get(timeout=0)
+
+    pool.put(b"a", 1.0)
+    pool.put_repeat(2.0)
+    pool.put_end()
+    assert pool.get(timeout=0).data == b"a"
+    assert pool.get(timeout=0).is_repeat
+    assert pool.get(timeout=0) is None
+
+
+def test_change_detector_keeps_the_previous_buffer():
+    pool = FramePool(budget=400, frame_size=4, policy=BLOCK)
+    detector = FrameChangeDetector(pool)
+
+    first = pool.acquire(timeout=0)
+    first.data[:] = b"abcd"
+    assert detector.has_changed(first.view, first)
+    assert first.refs == 2
+
+    same = pool.acquire(timeout=0)
+    same.data[:] = b"abcd"
+    assert not detector.has_changed(same.view, same)
+    assert same.refs == 1
+
+    changed = pool.acquire(timeout=0)
+    changed.data[:] = b"abce"
+    assert detector.has_changed(changed.view, changed)
+    assert first.refs == 1 and changed.refs == 2
+
+    detector.reset()
+    assert changed.refs == 1
+
+
+def test_change_detector_compares_bytes_without_buffers():
+    detector = FrameChangeDetector(FramePool(budget=400, frame_size=4))
+    assert detector.has_changed(b"abcd")
+    assert not detector.has_changed(b"abcd")
+    assert detector.has_changed(b"abce")
@@ -0,0 +1,63 @@
+import numpy as np
+
+from screenvivid.models.utils.frame_cache import FrameCache
+
+MB = 1024 * 1024
+
+
+def frame(mb):
+    return np.zeros(int(mb * MB), dtype=np.uint8)
+
+
+def test_size_counts_bytes():
+    cache = FrameCache(budget_mb=4)
+    cache.put("a", frame(1))
+    cache.put("b", frame(2))
+    assert cache.size == 3 * MB
+    assert len(cache) == 2
+
+
+def test_replacing_a_frame_updates_the_size():
+    cache = FrameCache(budget_mb=4)
+    cache.put("a", frame(1))
+    cache.put("a", frame(2))
+    assert cache.size == 2 * MB
+    assert len(cache) == 1
+
+
+def test_least_recently_used_frames_are_evicted():
+    cache = FrameCache(budget_mb=3)
+    for key in "abc":
+        cache.put(key, frame(1))
+
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") is not None
+    cache.put("d", frame(1))
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert cache.size == 3 * MB
+
+
+def test_large_frame_evicts_several():
+    cache = FrameCache(budget_mb=3)
+    for key in "abc":
+        cache.put(key, frame(1))
+    cache.put("d", frame(2.5))
+    assert list(key for key in "abcd" if key in cache) == ["d"]
+    assert cache.size == int(2.5 * MB)
+
+
+def test_frame_over_budget_is_not_cached():
+    cache = FrameCache(budget_mb=1)
+    cache.put("a", frame(0.5))
+    cache.put("b", frame(2))
+    assert "b" not in cache and "a" in cache
+    assert cache.size == MB // 2
+
+
+def test_missing_key_and_clear():
+    cache = FrameCache(budget_mb=1)
+    assert cache.get("a") is None
+    cache.put("a", frame(0.5))
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+
+from screenvivid.models.utils.keyframes import (
+    get_keyframes_path, parse_keyframe_index, read_keyframe_index, write_keyframe_index
+)
+
+# Packets in decode order, B-frames are presented before the P-frame decoded ahead of them
+FRAMECRC = """#software: Lavf61.1.100
+#tb 0: 1/1000
+#media_type 0: video
+#codec_id 0: h264
+#dimensions 0: 64x48
+#sar 0: 1/1
+#stream#, dts,        pts, duration,     size, hash
+0,        -20,          0,       10,     1000, 0x00000001
+0,        -10,         30,       10,      200, 0x00000002, F=0x0
+0,          0,         10,       10,      100, 0x00000003, F=0x0
+0,         10,         20,       10,      100, 0x00000004, F=0x0
+0,         20,         40,       10,     1000, 0x00000005, F=0x1
+0,         30,         50,       10,      200, 0x00000006, F=0x0
+0,         40,         60,       10,     1000, 0x00000007, F=0x3
+"""
+
+
+def test_parse_keyframes_and_times_in_presentation_order():
+    keyframes, frame_times = parse_keyframe_index(FRAMECRC)
+    np.testing.assert_array_equal(keyframes, [0, 4, 6])
+    np.testing.assert_allclose(frame_times, [0, 0.01, 0.02, 0.03, 0.04, 0.05, 0.06])
+
+
+def test_frame_times_start_at_zero():
+    framecrc = "#tb 0: 1/90000\n0, 9000, 9000, 3000, 10, 0x1\n0, 12000, 12000, 3000, 10, 0x2, F=0x0\n"
+    keyframes, frame_times = parse_keyframe_index(framecrc)
+    np.testing.assert_array_equal(keyframes, [0])
+    np.testing.assert_allclose(frame_times, [0, 1 / 30])
+
+
+def test_parse_empty_listing():
+    keyframes, frame_times = parse_keyframe_index("#tb 0: 1/1000\n")
+    assert len(keyframes) == 0 and len(frame_times) == 0
+
+
+def test_sidecar_round_trip(tmp_path):
+    video_path = str(tmp_path / "rec.mp4")
+    open(video_path, "wb").close()
+    assert read_keyframe_index(video_path) is None
+
+    write_keyframe_index(video_path, *parse_keyframe_index(FRAMECRC))
+    assert os.path.exists(get_keyframes_path(video_path))
+    keyframes, frame_times = read_keyframe_index(video_path)
+    np.testing.assert_array_equal(keyframes, [0, 4, 6])
+    assert len(frame_times) == 7
+
+
+def test_outdated_or_invalid_sidecar_is_ignored(tmp_path):
+    video_path = str(tmp_path / "rec.mp4")
+    open(video_path, "wb").close()
+    write_keyframe_index(video_path, *parse_keyframe_index(FRAMECRC))
+
+    mtime = os.path.getmtime(get_keyframes_path(video_path))
+    os.utime(video_path, (mtime + 10, mtime + 10))
+    assert read_keyframe_index(video_path) is None
+
+    np.array([0, 250], dtype="<i4").tofile(get_keyframes_path(video_path))
+    os.utime(video_path, (mtime - 10, mtime - 10))
+    assert read_keyframe_index(video_path) is None
@@ -0,0 +1,53 @@
+import pytest
+
+from screenvivid.models.utils import matroska
+
+
+def read_size(data, offset):
+    width = 8 - data[offset].bit_length() + 1
+    value = int.from_bytes(data[offset:offset + width], "big") & ((1 << (7 * width)) - 1)
+    return value, offset + width
+
+
+def test_sizes_use_the_shortest_width():
+    assert matroska._size(0) == b"\x80"
+    assert matroska._size(126) == b"\xfe"
+    # 127 on one byte would read as an unknown size
+    assert matroska._size(127) == b"\x40\x7f"
+    assert read_size(matroska._size(1 << 20), 0) == (1 << 20, 3)
+
+
+def test_raw_stream_header():
+    header = matroska.stream_header(320, 240, 30, "yuv420p")
+    assert header.startswith(matroska.EBML)
+    assert matroska.SEGMENT + matroska.UNKNOWN_SIZE in header
+    assert b"V_UNCOMPRESSED" in header
+    assert matroska.COLOUR_SPACE + b"\x84I420" in header
+    assert matroska._uint(matroska.PIXEL_WIDTH, 320) in header
+    assert matroska._uint(matroska.DEFAULT_DURATION, 33333333) in header
+
+
+def test_jpeg_stream_header():
+    header = matroska.stream_header(320, 240, 30)
+    assert b"V_MJPEG" in header and matroska.COLOUR_SPACE not in header
+
+
+def test_unsupported_pixel_format():
+    with pytest.raises(KeyError):
+        matroska.stream_header(320, 240, 30, "rgb24")
+
+
+def test_frame_header_wraps_the_frame_in_a_cluster():
+    frame = bytes(1000)
+    data = matroska.frame_header(1234, len(frame)) + frame
+    assert data.startswith(matroska.CLUSTER)
+
+    size, offset = read_size(data, len(matroska.CLUSTER))
+    assert offset + size == len(data)
+    assert data[offset:offset + 4] == matroska._uint(matroska.CLUSTER_TIMESTAMP, 1234)
+
+    offset += 4
+    assert data[offset:offset + 1] == matroska.SIMPLE_BLOCK
+    size, offset = read_size(data, offset + 1)
+    assert data[offset:offset + 4] == matroska.BLOCK_HEADER
+    assert offset + size == len(data)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from screenvivid.models.utils.mouse_events import MoveTrack, StateTable, as_move_track
+
+MOVES = {
+    2: (0.3, 0.6, 2, "text", 0),
+    0: (0.1, 0.2, 0, "arrow", 0),
+    1: (0.2, 0.4, 1, "arrow", 1),
+}
+
+
+def test_from_dict_sorts_rows():
+    track = MoveTrack.from_dict(MOVES)
+    np.testing.assert_array_equal(track.frame, [0, 1, 2])
+    assert track.state_names == ["text", "arrow"]
+    assert track.to_dict() == dict(sorted(MOVES.items()))
+
+
+def test_lookups():
+    track = MoveTrack.from_dict({0: MOVES[0], 2: MOVES[2]})
+    assert len(track) == 2
+    assert 0 in track and 2 in track
+    assert 1 not in track and 5 not in track and None not in track
+    assert track[2] == MOVES[2]
+    assert track.get(1) is None
+    assert track.get(-1, "missing") == "missing"
+    with pytest.raises(KeyError):
+        track[1]
+
+
+def test_positions_keep_full_precision():
+    x = 0.123456789012345
+    track = MoveTrack([x], [1 - x], [0], [0], [0], ["arrow"])
+    assert track.x.dtype == np.float64
+    assert track[0][:2] == (x, 1 - x)
+
+
+def test_range():
+    track = MoveTrack.from_dict(MOVES).range(1, 3)
+    np.testing.assert_array_equal(track.frame, [1, 2])
+    assert track[1] == MOVES[1]
+    assert 0 not in track
+
+
+def test_state_table():
+    states = StateTable()
+    assert [states.intern(name) for name in ["arrow", "text", "arrow"]] == [0, 1, 0]
+    assert states.names == ["arrow", "text"]
+
+
+def test_as_move_track():
+    track = MoveTrack.from_dict(MOVES)
+    assert as_move_track(track) is track
+    assert len(as_move_track({})) == 0
+    assert len(as_move_track(None)) == 0
+    assert as_move_track(MOVES)[0] == MOVES[0]
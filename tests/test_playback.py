@@ -0,0 +1,66 @@
+import time
+from types import SimpleNamespace
+
+from screenvivid.models.utils.playback import PlaybackPrefetcher
+
+
+class FakeVideoProcessor:
+    def __init__(self):
+        self.preview_video = SimpleNamespace(path="missing.mp4", frame_map=None, keyframes=None, frame_times=None)
+        self.rendered = []
+
+    def render(self, index, reader, compose, params_key):
+        self.rendered.append((index, params_key))
+        return True, compose(index)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_take_returns_latest_due_frame():
+    processor = FakeVideoProcessor()
+    prefetcher = PlaybackPrefetcher(processor, 0, 100, lambda index: index * 10, "a", size=4)
+    prefetcher.start()
+    try:
+        # The ring buffer holds `size` frames until the player takes them
+        assert wait_for(lambda: len(processor.rendered) == 4)
+        time.sleep(0.05)
+        assert len(processor.rendered) == 4
+
+        assert prefetcher.take(2, "a") == (2, 20)
+        assert prefetcher.skipped == 2
+        assert prefetcher.take(2, "a") is None
+    finally:
+        prefetcher.stop()
+
+
+def test_skips_late_and_stale_frames():
+    processor = FakeVideoProcessor()
+    prefetcher = PlaybackPrefetcher(processor, 0, 100, lambda index: index, "a", size=2)
+    prefetcher.start()
+    try:
+        assert wait_for(lambda: len(processor.rendered) == 2)
+        prefetcher.set_transforms(lambda index: -index, "b")
+
+        # Frames rendered with the old parameters are dropped, rendering
+        # resumes at the playhead
+        assert prefetcher.take(50, "b") is None
+        assert prefetcher.skipped == 2
+        assert wait_for(lambda: len(processor.rendered) == 4)
+        assert processor.rendered[2:] == [(50, "b"), (51, "b")]
+        assert prefetcher.take(51, "b") == (51, -51)
+    finally:
+        prefetcher.stop()
+
+
+def test_stops_at_end_frame():
+    processor = FakeVideoProcessor()
+    prefetcher = PlaybackPrefetcher(processor, 5, 8, lambda index: index, "a")
+    prefetcher.start()
+    assert wait_for(lambda: len(processor.rendered) == 3)
+    prefetcher.stop()
+    assert [index for index, _ in processor.rendered] == [5, 6, 7]
@@ -0,0 +1,76 @@
+import numpy as np
+
+from screenvivid.models.utils.pointer import (
+    PointerLog, assign_clicks, get_button_name, resample_positions, to_relative
+)
+
+
+def test_pointer_log_columns():
+    log = PointerLog()
+    for t, x, y in [(0.0, 1, 2), (0.1, 3, 4), (0.2, 5, 6)]:
+        log.add_move(t, x, y)
+
+    assert len(log) == 3
+    times, x, y = log.move_columns(start=1)
+    np.testing.assert_allclose(times, [0.1, 0.2])
+    np.testing.assert_allclose(x, [3, 5])
+    np.testing.assert_allclose(y, [4, 6])
+
+    # Columns are copies, later moves do not change them
+    log.add_move(0.3, 7, 8)
+    assert len(times) == 2
+
+
+def test_resample_interpolates_close_samples():
+    move_times = np.array([0.0, 0.05])
+    x, y = resample_positions([0.025], move_times, np.array([0.0, 10.0]), np.array([0.0, 20.0]))
+    np.testing.assert_allclose(x, [5.0])
+    np.testing.assert_allclose(y, [10.0])
+
+
+def test_resample_holds_resting_pointer():
+    move_times = np.array([0.0, 1.0])
+    move_x = np.array([0.0, 10.0])
+    move_y = np.array([0.0, 10.0])
+
+    # The gap is too long to interpolate, the pointer stays put until it moves
+    x, _ = resample_positions([-1.0, 0.5, 1.0, 2.0], move_times, move_x, move_y)
+    np.testing.assert_allclose(x, [0.0, 0.0, 10.0, 10.0])
+
+
+def test_resample_sorts_out_of_order_samples():
+    move_times = np.array([0.05, 0.0])
+    x, _ = resample_positions([0.0, 0.05], move_times, np.array([10.0, 0.0]), np.array([0.0, 0.0]))
+    np.testing.assert_allclose(x, [0.0, 10.0])
+
+
+def test_resample_without_samples():
+    x, y = resample_positions([0.0, 1.0], np.array([]), np.array([]), np.array([]))
+    np.testing.assert_array_equal(x, [0.0, 0.0])
+    np.testing.assert_array_equal(y, [0.0, 0.0])
+
+
+def test_to_relative():
+    region = (100, 50, 200, 100)
+    assert to_relative(200, 100, region) == (0.5, 0.5)
+    assert to_relative(100, 50, region, device_pixel_ratio=2.0) == (0.5, 0.5)
+
+
+def test_assign_clicks_to_last_frame_before():
+    region = (0, 0, 100, 100)
+    frame_times = np.array([0.0, 0.1, 0.2])
+    frame_indices = np.array([0, 1, 1])
+    clicks = [(0.15, 50, 25, 1, True), (-1.0, 0, 0, 3, False), (0.3, 100, 100, 2, True)]
+
+    assert assign_clicks(clicks, frame_times, frame_indices, region) == [
+        (0.5, 0.25, 1, "left", True),
+        (0.0, 0.0, 0, "right", False),
+        (1.0, 1.0, 1, "middle", True),
+    ]
+    assert assign_clicks(clicks, np.array([]), np.array([]), region) == []
+
+
+def test_button_names():
+    assert get_button_name(3) == "right"
+    # Unknown buttons fall back to a left click
+    assert get_button_name(8) == "left"
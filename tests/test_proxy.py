@@ -0,0 +1,51 @@
+import numpy as np
+
+from screenvivid.models.utils.keyframes import write_keyframe_index
+from screenvivid.models.utils.proxy import (
+    get_proxy_command, get_proxy_path, get_video_frame_count, is_valid_proxy
+)
+
+
+def write_video(path, frames=None):
+    """Placeholder video, with a keyframe index of `frames` frames."""
+    path.write_bytes(b"")
+    if frames is not None:
+        write_keyframe_index(str(path), np.array([0]), np.arange(frames) / 30)
+
+
+def test_proxy_path():
+    assert get_proxy_path("/videos/rec.mp4") == "/videos/rec.proxy.mp4"
+
+
+def test_proxy_command_keeps_every_frame():
+    cmd = get_proxy_command("/videos/rec.mp4", "/videos/rec.proxy.mp4", max_height=540, gop=5)
+    assert cmd[cmd.index("-fps_mode") + 1] == "passthrough"
+    assert cmd[cmd.index("-vf") + 1] == "scale=-2:'min(540,ih)'"
+    assert cmd[cmd.index("-g") + 1] == "5"
+    assert cmd[-1] == "/videos/rec.proxy.mp4"
+
+
+def test_frame_count_from_keyframe_index_or_frame_map(tmp_path):
+    video_path = tmp_path / "rec.mp4"
+    write_video(video_path)
+    frame_map = np.array([0, 0, 1, 2, 2], dtype=np.int32)
+    assert get_video_frame_count(str(video_path), frame_map) == 3
+    assert get_video_frame_count(str(video_path)) == 0
+
+    write_video(video_path, frames=4)
+    assert get_video_frame_count(str(video_path), frame_map) == 4
+
+
+def test_valid_proxy_has_the_same_frames(tmp_path):
+    video_path = tmp_path / "rec.mp4"
+    proxy_path = tmp_path / "rec.proxy.mp4"
+    assert not is_valid_proxy(str(video_path), str(proxy_path))
+
+    write_video(video_path)
+    write_video(proxy_path, frames=3)
+    frame_map = np.array([0, 1, 1, 2], dtype=np.int32)
+    assert is_valid_proxy(str(video_path), str(proxy_path), frame_map)
+    assert not is_valid_proxy(str(video_path), str(proxy_path), frame_map[:2])
+
+    write_keyframe_index(str(video_path), np.array([0]), np.arange(5) / 30)
+    assert not is_valid_proxy(str(video_path), str(proxy_path), frame_map)
@@ -0,0 +1,64 @@
+import cv2
+import numpy as np
+import pytest
+
+from screenvivid.models.screen_capture import MSSScreenCapture, get_frame_size
+from screenvivid.models.utils.frame_buffer import FramePool
+
+WIDTH, HEIGHT = 8, 6
+
+
+class Screenshot:
+    def __init__(self, bgra):
+        self.height, self.width = bgra.shape[:2]
+        self.raw = bytearray(bgra.tobytes())
+
+
+class Grabber:
+    def __init__(self, bgra):
+        self._bgra = bgra
+
+    def grab(self, region):
+        return Screenshot(self._bgra)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def screen():
+    rng = np.random.default_rng(0)
+    bgra = rng.integers(0, 256, (HEIGHT, WIDTH, 4), dtype=np.uint8)
+    # mss needs a display, the capture only reads raw screenshots from it
+    capture = MSSScreenCapture.__new__(MSSScreenCapture)
+    capture._sct = Grabber(bgra)
+    capture._region = {"top": 0, "left": 0, "width": WIDTH, "height": HEIGHT}
+    return capture, bgra
+
+
+def test_frame_size():
+    assert get_frame_size(WIDTH, HEIGHT) == WIDTH * HEIGHT * 4
+    assert get_frame_size(WIDTH, HEIGHT, "yuv420p") == WIDTH * HEIGHT * 3 // 2
+
+
+def test_capture_into_bgra(screen):
+    capture, bgra = screen
+    buffer = FramePool(budget=0, frame_size=get_frame_size(WIDTH, HEIGHT)).acquire()
+    view, pixel_format = capture.capture_into(buffer)
+    assert pixel_format == "bgra"
+    assert bytes(view) == bgra.tobytes()
+
+
+def test_capture_into_yuv420p(screen):
+    capture, bgra = screen
+    buffer = FramePool(budget=0, frame_size=get_frame_size(WIDTH, HEIGHT, "yuv420p")).acquire()
+    view, pixel_format = capture.capture_into(buffer, "yuv420p")
+    assert pixel_format == "yuv420p"
+    assert bytes(view) == cv2.cvtColor(bgra, cv2.COLOR_BGRA2YUV_I420).tobytes()
+
+
+def test_capture_into_a_buffer_of_another_size(screen):
+    capture, _ = screen
+    buffer = FramePool(budget=0, frame_size=get_frame_size(WIDTH, HEIGHT)).acquire()
+    with pytest.raises(ValueError):
+        capture.capture_into(buffer, "yuv420p")
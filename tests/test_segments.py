@@ -0,0 +1,66 @@
+import os
+
+from screenvivid.models.utils.segments import (
+    delete_segments, get_concat_command, get_partial_path, get_segment_args, get_segment_list_path,
+    get_segment_pattern, has_segments, read_segment_list, stitch_segments, write_concat_list
+)
+
+
+def test_segment_paths():
+    assert get_segment_pattern("/videos/rec.mp4") == "/videos/rec.part%05d.mp4"
+    assert get_segment_pattern("/videos/rec") == "/videos/rec.part%05d.mp4"
+    assert get_segment_list_path("/videos/rec.mp4") == "/videos/rec.segments.ffconcat"
+
+
+def test_segment_args_write_an_ffconcat_list():
+    args = get_segment_args("/videos/rec.mkv", 60)
+    assert args[args.index("-segment_time") + 1] == "60"
+    assert args[args.index("-segment_format") + 1] == "mkv"
+    assert args[args.index("-segment_list") + 1] == "/videos/rec.segments.ffconcat"
+    assert args[args.index("-segment_list_type") + 1] == "ffconcat"
+    assert args[-1] == "/videos/rec.part%05d.mkv"
+
+
+def test_concat_list_round_trip(tmp_path):
+    list_path = str(tmp_path / "parts.ffconcat")
+    paths = [str(tmp_path / "a.mp4"), str(tmp_path / "b.mp4"), "/elsewhere/c.mp4"]
+    write_concat_list(paths, list_path)
+
+    with open(list_path) as f:
+        lines = f.read().splitlines()
+    assert lines == ["ffconcat version 1.0", "file 'a.mp4'", "file 'b.mp4'", "file '/elsewhere/c.mp4'"]
+    assert read_segment_list(list_path) == paths
+
+
+def test_missing_segment_list(tmp_path):
+    assert read_segment_list(str(tmp_path / "missing.ffconcat")) == []
+
+
+def test_delete_segments(tmp_path):
+    video_path = str(tmp_path / "rec.mp4")
+    segments = [get_segment_pattern(video_path) % i for i in range(2)]
+    for segment in segments:
+        open(segment, "wb").close()
+    write_concat_list(segments, get_segment_list_path(video_path))
+
+    delete_segments(video_path)
+    assert os.listdir(tmp_path) == []
+
+
+def test_nothing_to_stitch(tmp_path):
+    assert not stitch_segments(str(tmp_path / "rec.mp4"))
+
+
+def test_has_segments(tmp_path):
+    video_path = str(tmp_path / "rec.mp4")
+    assert not has_segments(video_path)
+    write_concat_list([get_segment_pattern(video_path) % 0], get_segment_list_path(video_path))
+    assert has_segments(video_path)
+
+
+def test_concat_command_copies_streams():
+    cmd = get_concat_command("/videos/rec.segments.ffconcat", "/videos/rec.partial.mp4")
+    assert cmd[cmd.index("-i") + 1] == "/videos/rec.segments.ffconcat"
+    assert cmd[cmd.index("-c") + 1] == "copy"
+    assert cmd[-1] == "/videos/rec.partial.mp4"
+    assert get_partial_path("/videos/rec.mp4") == "/videos/rec.partial.mp4"
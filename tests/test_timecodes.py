@@ -0,0 +1,53 @@
+import numpy as np
+
+from screenvivid.models.utils.timecodes import (
+    FrameMapWriter, get_frame_map_path, load_frame_map, resample_frames
+)
+
+
+def test_frame_map_path():
+    assert get_frame_map_path("/videos/recording.mp4") == "/videos/recording.framemap"
+
+
+def test_frame_map_round_trip(tmp_path):
+    path = str(tmp_path / "recording.framemap")
+    writer = FrameMapWriter(path)
+    writer.open()
+    for frame_time, video_frame in [(10.0, 0), (10.1, 0), (10.2, 1)]:
+        writer.write(frame_time, video_frame)
+    writer.close()
+
+    frame_map = load_frame_map(path)
+    np.testing.assert_allclose(frame_map["time"], [10.0, 10.1, 10.2])
+    np.testing.assert_array_equal(frame_map["frame"], [0, 0, 1])
+
+
+def test_missing_or_empty_frame_map(tmp_path):
+    path = tmp_path / "recording.framemap"
+    assert load_frame_map(str(path)) is None
+    assert load_frame_map(None) is None
+
+    path.write_bytes(b"")
+    assert load_frame_map(str(path)) is None
+
+
+def test_resample_holds_the_last_captured_frame():
+    timestamps = np.array([0.0, 0.1, 0.5, 0.6])
+    indices = resample_frames(timestamps, 0, 4, fps=10)
+    np.testing.assert_array_equal(indices, [0, 1, 1, 1, 1, 2, 3])
+
+
+def test_resample_range_keeps_absolute_indices():
+    timestamps = np.array([0.0, 0.1, 0.2, 0.4, 0.5])
+    indices = resample_frames(timestamps, 2, 5, fps=10)
+    np.testing.assert_array_equal(indices, [2, 2, 3, 4])
+
+
+def test_resample_lower_rate_skips_frames():
+    timestamps = np.arange(10) / 30
+    indices = resample_frames(timestamps, 0, 10, fps=10)
+    np.testing.assert_array_equal(indices, [0, 3, 6, 9])
+
+
+def test_resample_empty_range():
+    assert len(resample_frames(np.array([0.0, 0.1]), 1, 1, fps=30)) == 0
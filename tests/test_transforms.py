@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from screenvivid.models.utils import transforms
+from screenvivid.models.utils.mouse_events import MoveTrack
+
+SIZE = (1280, 720)
+
+
+def render_config(**overrides):
+    config = {
+        "aspect_ratio": "16:9",
+        "screen_size": (1920, 1080),
+        "move_data": MoveTrack([0.5], [0.5], [0], [0], [0], ["arrow"]),
+        "cursors_map": {},
+        "offsets": (0, 0),
+        "cursor_scale": 1.0,
+        "padding": 0.1,
+        "border_radius": 8,
+        "background": {"type": "color", "value": "#336699"},
+    }
+    config.update(overrides)
+    return config
+
+
+@pytest.fixture
+def frame():
+    return np.full((SIZE[1], SIZE[0], 3), 128, dtype=np.uint8)
+
+
+def test_cursor_is_drawn_without_touching_the_source(frame):
+    compose = transforms.build_transforms(render_config())
+    source = frame.copy()
+    with_cursor = compose(input=frame, start_frame=0)
+    without_cursor = compose(input=frame, start_frame=1)
+
+    np.testing.assert_array_equal(frame, source)
+    assert with_cursor.shape == without_cursor.shape
+    changed = np.nonzero(np.any(with_cursor != without_cursor, axis=2))
+    assert len(changed[0])
+
+    # The cursor hot spot is at the center of the foreground
+    height, width = with_cursor.shape[:2]
+    assert abs(changed[1].min() - width / 2) <= 2
+    assert abs(changed[0].min() - height / 2) <= 2
+
+
+def test_layout_is_memoized_until_a_transform_is_replaced(frame):
+    compose = transforms.build_transforms(render_config())
+    layout = compose.layout(SIZE)
+    assert compose.layout(SIZE) is layout
+
+    compose["padding"] = transforms.Padding(padding=0.2)
+    relaid = compose.layout(SIZE)
+    assert relaid is not layout
+    assert relaid["foreground_width"] < layout["foreground_width"]
+
+
+def test_reused_output_buffer(frame):
+    compose = transforms.build_transforms(render_config())
+    first = compose(input=frame, start_frame=1, reuse_output=True)
+    second = compose(input=frame, start_frame=1, reuse_output=True)
+    assert first is second
+    assert compose(input=frame, start_frame=1) is not first
+
+
+def test_resize_into_a_view():
+    image = np.arange(4 * 4 * 3, dtype=np.uint8).reshape(4, 4, 3)
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+    transforms.resize_into(image, frame[2:6, 3:7])
+    np.testing.assert_array_equal(frame[2:6, 3:7], image)
+    assert not frame[:2].any() and not frame[6:].any()